@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+⏱️ 游戏循环基准测试
+
+用脚本化的负载场景驱动 Game，统计每一帧中各阶段（事件处理、更新、
+各项碰撞检测、绘制、屏幕刷新）的耗时，输出 p50/p95/p99 帧时间，
+并把结果写入 JSON 文件，便于在不同提交之间对比。
+
+使用 SDL 的 dummy 视频驱动运行，不需要显示器：
+
+    python benchmark.py -o results.json
+    python benchmark.py --scenario enemies_500 --frames 1200
+    python benchmark.py --backend arrays   # 玩家子弹和敌机使用 NumPy 结构数组
+    python benchmark.py --renderer gpu     # 用 pygame._sdl2 纹理渲染
+    python benchmark.py --pipeline         # 流水线渲染：统计渲染线程与模拟重叠节省的时间
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# 必须在导入 pygame 之前设置
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import main
+from main import Game, GameState, SCREEN_WIDTH, SCREEN_HEIGHT
+from render import RENDERERS, RenderPipeline
+
+# 各阶段对应的 Game 方法；update 内部的子阶段单独计时
+PHASES = ['handle_events', 'update', 'draw', 'display']
+UPDATE_PHASES = [
+    'update_sprites',
+    'spawn_enemies',
+    'fire_enemy_bullets',
+    'collide_bullets_enemies',
+    'collide_player_enemies',
+    'collide_player_enemy_bullets',
+    'collide_player_power_ups',
+]
+COLLISION_PHASES = [name for name in UPDATE_PHASES if name.startswith('collide_')]
+# 流水线模式额外统计的项
+PIPELINE_PHASES = ['render', 'render_wait', 'serial']
+
+
+class Scenario:
+    """基准场景：setup 设置初始状态，before_frame 在每帧开始前施加负载"""
+    fire = False
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+
+    def setup(self, game):
+        """场景初始化（此时游戏已开始）"""
+
+    def before_frame(self, game):
+        """每帧开始前调用"""
+        if self.fire:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+
+
+class LevelScenario(Scenario):
+    """指定等级的正常刷怪节奏"""
+    def __init__(self, name, description, level, fire=True):
+        super().__init__(name, description)
+        self.level = level
+        self.fire = fire
+
+    def setup(self, game):
+        game.level = self.level
+        game.difficulty = 1 + (self.level - 1) * game.DIFFICULTY_STEP
+        game.enemy_spawn_delay = max(game.SPAWN_DELAY_MIN,
+                                     game.SPAWN_DELAY_START - self.level * game.SPAWN_DELAY_STEP)
+        # 分数跟上等级，避免第一帧就触发升级
+        game.score = (self.level - 1) * game.LEVEL_SCORE
+
+
+class FiringScenario(Scenario):
+    """三级武器持续开火"""
+    fire = True
+
+    def setup(self, game):
+        game.player.power_level = 3
+        # 不受射击间隔限制，每帧都开火
+        game.player.shoot_delay = -1
+
+
+class SwarmScenario(Scenario):
+    """屏幕上始终保持大量敌机"""
+    fire = True
+
+    def __init__(self, name, description, count):
+        super().__init__(name, description)
+        self.count = count
+
+    def setup(self, game):
+        game.player.power_level = 3
+        self.top_up(game)
+
+    def before_frame(self, game):
+        super().before_frame(game)
+        self.top_up(game)
+
+    def top_up(self, game):
+        """把敌机补充到指定数量，新敌机随机分布在屏幕上"""
+        for _ in range(self.count - len(game.enemies)):
+            game.spawn_enemy(game.rng.randint(-45, SCREEN_HEIGHT - 200))
+
+
+class BulletHellScenario(Scenario):
+    """屏幕上始终保持大量敌机子弹（在上半屏随机位置补充环形齐射）"""
+    fire = True
+
+    def __init__(self, name, description, count, ring=24):
+        super().__init__(name, description)
+        self.count = count
+        self.ring = ring
+
+    def setup(self, game):
+        self.top_up(game)
+
+    def before_frame(self, game):
+        super().before_frame(game)
+        self.top_up(game)
+
+    def top_up(self, game):
+        """把敌机子弹补充到指定数量"""
+        rng = game.rng
+        volleys = []
+        missing = self.count - len(game.enemy_bullets)
+        while missing > 0:
+            x = rng.randint(0, SCREEN_WIDTH)
+            y = rng.randint(0, SCREEN_HEIGHT // 2)
+            speed = rng.uniform(1, 2)
+            angles = [2 * math.pi * i / self.ring for i in range(self.ring)]
+            volleys.append((x, y, [(speed * math.cos(a), speed * math.sin(a)) for a in angles]))
+            missing -= self.ring
+        game.emit_volleys(volleys)
+
+
+SCENARIOS = [
+    LevelScenario('level_1', "1 级刷怪节奏，普通开火", level=1),
+    LevelScenario('level_20', "20 级刷怪节奏（生成间隔 20 帧），普通开火", level=20),
+    FiringScenario('power_3_firing', "三级武器每帧开火"),
+    SwarmScenario('enemies_500', "屏幕上保持 500 架敌机，三级武器开火", count=500),
+    BulletHellScenario('enemy_bullets_3000', "屏幕上保持 3000 颗敌机子弹，普通开火", count=3000),
+]
+
+
+def percentile(values, p):
+    """最近秩法求百分位数（values 需已排序）"""
+    if not values:
+        return 0.0
+    rank = min(len(values), max(1, math.ceil(p / 100 * len(values))))
+    return values[rank - 1]
+
+
+def summarize(samples):
+    """把一组耗时（秒）汇总为毫秒统计"""
+    values = sorted(samples)
+    count = len(values)
+    return {
+        'mean_ms': sum(values) / count * 1000 if count else 0.0,
+        'p50_ms': percentile(values, 50) * 1000,
+        'p95_ms': percentile(values, 95) * 1000,
+        'p99_ms': percentile(values, 99) * 1000,
+        'max_ms': values[-1] * 1000 if count else 0.0,
+    }
+
+
+class PhaseTimer:
+    """包装 Game 的方法，记录本帧每个阶段的耗时"""
+    def __init__(self, game, names):
+        self.current = {}
+        for name in names:
+            setattr(game, name, self.wrap(name, getattr(game, name)))
+
+    def wrap(self, name, method):
+        current = self.current
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                current[name] = current.get(name, 0.0) + time.perf_counter() - start
+        return timed
+
+    def take(self):
+        """取出本帧的计时结果"""
+        result = dict(self.current)
+        self.current.clear()
+        return result
+
+
+def run_scenario(scenario, frames, warmup, seed, backend='sprites', renderer='software',
+                 pipelined=False):
+    """
+    运行一个场景，返回统计结果
+    流水线模式下 draw 只是录制绘制命令，另外统计渲染线程的耗时（render）、等待渲染线程的时间
+    （render_wait），以及串行执行同样工作的估计帧时间（serial = frame - render_wait + render）
+    """
+    game = Game(seed=seed, entity_backend=backend, renderer=renderer, pipelined=pipelined)
+    # 基准测试不应改动本地高分记录
+    game.save_high_score = lambda: None
+    game.start_game()
+    # 玩家不会死亡，保证每个场景都跑满帧数
+    game.player.health = game.player.max_health = 10 ** 9
+    scenario.setup(game)
+
+    timer = PhaseTimer(game, ['handle_events', 'update', 'draw'] + UPDATE_PHASES)
+    samples = {name: [] for name in PHASES + UPDATE_PHASES + ['collisions', 'frame']}
+    display = game.renderer
+    pipeline = None
+    if pipelined:
+        pipeline = RenderPipeline(display)
+        for name in PIPELINE_PHASES:
+            samples[name] = []
+    sprite_counts = {'enemies': 0, 'bullets': 0, 'enemy_bullets': 0, 'power_ups': 0,
+                     'explosions': 0}
+
+    for frame in range(warmup + frames):
+        scenario.before_frame(game)
+        if pipeline is not None:
+            game.renderer = pipeline.back()
+        start = time.perf_counter()
+        game.handle_events()
+        game.fixed_update()
+        rects = game.draw()
+        if pipeline is not None:
+            wait_start = time.perf_counter()
+            recorded, rects = rects, pipeline.wait()
+            render_wait = time.perf_counter() - wait_start
+        display_start = time.perf_counter()
+        display.present(rects)
+        if pipeline is not None:
+            pipeline.submit(recorded)
+        end = time.perf_counter()
+
+        timings = timer.take()
+        if game.state != GameState.PLAYING:
+            raise RuntimeError(f"场景 {scenario.name} 在第 {frame} 帧意外结束")
+        if frame < warmup:
+            continue
+
+        timings['display'] = end - display_start
+        timings['collisions'] = sum(timings.get(name, 0.0) for name in COLLISION_PHASES)
+        timings['frame'] = end - start
+        if pipeline is not None:
+            # 渲染线程的耗时属于上一帧，帧数足够多时不影响统计
+            timings['render'] = pipeline.render_time
+            timings['render_wait'] = render_wait
+            timings['serial'] = end - start - render_wait + pipeline.render_time
+        for name, values in samples.items():
+            values.append(timings.get(name, 0.0))
+        for name in sprite_counts:
+            sprite_counts[name] += len(getattr(game, name))
+
+    if pipeline is not None:
+        pipeline.close()
+        game.renderer = display
+    game.renderer.close()
+    return {
+        'description': scenario.description,
+        'frames': frames,
+        'frame': summarize(samples.pop('frame')),
+        'phases': {name: summarize(values) for name, values in samples.items()},
+        'avg_sprites': {name: total / frames for name, total in sprite_counts.items()},
+        'pools': game.pool_stats(),
+    }
+
+
+def git_commit():
+    """当前代码的提交号（不在 git 仓库中时返回 None）"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(name, result):
+    """在终端打印一个场景的结果"""
+    frame = result['frame']
+    print(f"\n▶ {name} - {result['description']}")
+    print(f"  帧时间  p50 {frame['p50_ms']:7.3f}  p95 {frame['p95_ms']:7.3f}  "
+          f"p99 {frame['p99_ms']:7.3f}  max {frame['max_ms']:7.3f} ms")
+    phases = result['phases']
+    for phase in PHASES + ['collisions'] + UPDATE_PHASES + PIPELINE_PHASES:
+        if phase not in phases:
+            continue
+        stats = phases[phase]
+        print(f"  {phase:<26} mean {stats['mean_ms']:7.3f}  p95 {stats['p95_ms']:7.3f}  "
+              f"p99 {stats['p99_ms']:7.3f} ms")
+    if 'serial' in phases:
+        serial, actual = phases['serial']['mean_ms'], frame['mean_ms']
+        print(f"  流水线重叠：串行估计 {serial:.3f} ms → 实际 {actual:.3f} ms"
+              f"（节省 {1 - actual / serial if serial else 0.0:.1%}）")
+
+
+if __name__ == "__main__":
+    names = [scenario.name for scenario in SCENARIOS]
+    parser = argparse.ArgumentParser(description="游戏循环基准测试")
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help="结果 JSON 文件路径")
+    parser.add_argument('--frames', type=int, default=600, help="每个场景统计的帧数")
+    parser.add_argument('--warmup', type=int, default=60, help="每个场景的预热帧数（不计入统计）")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--scenario', action='append', choices=names,
+                        help="只运行指定场景（可重复）")
+    parser.add_argument('--backend', choices=['sprites', 'arrays'], default='sprites',
+                        help="实体后端")
+    parser.add_argument('--renderer', choices=RENDERERS, default='software',
+                        help="渲染后端")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="流水线渲染（渲染线程与模拟并行）")
+    args = parser.parse_args()
+
+    results = {}
+    for scenario in SCENARIOS:
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        results[scenario.name] = run_scenario(scenario, args.frames, args.warmup, args.seed,
+                                               args.backend, args.renderer, args.pipeline)
+        print_report(scenario.name, results[scenario.name])
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'video_driver': pygame.display.get_driver(),
+            'numpy': main.np is not None,
+            'backend': args.backend,
+            'renderer': args.renderer,
+            'pipeline': args.pipeline,
+            'cpu_count': os.cpu_count(),
+            'frames': args.frames,
+            'warmup': args.warmup,
+            'seed': args.seed,
+        },
+        'scenarios': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入 {args.output}")
+    sys.exit(0)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+🎥 画面录制
+
+游戏线程每帧只用 pygame.image.tobytes 把画面复制成一块 RGB 字节，放进有界的环形缓冲区后立即返回；
+编码和写盘都在后台线程完成，磁盘或编码跟不上时按缓冲区的占用降采样（每 2、4、8 帧取一帧），
+缓冲区满了就丢弃这一帧，游戏循环永远不会因为录制而等待。两种输出格式：
+
+    png  目录下的 PNG 序列，文件名为帧号（zlib 压缩在后台线程中进行，多个线程可以并行编码）
+    raw  单个 RGB24 原始视频文件，降采样或丢弃的帧用上一帧补齐，保持恒定帧率；
+         可以用 ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 60 -i game.rgb game.mp4 转码
+
+    python main.py --capture frames/                  # 边玩边录制
+    python capture.py last.ssr -o frames/             # 无界面回放录像并导出（不限帧率）
+    python capture.py last.ssr -o game.rgb --lossless # 缓冲区满时等待，保证不丢帧
+"""
+
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import pygame
+
+FORMATS = ['png', 'raw']
+# 缓冲区占用超过 3/4 时降采样间隔加倍，低于 1/4 时减半
+HIGH_WATER = 0.75
+LOW_WATER = 0.25
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def png_chunk(tag, body):
+    return struct.pack('>I', len(body)) + tag + body + struct.pack('>I', zlib.crc32(tag + body))
+
+
+def encode_png(data, size, level=1):
+    """把 RGB24 字节编码为 PNG（每行不做滤波，压缩级别低时速度比 pygame.image.save 快几倍）"""
+    width, height = size
+    stride = width * 3
+    view = memoryview(data)
+    rows = []
+    for y in range(height):
+        rows.append(b'\x00')
+        rows.append(view[y * stride:(y + 1) * stride])
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (PNG_SIGNATURE + png_chunk(b'IHDR', header) +
+            png_chunk(b'IDAT', zlib.compress(b''.join(rows), level)) + png_chunk(b'IEND', b''))
+
+
+def guess_format(path):
+    """按路径推断输出格式：.rgb / .raw 为原始视频，其余视为 PNG 序列的目录"""
+    return 'raw' if os.path.splitext(path)[1].lower() in ('.rgb', '.raw') else 'png'
+
+
+class FrameCapture:
+    """
+    后台录制画面
+    add() 在游戏线程调用，只复制像素并入队；编码线程从缓冲区取出帧写盘。
+    block 为 True 时缓冲区满了就等待（离线导出需要完整的帧序列时使用），不再降采样和丢帧；
+    编码线程意外退出后不再等待，之后提交的帧都计为丢弃
+    """
+    def __init__(self, path, size, fmt=None, capacity=32, workers=1, block=False, every=1,
+                 max_stride=8, level=1):
+        self.path = path
+        self.size = tuple(size)
+        self.format = fmt or guess_format(path)
+        if self.format not in FORMATS:
+            raise ValueError(f"未知的录制格式: {self.format}")
+        # 原始视频必须按顺序写入，只能用一个编码线程
+        self.workers = max(1, workers) if self.format == 'png' else 1
+        self.capacity = capacity
+        self.block = block
+        self.every = max(1, every)
+        self.max_stride = max(self.every, max_stride)
+        self.level = level
+        self.queue = queue.Queue(maxsize=capacity)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.file = None
+        # 当前的降采样间隔（帧）
+        self.stride = self.every
+        self.frame = 0
+        # 统计：提交的帧、进入缓冲区的帧、因降采样跳过的帧、因缓冲区满丢弃的帧
+        self.offered = 0
+        self.captured = 0
+        self.downsampled = 0
+        self.dropped = 0
+        self.peak = 0
+        self.copy_time = 0.0
+        # 编码线程的统计（在锁内更新）
+        self.encoded = 0
+        self.duplicated = 0
+        self.bytes_written = 0
+        self.encode_time = 0.0
+        self.started_at = None
+        self.finished_at = None
+        self.errors = 0
+        self.last_error = None
+        # 有编码线程意外退出时为 True
+        self.failed = False
+        self.closing = False
+
+    def start(self):
+        """创建输出位置并启动编码线程"""
+        if self.threads:
+            return
+        if self.format == 'png':
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            self.file = open(self.path, 'wb')
+        self.started_at = time.perf_counter()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.encode_loop, name=f'frame-encoder-{index}',
+                                      daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def add(self, surface, frame=None):
+        """
+        提交一帧画面（frame 为帧号，省略时按提交次数计），返回这一帧是否进入了缓冲区
+        """
+        self.start()
+        if frame is None:
+            frame = self.frame
+        self.frame = frame + 1
+        self.offered += 1
+        if self.failed:
+            self.dropped += 1
+            return False
+        if frame % self.stride:
+            self.downsampled += 1
+            return False
+        if not self.block:
+            # 按缓冲区占用调整降采样间隔
+            filled = self.queue.qsize() / self.capacity
+            if filled >= HIGH_WATER and self.stride < self.max_stride:
+                self.stride *= 2
+            elif filled <= LOW_WATER and self.stride > self.every:
+                self.stride //= 2
+            if self.queue.full():
+                self.dropped += 1
+                return False
+        start = time.perf_counter()
+        data = pygame.image.tobytes(surface, 'RGB')
+        self.copy_time += time.perf_counter() - start
+        if not self.put((frame, data)):
+            self.dropped += 1
+            return False
+        self.captured += 1
+        self.peak = max(self.peak, self.queue.qsize())
+        return True
+
+    def put(self, item):
+        """把一项放进缓冲区，返回是否成功；阻塞模式下等待空位，直到编码线程意外退出"""
+        while not self.failed:
+            try:
+                self.queue.put(item, self.block, 0.1)
+                return True
+            except queue.Full:
+                if not self.block:
+                    return False
+        return False
+
+    def encode_loop(self):
+        """编码线程：依次取出帧写盘，收到 None 时退出"""
+        try:
+            self.encode_frames()
+        finally:
+            # 只有 close() 发出的结束标记会让编码线程正常退出
+            if not self.closing:
+                self.failed = True
+
+    def encode_frames(self):
+        previous = None
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            frame, data = item
+            start = time.perf_counter()
+            try:
+                if self.format == 'png':
+                    written = self.write_png(frame, data)
+                    duplicated = 0
+                else:
+                    duplicated, written = self.write_raw(frame, data, previous)
+                    previous = (frame, data)
+            except Exception as error:
+                # 编码或写盘失败不影响游戏，记录后继续
+                with self.lock:
+                    self.errors += 1
+                    self.last_error = error
+                continue
+            with self.lock:
+                self.encoded += 1
+                self.duplicated += duplicated
+                self.bytes_written += written
+                self.encode_time += time.perf_counter() - start
+
+    def write_png(self, frame, data):
+        encoded = encode_png(data, self.size, self.level)
+        with open(os.path.join(self.path, f'{frame:06d}.png'), 'wb') as f:
+            f.write(encoded)
+        return len(encoded)
+
+    def write_raw(self, frame, data, previous):
+        """写入一帧原始视频，中间缺失的帧用上一帧补齐，返回 (补齐的帧数, 写入字节数)"""
+        duplicated = 0
+        if previous is not None:
+            duplicated = max(0, frame - previous[0] - 1)
+            for _ in range(duplicated):
+                self.file.write(previous[1])
+        self.file.write(data)
+        return duplicated, len(data) * (duplicated + 1)
+
+    def close(self):
+        """等待缓冲区中的帧全部写完，返回统计"""
+        if self.threads:
+            self.closing = True
+            for _ in self.threads:
+                # 每个仍在运行的编码线程取走一个结束标记；已经退出的线程不会再取
+                while any(thread.is_alive() for thread in self.threads):
+                    try:
+                        self.queue.put(None, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+            for thread in self.threads:
+                thread.join()
+            self.threads = []
+            self.finished_at = time.perf_counter()
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        return self.stats()
+
+    def stats(self):
+        """录制统计"""
+        with self.lock:
+            encoded, encode_time = self.encoded, self.encode_time
+            duplicated, written = self.duplicated, self.bytes_written
+        elapsed = ((self.finished_at or time.perf_counter()) - self.started_at
+                   if self.started_at is not None else 0.0)
+        return {
+            'format': self.format,
+            'offered': self.offered,
+            'captured': self.captured,
+            'downsampled': self.downsampled,
+            'dropped': self.dropped,
+            'encoded': encoded,
+            'duplicated': duplicated,
+            'buffer_peak': self.peak,
+            'stride': self.stride,
+            'copy_ms': self.copy_time / max(self.captured, 1) * 1000,
+            'encode_ms': encode_time / max(encoded, 1) * 1000,
+            'encode_fps': encoded / elapsed if elapsed else 0.0,
+            'bytes_written': written,
+            'errors': self.errors,
+            'failed': self.failed,
+        }
+
+
+def print_stats(stats):
+    print(f"提交 {stats['offered']} 帧：录制 {stats['captured']}，降采样跳过 {stats['downsampled']}，"
+          f"缓冲区满丢弃 {stats['dropped']}（缓冲区峰值 {stats['buffer_peak']}）")
+    print(f"复制 {stats['copy_ms']:.2f} ms/帧，编码 {stats['encode_ms']:.2f} ms/帧，"
+          f"编码吞吐 {stats['encode_fps']:.0f} 帧/秒，写入 {stats['bytes_written'] / 2 ** 20:.1f} MB")
+    if stats['duplicated']:
+        print(f"原始视频中补齐了 {stats['duplicated']} 帧")
+    if stats['errors']:
+        print(f"编码或写盘失败 {stats['errors']} 次")
+    if stats['failed']:
+        print("编码线程意外退出，之后的帧全部丢弃")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from main import FPS, SCREEN_HEIGHT, SCREEN_WIDTH, Game
+    from render import SoftwareRenderer
+    from replay import Replay
+
+    parser = argparse.ArgumentParser(description="无界面回放录像并导出画面")
+    parser.add_argument('replay', help="录像文件（由 main.py --record 生成）")
+    parser.add_argument('-o', '--output', required=True,
+                        help="输出位置：目录（PNG 序列）或 .rgb 文件（原始视频）")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="输出格式（默认按路径推断）")
+    parser.add_argument('--capacity', type=int, default=32, help="缓冲区可容纳的帧数")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="PNG 编码线程数")
+    parser.add_argument('--every', type=int, default=1, help="每隔几帧录制一帧")
+    parser.add_argument('--lossless', action='store_true', help="缓冲区满时等待，不丢帧")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    game = Game(headless=True)
+    # 无界面模式默认不绘制，换成画到离屏画布的软件渲染器
+    canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    game.renderer = SoftwareRenderer(canvas)
+    capture = FrameCapture(args.output, canvas.get_size(), args.format, args.capacity,
+                           args.workers, args.lossless, args.every)
+
+    def record_frame(game):
+        game.draw()
+        capture.add(canvas, game.ticks)
+
+    start = time.perf_counter()
+    replay.run(game, record_frame)
+    simulated = time.perf_counter() - start
+    stats = capture.close()
+    elapsed = time.perf_counter() - start
+
+    frames = len(replay.inputs)
+    print(f"种子: {replay.seed}  帧数: {frames}  分数: {game.score}")
+    print(f"模拟与绘制 {simulated:.2f} 秒（{frames / FPS / max(simulated, 1e-9):.1f} 倍实时速度），"
+          f"含等待编码共 {elapsed:.2f} 秒")
+    print_stats(stats)
+    sys.exit(0)
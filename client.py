@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+🛰️ 多人对战客户端
+
+连接 server.py，把键盘输入发给服务器，用收到的状态增量维护本地镜像并绘制画面。
+两次广播之间按实体的速度推算位置，画面仍以 60 FPS 平滑运动；爆炸效果只在客户端播放。
+
+    python client.py --local             # 在本进程内启动回环服务器并加入
+    python client.py --host 1.2.3.4      # 加入远程服务器的任意房间
+    python client.py --room 3            # 加入指定房间
+    python client.py --local --bot       # 由脚本自动操控（不打开窗口）
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import pygame
+
+from main import (BLACK, ENEMY_KINDS, ENEMY_TYPES, FPS, GREEN, PURPLE, RED, SCREEN_HEIGHT,
+                  SCREEN_WIDTH, WHITE, YELLOW, Bullet, Enemy, GameState, Player, PowerUp,
+                  Starfield, explosion_pool, font_cache, init_display, surface_cache)
+from protocol import (ANY_ROOM, CHANNELS, INPUT, INPUT_BODY, JOIN, JOIN_BODY, PLAYER_ALIVE,
+                      PLAYER_INVINCIBLE, STATE, STATS, STATS_REQUEST, WELCOME, WELCOME_BODY,
+                      StateMirror, pack, read_message)
+from render import SoftwareRenderer
+from server import DEFAULT_PORT, POWER_UP_KINDS, GameServer
+
+POWER_UP_STYLES = {'health': (GREEN, '+'), 'power': (PURPLE, 'P'), 'score': (YELLOW, '$')}
+
+
+class Client:
+    """
+    与服务器的一条连接
+    decode 为 False 时只统计收到的字节数而不解析增量（压测时模拟大量客户端用）
+    """
+    def __init__(self, decode=True):
+        self.mirror = StateMirror() if decode else None
+        self.reader = None
+        self.writer = None
+        self.pid = None
+        self.room = None
+        self.send_interval = 1
+        self.received_at = 0.0
+        self.messages = 0
+        self.bytes_received = 0
+        self.last_input = None
+        self.pending_stats = None
+
+    async def connect(self, host, port, room=ANY_ROOM):
+        """连接并加入房间，返回 (玩家编号, 房间号)"""
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(pack(JOIN, JOIN_BODY.pack(room)))
+        kind, body = await read_message(self.reader)
+        if kind != WELCOME:
+            raise ConnectionError("服务器拒绝加入（房间已满？）")
+        self.pid, self.room, _, self.send_interval, _ = WELCOME_BODY.unpack(body)
+        return self.pid, self.room
+
+    async def receive(self):
+        """持续接收服务器消息，直到连接关闭"""
+        try:
+            while True:
+                kind, body = await read_message(self.reader)
+                self.messages += 1
+                self.bytes_received += len(body) + 5
+                if kind == STATE:
+                    if self.mirror is not None:
+                        self.mirror.apply(body)
+                    self.received_at = time.perf_counter()
+                elif kind == STATS and self.pending_stats is not None:
+                    self.pending_stats.set_result(body)
+                    self.pending_stats = None
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def send_input(self, move, shoot):
+        """发送输入（只在输入变化时发送）"""
+        state = (move, bool(shoot))
+        if state != self.last_input:
+            self.last_input = state
+            self.writer.write(pack(INPUT, INPUT_BODY.pack(move, bool(shoot))))
+
+    async def request_stats(self):
+        """查询服务器统计（需要 receive() 正在运行）"""
+        self.pending_stats = asyncio.get_running_loop().create_future()
+        self.writer.write(pack(STATS_REQUEST))
+        return json.loads(await self.pending_stats)
+
+    def estimated_tick(self):
+        """当前画面对应的逻辑帧（小数）：最近一次广播之后按经过的时间推算，最多推算两个广播间隔"""
+        ahead = (time.perf_counter() - self.received_at) * FPS
+        return self.mirror.tick + min(ahead, 2 * self.send_interval)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def bot_input(client, rng):
+    """自动操控：有镜像时追踪最近的敌机，否则随机移动；一直开火"""
+    mirror = client.mirror
+    if mirror is None or not mirror.players:
+        return rng.choice((-1, 0, 1)), True
+    me = next((player for player in mirror.players if player[0] == client.pid), None)
+    kinds, x, y = mirror.entities('enemies')
+    if me is None or not len(x):
+        return 0, True
+    target = int(x[y.argmax()]) + 20
+    center = me[1] + 25
+    return (target > center + 8) - (target < center - 8), True
+
+
+async def run_bot(host, port, room=ANY_ROOM, duration=10.0, decode=True, seed=None):
+    """一个自动操控的客户端：每 0.1 秒决定一次输入，duration 秒后断开，返回 Client"""
+    rng = random.Random(seed)
+    client = Client(decode)
+    await client.connect(host, port, room)
+    receiver = asyncio.ensure_future(client.receive())
+    deadline = time.perf_counter() + duration
+    try:
+        while time.perf_counter() < deadline and not receiver.done():
+            client.send_input(*bot_input(client, rng))
+            await asyncio.sleep(0.1)
+    finally:
+        client.close()
+        receiver.cancel()
+    return client
+
+
+class Viewer:
+    """把 StateMirror 画到窗口上"""
+    def __init__(self, client):
+        self.client = client
+        init_display()
+        self.renderer = SoftwareRenderer.create((SCREEN_WIDTH, SCREEN_HEIGHT),
+                                                "🚀 Space Shooter - 多人对战")
+        self.starfield = Starfield(100)
+        self.explosions = pygame.sprite.Group()
+        surface_cache.open()
+        # 各通道按类型编码索引的图像
+        self.images = {
+            'enemies': [surface_cache.get(('enemy', kind), Enemy.draw_enemy, kind)
+                        for kind in ENEMY_KINDS],
+            'bullets': [surface_cache.get(('bullet', YELLOW), Bullet.draw_bullet, YELLOW)],
+            'enemy_bullets': [surface_cache.get('enemy_bullet', Bullet.draw_enemy_bullet)],
+            'power_ups': [surface_cache.get(('power_up', kind), PowerUp.draw_power_up, 25,
+                                            *POWER_UP_STYLES[kind]) for kind in POWER_UP_KINDS],
+        }
+        self.ship = surface_cache.get('player', Player.draw_ship)
+        self.ghost = self.ship.copy()
+        self.ghost.set_alpha(110)
+        self.messages = 0
+
+    def add_explosions(self):
+        """为本次增量中被击毁（而不是飞出屏幕）的敌机播放爆炸"""
+        mirror = self.client.mirror
+        if mirror.messages == self.messages:
+            return
+        self.messages = mirror.messages
+        vanished = mirror.vanished[CHANNELS.index('enemies')]
+        if vanished is None:
+            return
+        for kind, x, y in zip(*(column.tolist() for column in vanished)):
+            if y < SCREEN_HEIGHT:
+                width, height = ENEMY_TYPES[ENEMY_KINDS[kind]]['size']
+                self.explosions.add(explosion_pool.acquire(x + width // 2, y + height // 2))
+
+    def text(self, text, size, color, x, y, align='left'):
+        image = font_cache.get(size).render(text, True, color)
+        rect = image.get_rect(**{'topleft' if align == 'left' else 'center': (x, y)})
+        self.renderer.blit(image, rect)
+
+    def draw(self):
+        client, mirror, renderer = self.client, self.client.mirror, self.renderer
+        self.add_explosions()
+        self.starfield.update()
+        self.explosions.update()
+        renderer.clear(BLACK)
+        renderer.draw_starfield(self.starfield)
+        if not mirror.synced:
+            self.text("连接中...", 36, WHITE, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, 'center')
+            renderer.present()
+            return
+
+        tick = client.estimated_tick()
+        for channel in ('power_ups', 'enemies', 'bullets', 'enemy_bullets'):
+            images = self.images[channel]
+            kinds, x, y = mirror.entities(channel, tick)
+            renderer.blits([(images[kind], position) for kind, position in zip(
+                kinds.tolist(), zip(x.tolist(), y.tolist()))], False)
+        self.explosions.draw(renderer)
+
+        me = None
+        for pid, x, y, health, power, flags in mirror.players:
+            if not flags & PLAYER_ALIVE:
+                continue
+            blink = flags & PLAYER_INVINCIBLE and (pygame.time.get_ticks() // 100) % 2
+            renderer.blit(self.ghost if blink else self.ship, (x, y))
+            self.text(f"P{pid + 1}", 18, WHITE, x + 25, y + 52, 'center')
+            if pid == client.pid:
+                me = (health, power)
+
+        self.text(f"分数: {mirror.score}", 36, WHITE, 20, 20)
+        self.text(f"等级: {mirror.level}  房间 {client.room}", 24, WHITE, 20, 55)
+        if me is not None:
+            self.text(f"生命: {me[0]}  武器: {me[1]}", 24, GREEN, 20, 80)
+        else:
+            self.text("已阵亡，等待队友", 24, RED, 20, 80)
+        if mirror.state == GameState.GAME_OVER.value:
+            self.text("游戏结束", 72, RED, SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, 'center')
+        renderer.present()
+
+
+async def run_viewer(client):
+    """窗口主循环：读取键盘输入发给服务器并绘制画面"""
+    viewer = Viewer(client)
+    receiver = asyncio.ensure_future(client.receive())
+    running = True
+    while running and not receiver.done():
+        frame_start = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.KEYDOWN and
+                                             event.key == pygame.K_ESCAPE):
+                running = False
+        keys = pygame.key.get_pressed()
+        move = ((keys[pygame.K_RIGHT] or keys[pygame.K_d]) -
+                (keys[pygame.K_LEFT] or keys[pygame.K_a]))
+        client.send_input(move, keys[pygame.K_SPACE])
+        viewer.draw()
+        # 用 asyncio.sleep 等到下一帧，等待期间处理网络收发
+        await asyncio.sleep(max(0.0, frame_start + 1 / FPS - time.perf_counter()))
+    client.close()
+    receiver.cancel()
+    surface_cache.save()
+    viewer.renderer.close()
+    pygame.quit()
+
+
+async def main(args):
+    host, port = args.host, args.port
+    server = None
+    if args.local:
+        # 本进程内的回环服务器
+        server = GameServer()
+        host = '127.0.0.1'
+        port = await server.start(host, 0)
+        serving = asyncio.ensure_future(server.serve())
+    try:
+        if args.bot:
+            client = await run_bot(host, port, args.room, args.duration)
+            print(f"房间 {client.room} 玩家 {client.pid + 1}: 收到 {client.messages} 条消息，"
+                  f"{client.bytes_received / 1024:.1f} KB，最终分数 {client.mirror.score}")
+        else:
+            client = Client()
+            await client.connect(host, port, args.room)
+            await run_viewer(client)
+    finally:
+        if server is not None:
+            await server.close()
+            serving.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多人对战客户端")
+    parser.add_argument('--host', default='127.0.0.1', help="服务器地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="服务器端口")
+    parser.add_argument('--room', type=int, default=ANY_ROOM, help="房间号（默认加入任意未满的房间）")
+    parser.add_argument('--local', action='store_true', help="在本进程内启动回环服务器")
+    parser.add_argument('--bot', action='store_true', help="自动操控，不打开窗口")
+    parser.add_argument('--duration', type=float, default=10.0, help="自动操控时的运行秒数")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        pass
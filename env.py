@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+🧠 训练环境接口
+
+把 Game 包装成 reset/step 形式的环境（接口与 Gymnasium 一致，但不依赖它），
+供智能体训练使用：
+
+    from env import ShooterEnv, VectorShooterEnv
+
+    env = ShooterEnv(seed=0)
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(env.sample_action())
+
+    envs = VectorShooterEnv(16, seed=0, obs_type='pixels')
+    obs, infos = envs.reset()                  # obs.shape == (16, 84, 84)
+    obs, rewards, terminated, truncated, infos = envs.step(actions)
+
+动作是 ACTIONS 中的序号（左/右/停 × 是否开火），奖励为本步得分增量，
+游戏结束时 terminated 为 True。观测有两种：
+    features  紧凑的特征向量（玩家状态、最近的若干敌机和敌机子弹的相对位置、最近道具的相对位置）
+    pixels    缩小后的灰度画面（通过 surfarray 读取）
+"""
+
+import os
+import random
+
+# 必须在导入 pygame 之前设置
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+import pygame
+
+from main import (Game, GameState, ENEMY_KINDS, ENEMY_TYPES, SCREEN_WIDTH, SCREEN_HEIGHT,
+                  BLACK, sprite_rects)
+from render import SoftwareRenderer
+
+# 动作序号对应的 (move, shoot)
+ACTIONS = [
+    (0, False),   # 停
+    (-1, False),  # 左
+    (1, False),   # 右
+    (0, True),    # 停 + 开火
+    (-1, True),   # 左 + 开火
+    (1, True),    # 右 + 开火
+]
+
+# 特征向量中包含的最近敌机和最近敌机子弹数量
+NEAREST_ENEMIES = 8
+NEAREST_ENEMY_BULLETS = 8
+# 玩家状态 5 项，每架敌机 4 项，每颗敌机子弹 5 项，最近道具 3 项
+FEATURE_SIZE = 5 + 4 * NEAREST_ENEMIES + 5 * NEAREST_ENEMY_BULLETS + 3
+# 敌机子弹速度的归一化系数（各类型中最快的子弹速度）
+BULLET_SPEED_SCALE = max(spec['fire']['speed'] for spec in ENEMY_TYPES.values())
+
+# 像素观测的默认尺寸（宽, 高）
+PIXEL_SIZE = (84, 84)
+
+
+class ShooterEnv:
+    """单个游戏环境"""
+    def __init__(self, seed=None, obs_type='features', frame_skip=1, max_steps=None,
+                 pixel_size=PIXEL_SIZE, entity_backend='sprites'):
+        if obs_type not in ('features', 'pixels'):
+            raise ValueError(f"未知的观测类型: {obs_type}")
+        self.game = Game(headless=True, seed=seed, entity_backend=entity_backend)
+        self.obs_type = obs_type
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.pixel_size = pixel_size
+        self.steps = 0
+        self.action_rng = random.Random(seed)
+
+        # 像素观测需要一块离屏画布（特征观测用默认的空渲染器，不绘制任何内容）
+        if obs_type == 'pixels':
+            self.canvas = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.game.renderer = SoftwareRenderer(self.canvas)
+            self.observation_shape = (pixel_size[1], pixel_size[0])
+            self.observation_dtype = np.uint8
+        else:
+            self.observation_shape = (FEATURE_SIZE,)
+            self.observation_dtype = np.float32
+        self.n_actions = len(ACTIONS)
+
+    def sample_action(self):
+        """随机动作"""
+        return self.action_rng.randrange(self.n_actions)
+
+    def reset(self, seed=None):
+        """开始新的一局，返回 (observation, info)"""
+        self.start(seed)
+        return self.observe(), self.info()
+
+    def step(self, action):
+        """执行一个动作，返回 (observation, reward, terminated, truncated, info)"""
+        reward, terminated, truncated, info = self.advance(action)
+        return self.observe(), reward, terminated, truncated, info
+
+    def start(self, seed=None):
+        """开始新的一局（不生成观测）"""
+        if seed is not None:
+            self.game.seed_rng.seed(seed)
+            self.action_rng.seed(seed)
+        self.game.start_game()
+        self.steps = 0
+
+    def advance(self, action):
+        """执行一个动作（不生成观测），返回 (reward, terminated, truncated, info)"""
+        game = self.game
+        move, shoot = ACTIONS[action]
+        score = game.score
+        for _ in range(self.frame_skip):
+            game.step(move, shoot)
+            if game.state != GameState.PLAYING:
+                break
+        self.steps += 1
+        terminated = game.state == GameState.GAME_OVER
+        truncated = not terminated and self.max_steps is not None and self.steps >= self.max_steps
+        return game.score - score, terminated, truncated, self.info()
+
+    def info(self):
+        """附加信息"""
+        game = self.game
+        return {'score': game.score, 'level': game.level, 'ticks': game.ticks,
+                'health': game.player.health, 'seed': game.seed}
+
+    def observe(self, out=None):
+        """当前观测（out 不为空时写入该数组）"""
+        if out is None:
+            out = np.empty(self.observation_shape, self.observation_dtype)
+        if self.obs_type == 'pixels':
+            self.observe_pixels(out)
+        else:
+            self.observe_features(out)
+        return out
+
+    def observe_features(self, out):
+        """特征向量：坐标都按屏幕尺寸归一化，相对位置以玩家为原点"""
+        game = self.game
+        player = game.player
+        px, py = player.rect.center
+        out[:] = 0
+        out[0] = px / SCREEN_WIDTH
+        out[1] = player.health / player.max_health
+        out[2] = player.power_level / 3
+        out[3] = game.now() - player.last_shot > player.shoot_delay
+        out[4] = player.invincible
+
+        # 最近的若干敌机：是否存在、dx、dy、类型
+        x, y, w, h, kinds = enemy_arrays(game)
+        if len(x):
+            dx = (x + w // 2 - px) / SCREEN_WIDTH
+            dy = (y + h // 2 - py) / SCREEN_HEIGHT
+            nearest = np.argsort(dx * dx + dy * dy, kind='stable')[:NEAREST_ENEMIES]
+            block = out[5:5 + 4 * len(nearest)].reshape(-1, 4)
+            block[:, 0] = 1
+            block[:, 1] = dx[nearest]
+            block[:, 2] = dy[nearest]
+            block[:, 3] = kinds[nearest] / (len(ENEMY_KINDS) - 1)
+
+        # 最近的若干敌机子弹：是否存在、dx、dy、vx、vy
+        x, y, w, h, vx, vy = enemy_bullet_arrays(game)
+        if len(x):
+            dx = (x + w // 2 - px) / SCREEN_WIDTH
+            dy = (y + h // 2 - py) / SCREEN_HEIGHT
+            nearest = np.argsort(dx * dx + dy * dy, kind='stable')[:NEAREST_ENEMY_BULLETS]
+            start = 5 + 4 * NEAREST_ENEMIES
+            block = out[start:start + 5 * len(nearest)].reshape(-1, 5)
+            block[:, 0] = 1
+            block[:, 1] = dx[nearest]
+            block[:, 2] = dy[nearest]
+            block[:, 3] = vx[nearest] / BULLET_SPEED_SCALE
+            block[:, 4] = vy[nearest] / BULLET_SPEED_SCALE
+
+        # 最近的道具：是否存在、dx、dy
+        if game.power_ups:
+            power_up = min(game.power_ups, key=lambda p: (p.rect.centerx - px) ** 2 +
+                           (p.rect.centery - py) ** 2)
+            out[-3] = 1
+            out[-2] = (power_up.rect.centerx - px) / SCREEN_WIDTH
+            out[-1] = (power_up.rect.centery - py) / SCREEN_HEIGHT
+
+    def observe_pixels(self, out):
+        """缩小后的灰度画面，形状为 (高, 宽)"""
+        game = self.game
+        game.renderer.clear(BLACK)
+        game.draw_game()
+        # 先最近邻缩到目标的两倍再平滑缩小，比直接 smoothscale 整屏快几倍，细小的子弹也不会丢失
+        width, height = self.pixel_size
+        small = pygame.transform.smoothscale(
+            pygame.transform.scale(self.canvas, (width * 2, height * 2)), self.pixel_size)
+        rgb = pygame.surfarray.pixels3d(small)
+        # surfarray 的坐标顺序是 (x, y)，转置成行优先的 (y, x)
+        gray = rgb[..., 0] * 0.299 + rgb[..., 1] * 0.587 + rgb[..., 2] * 0.114
+        out[:] = gray.T
+        del rgb
+
+    def close(self):
+        """释放资源（与 Gymnasium 接口保持一致）"""
+
+
+def enemy_arrays(game):
+    """所有敌机的 (x, y, w, h, 类型编码) 数组，两种实体后端通用"""
+    if game.entity_arrays:
+        return game.enemies.rects() + (game.enemies.column('kind'),)
+    enemies = game.enemies.sprites()
+    kinds = np.array([ENEMY_KINDS.index(enemy.type) for enemy in enemies], np.int64)
+    return tuple(sprite_rects(enemies)) + (kinds,)
+
+
+def enemy_bullet_arrays(game):
+    """所有敌机子弹的 (x, y, w, h, vx, vy) 数组，两种实体后端通用"""
+    if game.entity_arrays:
+        bullets = game.enemy_bullets
+        return bullets.rects() + (bullets.column('vx'), bullets.column('vy'))
+    bullets = game.enemy_bullets.sprites()
+    vx = np.array([bullet.vx for bullet in bullets], np.float64)
+    vy = np.array([bullet.speed for bullet in bullets], np.float64)
+    return tuple(sprite_rects(bullets)) + (vx, vy)
+
+
+class VectorShooterEnv:
+    """
+    N 个游戏同步推进的向量化环境
+    观测、奖励和结束标志都按批返回；某一局结束后自动开始新的一局，
+    结束时的最终观测放在 infos[i]['final_observation'] 中
+    """
+    def __init__(self, count, seed=None, **kwargs):
+        seeds = random.Random(seed).sample(range(2 ** 31), count)
+        self.envs = [ShooterEnv(seed=env_seed, **kwargs) for env_seed in seeds]
+        self.count = count
+        self.observation_shape = (count,) + self.envs[0].observation_shape
+        self.observation_dtype = self.envs[0].observation_dtype
+        self.n_actions = self.envs[0].n_actions
+        self.obs = np.zeros(self.observation_shape, self.observation_dtype)
+
+    def reset(self, seed=None):
+        """重新开始所有游戏，返回 (observations, infos)"""
+        infos = []
+        for index, env in enumerate(self.envs):
+            env.start(None if seed is None else seed + index)
+            env.observe(self.obs[index])
+            infos.append(env.info())
+        return self.obs.copy(), infos
+
+    def step(self, actions):
+        """每个游戏执行一个动作，返回批量的 (observations, rewards, terminated, truncated, infos)"""
+        rewards = np.zeros(self.count, np.float32)
+        terminated = np.zeros(self.count, bool)
+        truncated = np.zeros(self.count, bool)
+        infos = []
+        for index, (env, action) in enumerate(zip(self.envs, actions)):
+            rewards[index], terminated[index], truncated[index], info = env.advance(int(action))
+            if terminated[index] or truncated[index]:
+                info['final_observation'] = env.observe()
+                env.start()
+            env.observe(self.obs[index])
+            infos.append(info)
+        return self.obs.copy(), rewards, terminated, truncated, infos
+
+    def sample_actions(self):
+        """每个游戏的随机动作"""
+        return np.array([env.sample_action() for env in self.envs])
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="测量环境的步进吞吐量")
+    parser.add_argument('-n', '--count', type=int, default=16, help="并行的游戏数")
+    parser.add_argument('--steps', type=int, default=2000, help="步数")
+    parser.add_argument('--obs', choices=['features', 'pixels'], default='features',
+                        help="观测类型")
+    parser.add_argument('--backend', choices=['sprites', 'arrays'], default='sprites',
+                        help="实体后端")
+    args = parser.parse_args()
+
+    envs = VectorShooterEnv(args.count, seed=0, obs_type=args.obs, entity_backend=args.backend)
+    envs.reset()
+    start = time.perf_counter()
+    episodes = 0
+    for _ in range(args.steps):
+        _, _, terminated, truncated, _ = envs.step(envs.sample_actions())
+        episodes += int(terminated.sum() + truncated.sum())
+    elapsed = time.perf_counter() - start
+    print(f"{args.count * args.steps} 步，用时 {elapsed:.2f} 秒，"
+          f"{args.count * args.steps / elapsed:.0f} 步/秒，结束 {episodes} 局")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+📈 多人对战服务器压测
+
+模拟大量自动操控的客户端连接服务器，结束时查询服务器统计，报告每帧耗时、CPU 负载
+和按负载估算的单核可承载房间数（60 帧/秒）：
+
+    python loadtest.py --bots 400                  # 启动本地服务器子进程并连接 400 个客户端
+    python loadtest.py --connect 1.2.3.4:7777      # 压测已经在运行的服务器
+    python loadtest.py --offline --rooms 100       # 不走网络，只测房间推进与增量编码的开销
+
+大部分客户端只统计收到的字节数而不解析增量（--decode 个客户端完整解析），
+避免压测进程本身的开销掩盖服务器的瓶颈。
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import numpy as np
+
+from client import run_bot
+from main import FPS
+from protocol import STATS, STATS_REQUEST, pack, read_message
+from server import MAX_PLAYERS, READY, SEND_INTERVAL, Room
+
+
+async def query_stats(host, port):
+    """单独建立一条连接查询服务器统计"""
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(pack(STATS_REQUEST))
+    try:
+        kind, body = await read_message(reader)
+    finally:
+        writer.close()
+    if kind != STATS:
+        raise ConnectionError("服务器没有返回统计信息")
+    return json.loads(body)
+
+
+def start_server(send_interval):
+    """启动服务器子进程，返回 (进程, 端口)"""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+         '--host', '127.0.0.1', '--port', '0', '--send-interval', str(send_interval)],
+        stdout=subprocess.PIPE, text=True)
+    # 跳过 pygame 的欢迎信息，等到服务器打印监听地址
+    for line in process.stdout:
+        if line.startswith(READY):
+            return process, int(line.rsplit(':', 1)[1])
+    process.kill()
+    raise RuntimeError("服务器启动失败")
+
+
+async def run_online(host, port, bots, duration, decode, ramp):
+    """连接 bots 个客户端（ramp 秒内逐个加入），运行 duration 秒后汇总"""
+    tasks = []
+    for index in range(bots):
+        tasks.append(asyncio.ensure_future(
+            run_bot(host, port, duration=duration, decode=index < decode, seed=index)))
+        await asyncio.sleep(ramp / bots)
+    # 所有客户端都在线后再取一次统计
+    await asyncio.sleep(max(0.0, duration - ramp - 1.0))
+    stats = await query_stats(host, port)
+    clients = [client for client in await asyncio.gather(*tasks, return_exceptions=True)
+               if not isinstance(client, BaseException)]
+    received = sum(client.bytes_received for client in clients)
+    return {
+        'bots': bots,
+        'connected': len(clients),
+        'duration': duration,
+        'received_kbps_per_client': received * 8 / 1000 / duration / max(len(clients), 1),
+        'server': stats,
+    }
+
+
+def run_offline(rooms, players, seconds, send_interval, seed=0):
+    """不走网络：在本进程内推进 rooms 个房间（每间 players 名随机操控的玩家）并编码增量"""
+    rng = random.Random(seed)
+    room_list = []
+    for index in range(rooms):
+        room = Room(index, send_interval, seed=seed + index)
+        for pid in range(players):
+            room.game.add_player(pid)
+        room.game.start_game()
+        room_list.append(room)
+
+    ticks = int(seconds * FPS)
+    tick_times = np.zeros(ticks)
+    start_cpu = time.thread_time()
+    for tick in range(ticks):
+        start = time.perf_counter()
+        for room in room_list:
+            if tick % 6 == 0:
+                for pid in range(players):
+                    room.game.set_input(pid, rng.choice((-1, 0, 1)), True)
+            room.tick()
+        tick_times[tick] = (time.perf_counter() - start) * 1000
+    cpu = time.thread_time() - start_cpu
+    per_room_ms = cpu / ticks / rooms * 1000
+    messages = sum(room.messages for room in room_list)
+    encoded = sum(room.encoded_bytes for room in room_list)
+    return {
+        'rooms': rooms,
+        'players_per_room': players,
+        'ticks': ticks,
+        'tick_mean_ms': float(tick_times.mean()),
+        'tick_p99_ms': float(np.percentile(tick_times, 99)),
+        'room_tick_ms': per_room_ms,
+        'rooms_per_core': 1000 / FPS / per_room_ms,
+        'message_bytes_mean': encoded / max(messages, 1),
+        'send_kbps_per_client': encoded * 8 / 1000 / max(messages, 1) * FPS / send_interval,
+    }
+
+
+def print_summary(result):
+    server = result.get('server', result)
+    print(f"房间 {server['rooms']}  每帧 mean {server['tick_mean_ms']:.3f} ms  "
+          f"p99 {server['tick_p99_ms']:.3f} ms")
+    if 'room_tick_ms' in result:
+        print(f"单个房间每帧 {result['room_tick_ms']:.3f} ms，"
+              f"平均每条增量 {result['message_bytes_mean']:.0f} 字节"
+              f"（每个客户端 {result['send_kbps_per_client']:.1f} kbps）")
+    else:
+        print(f"客户端 {result['connected']}/{result['bots']}  负载 {server['load']:.1%}  "
+              f"丢弃帧 {server['dropped_ticks']}  跳过发送 {server['skipped_sends']}  "
+              f"每个客户端接收 {result['received_kbps_per_client']:.1f} kbps")
+    if server['rooms_per_core']:
+        print(f"估算单核可承载 {server['rooms_per_core']:.0f} 个房间（{FPS} 帧/秒）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多人对战服务器压测")
+    parser.add_argument('--bots', type=int, default=200, help="客户端数")
+    parser.add_argument('--duration', type=float, default=20.0, help="压测秒数")
+    parser.add_argument('--ramp', type=float, default=5.0, help="客户端在几秒内陆续加入")
+    parser.add_argument('--decode', type=int, default=8, help="完整解析增量的客户端数")
+    parser.add_argument('--connect', metavar='HOST:PORT', default=None,
+                        help="连接已有的服务器（默认启动本地子进程）")
+    parser.add_argument('--send-interval', type=int, default=SEND_INTERVAL,
+                        help="每隔几帧广播一次（只对本地启动的服务器和 --offline 有效）")
+    parser.add_argument('--offline', action='store_true', help="不走网络，只测房间推进与编码")
+    parser.add_argument('--rooms', type=int, default=50, help="--offline 时的房间数")
+    parser.add_argument('--players', type=int, default=MAX_PLAYERS,
+                        help="--offline 时每个房间的玩家数")
+    parser.add_argument('-o', '--output', default=None, help="结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.offline:
+        result = run_offline(args.rooms, args.players, args.duration, args.send_interval)
+    else:
+        process = None
+        if args.connect:
+            host, port = args.connect.rsplit(':', 1)
+            port = int(port)
+        else:
+            process, port = start_server(args.send_interval)
+            host = '127.0.0.1'
+        try:
+            result = asyncio.run(run_online(host, port, args.bots, args.duration,
+                                            args.decode, min(args.ramp, args.duration / 2)))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    print_summary(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"结果已写入 {args.output}")
@@ -5,20 +5,57 @@
 """
 
 import pygame
+import copy
 import random
 import sys
-import os
+import csv
+import json
+import time
+import hashlib
+import struct
+from collections import deque
+from contextlib import nullcontext
 from enum import Enum
 import math
 
-# 初始化 Pygame
-pygame.init()
-pygame.mixer.init()
+from render import RENDERERS, NullRenderer, RenderPipeline, SoftwareRenderer, create_renderer
+from capture import FrameCapture, print_stats as print_capture_stats
+from replay import Recorder
+from scores import ScoreStore, atomic_write
+
+try:
+    import numpy as np
+except ImportError:
+    # 没有 NumPy 时星空退回逐个对象更新
+    np = None
+
+# Pygame 的各个子系统都按需初始化：导入本模块和无界面模拟不做任何 SDL 初始化
+def init_display():
+    """初始化显示子系统（创建窗口前调用）"""
+    if not pygame.display.get_init():
+        pygame.display.init()
+
+def init_audio():
+    """初始化音频，返回是否成功"""
+    if pygame.mixer.get_init():
+        return True
+    try:
+        pygame.mixer.init()
+    except pygame.error:
+        # 没有音频设备（如 CI 服务器）时忽略
+        return False
+    return True
 
 # 游戏常量
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 FPS = 60
+# 一个物理步的时长（毫秒）；插值模式下单帧最多追赶的时间，避免卡顿后连续追帧
+STEP_MS = 1000 / FPS
+MAX_FRAME_MS = 250
+
+# 预渲染图像的磁盘缓存（冷启动时免去绘制精灵和加载字体）
+SURFACE_CACHE_FILE = 'surfaces.cache'
 
 # 颜色定义
 WHITE = (255, 255, 255)
@@ -30,6 +67,43 @@ YELLOW = (255, 255, 50)
 PURPLE = (200, 50, 255)
 ORANGE = (255, 150, 50)
 
+# 敌机类型：尺寸、速度范围、生命值、分值、颜色和射击方式
+# fire: patterns 为依次循环的弹幕样式，interval 为两次齐射间隔的帧数，
+#       speed 为子弹速度，count 为每次齐射的子弹数
+ENEMY_KINDS = ['basic', 'fast', 'tank']
+ENEMY_TYPES = {
+    'basic': {'size': (40, 35), 'speed': (2, 3), 'health': 1, 'score': 10, 'color': RED,
+              'fire': {'patterns': ('aimed',), 'interval': 180, 'speed': 4, 'count': 1}},
+    'fast': {'size': (35, 30), 'speed': (4, 6), 'health': 1, 'score': 15, 'color': PURPLE,
+             'fire': {'patterns': ('spread',), 'interval': 210, 'speed': 5, 'count': 3,
+                      'spread': 0.6}},
+    'tank': {'size': (50, 45), 'speed': (1, 2), 'health': 3, 'score': 25, 'color': ORANGE,
+             'fire': {'patterns': ('radial', 'spiral', 'spiral'), 'interval': 90, 'speed': 3,
+                      'count': 10, 'turn': 0.2}},
+}
+
+
+def roll_enemy(rng=random):
+    """
+    随机生成一架敌机的参数 (类型, 速度, x, y, 射击冷却)
+    两种实体后端和刷怪时间表共用，随机数的消耗顺序固定
+    """
+    kind = rng.choice(ENEMY_KINDS)
+    spec = ENEMY_TYPES[kind]
+    speed = rng.uniform(*spec['speed'])
+    x = rng.randint(0, SCREEN_WIDTH - spec['size'][0])
+    y = rng.randint(-100, -40)
+    interval = spec['fire']['interval']
+    return kind, speed, x, y, rng.randint(interval // 2, interval)
+
+# 子弹尺寸
+BULLET_SIZE = (4, 15)
+ENEMY_BULLET_SIZE = (8, 8)
+ENEMY_BULLET_DAMAGE = 10
+
+# 碰撞内核：配对数量不超过该值时直接广播出完整的相交矩阵
+COLLIDE_DENSE_PAIRS = 4096
+
 # 游戏状态
 class GameState(Enum):
     MENU = 1
@@ -37,14 +111,202 @@ class GameState(Enum):
     PAUSED = 3
     GAME_OVER = 4
 
-class Player(pygame.sprite.Sprite):
-    """玩家飞船类"""
+class SurfaceCache:
+    """
+    精灵图像缓存
+    同类精灵外观完全相同，图像只在第一次用到时绘制一次，之后共享同一个 Surface
+
+    open() 之后绘制结果还会保存到磁盘，下次启动直接读取像素而不必重新绘制（文字也不必加载字体）。
+    文件头记录本模块源码和 pygame 版本的哈希，代码或版本变化后整个文件作废；
+    每条记录另带像素数据的哈希，损坏的记录读取时丢弃并重新绘制
+    """
+    MAGIC = b'SSCACHE1'
+
     def __init__(self):
+        self.surfaces = {}
+        # 磁盘缓存：path 为 None 时不读写文件
+        self.path = None
+        self.stored = {}
+        self.changed = False
+        self.loads = 0
+        self.builds = 0
+
+    def get(self, key, builder, *args):
+        """按 key 取图像，不存在时调用 builder(*args) 绘制"""
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = self.load(key)
+            if surface is None:
+                surface = builder(*args)
+                self.builds += 1
+                if self.path is not None:
+                    self.store(key, surface)
+            # 已有显示窗口时转换为屏幕像素格式，加快 blit
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+            self.surfaces[key] = surface
+        return surface
+
+    def clear(self):
+        """清空缓存"""
+        self.surfaces.clear()
+
+    @staticmethod
+    def entry_name(key):
+        """磁盘记录的索引名"""
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def version():
+        """缓存版本：本模块源码与 pygame 版本的哈希"""
+        digest = hashlib.sha256(pygame.version.ver.encode())
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def open(self, path=SURFACE_CACHE_FILE):
+        """启用磁盘缓存并读取已有记录（文件不存在、损坏或已过期时从空缓存开始）"""
+        self.path = path
+        self.stored = {}
+        self.changed = False
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            if data[:len(self.MAGIC)] != self.MAGIC:
+                raise ValueError("不是图像缓存文件")
+            offset = len(self.MAGIC)
+            (index_size,) = struct.unpack_from('<I', data, offset)
+            offset += 4
+            index = json.loads(data[offset:offset + index_size])
+            offset += index_size
+            if index['version'] != self.version():
+                # 代码或 pygame 版本变了，旧图像可能已经不对
+                self.changed = True
+                return
+            for name, (start, width, height, digest) in index['entries'].items():
+                start += offset
+                self.stored[name] = (width, height, data[start:start + width * height * 4], digest)
+        except (OSError, ValueError, KeyError, TypeError, struct.error):
+            self.changed = True
+
+    def load(self, key):
+        """从磁盘记录恢复图像，没有记录或校验失败时返回 None"""
+        if not self.stored:
+            return None
+        name = self.entry_name(key)
+        entry = self.stored.get(name)
+        if entry is None:
+            return None
+        width, height, pixels, digest = entry
+        if len(pixels) != width * height * 4 or hashlib.sha256(pixels).hexdigest() != digest:
+            del self.stored[name]
+            self.changed = True
+            return None
+        self.loads += 1
+        return pygame.image.frombuffer(pixels, (width, height), 'RGBA').copy()
+
+    def store(self, key, surface):
+        """记下新绘制的图像，save() 时写入磁盘"""
+        pixels = pygame.image.tostring(surface, 'RGBA')
+        self.stored[self.entry_name(key)] = (surface.get_width(), surface.get_height(), pixels,
+                                             hashlib.sha256(pixels).hexdigest())
+        self.changed = True
+
+    def save(self):
+        """有新记录时把缓存写回磁盘（先写临时文件再原子替换）"""
+        if self.path is None or not self.changed:
+            return
+        entries = {}
+        blobs = []
+        start = 0
+        for name, (width, height, pixels, digest) in self.stored.items():
+            entries[name] = (start, width, height, digest)
+            blobs.append(pixels)
+            start += len(pixels)
+        index = json.dumps({'version': self.version(), 'entries': entries}).encode('utf-8')
+        try:
+            atomic_write(self.path, b''.join([self.MAGIC, struct.pack('<I', len(index)), index]
+                                             + blobs))
+        except OSError:
+            # 缓存只是加速手段，写不进去也不影响游戏
+            return
+        self.changed = False
+
+surface_cache = SurfaceCache()
+
+class FontCache:
+    """
+    字体缓存
+    pygame.font 在第一次用到字体时才初始化，每个字号只加载一次
+    """
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, size):
+        """取指定字号的默认字体"""
+        if not pygame.font.get_init():
+            # 首次使用，或 pygame.quit() 之后旧字体已失效
+            pygame.font.init()
+            self.fonts.clear()
+        font = self.fonts.get(size)
+        if font is None:
+            font = self.fonts[size] = pygame.font.Font(None, size)
+        return font
+
+font_cache = FontCache()
+
+def render_text(text, size, color):
+    """用默认字体渲染一行文字"""
+    return font_cache.get(size).render(text, True, color)
+
+class ObjectPool:
+    """
+    对象池
+    被 kill() 的精灵归还到池中，下次 acquire() 时调用 reset() 重新使用
+    """
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.hits = 0
+        self.misses = 0
+
+    def acquire(self, *args):
+        """取出一个对象，池为空时新建"""
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.hits += 1
+        else:
+            obj = self.cls(*args)
+            obj.pool = self
+            self.misses += 1
+        return obj
+
+    def release(self, obj):
+        """归还对象"""
+        self.free.append(obj)
+
+    def stats(self):
+        """命中/未命中次数与空闲对象数"""
+        return {'hits': self.hits, 'misses': self.misses, 'free': len(self.free)}
+
+class PooledSprite(pygame.sprite.DirtySprite):
+    """可回收的精灵：kill() 时自动归还所属对象池"""
+    pool = None
+
+    def kill(self):
+        if self.alive():
+            super().kill()
+            if self.pool is not None:
+                self.pool.release(self)
+
+class Player(pygame.sprite.DirtySprite):
+    """玩家飞船类"""
+    def __init__(self, now=0):
         super().__init__()
         self.width = 50
         self.height = 40
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.draw_ship()
+        self.image = surface_cache.get('player', self.draw_ship)
         self.rect = self.image.get_rect()
         self.rect.centerx = SCREEN_WIDTH // 2
         self.rect.bottom = SCREEN_HEIGHT - 20
@@ -55,33 +317,38 @@ class Player(pygame.sprite.Sprite):
         self.score = 0
         self.level = 1
         self.power_level = 1
-        self.last_shot = pygame.time.get_ticks()
+        self.last_shot = now
         self.shoot_delay = 250
         self.invincible = False
         self.invincible_timer = 0
         self.invincible_duration = 2000
+        # 局部刷新模式下每帧都重绘（精灵一直在移动）
+        self.dirty = 2
 
-    def draw_ship(self):
-        """绘制玩家飞船"""
+    @staticmethod
+    def draw_ship():
+        """绘制玩家飞船图像"""
+        image = pygame.Surface((50, 40), pygame.SRCALPHA)
         # 主体
-        pygame.draw.polygon(self.image, BLUE, [
+        pygame.draw.polygon(image, BLUE, [
             (25, 0),
             (0, 40),
             (50, 40)
         ])
         # 驾驶舱
-        pygame.draw.ellipse(self.image, (100, 200, 255), (15, 10, 20, 15))
+        pygame.draw.ellipse(image, (100, 200, 255), (15, 10, 20, 15))
         # 引擎火焰
-        pygame.draw.polygon(self.image, ORANGE, [
+        pygame.draw.polygon(image, ORANGE, [
             (10, 40),
             (25, 55),
             (40, 40)
         ])
         # 装饰线
-        pygame.draw.line(self.image, WHITE, (25, 0), (25, 40), 2)
+        pygame.draw.line(image, WHITE, (25, 0), (25, 40), 2)
+        return image
 
-    def update(self):
-        """更新玩家状态"""
+    def update(self, now):
+        """更新玩家状态（now 为游戏逻辑时钟，毫秒）"""
         # 移动
         self.rect.x += self.speed_x
         
@@ -93,10 +360,13 @@ class Player(pygame.sprite.Sprite):
         
         # 无敌时间
         if self.invincible:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.invincible_timer > self.invincible_duration:
+            if now - self.invincible_timer > self.invincible_duration:
                 self.invincible = False
 
+    def velocity(self):
+        """每个物理步的位移 (vx, vy)"""
+        return self.speed_x, 0
+
     def move_left(self):
         """向左移动"""
         self.speed_x = -self.speed
@@ -109,98 +379,97 @@ class Player(pygame.sprite.Sprite):
         """停止移动"""
         self.speed_x = 0
 
-    def shoot(self):
-        """发射子弹"""
-        current_time = pygame.time.get_ticks()
-        if current_time - self.last_shot > self.shoot_delay:
-            self.last_shot = current_time
-            bullets = []
+    def fire(self, now):
+        """开火：冷却结束时返回各炮口位置（子弹中心 x、底边 y），否则返回空列表"""
+        if now - self.last_shot > self.shoot_delay:
+            self.last_shot = now
             
             if self.power_level == 1:
-                bullets.append(Bullet(self.rect.centerx, self.rect.top))
+                return [(self.rect.centerx, self.rect.top)]
             elif self.power_level == 2:
-                bullets.append(Bullet(self.rect.left, self.rect.top))
-                bullets.append(Bullet(self.rect.right, self.rect.top))
+                return [(self.rect.left, self.rect.top),
+                        (self.rect.right, self.rect.top)]
             else:
-                bullets.append(Bullet(self.rect.centerx, self.rect.top))
-                bullets.append(Bullet(self.rect.left, self.rect.centery))
-                bullets.append(Bullet(self.rect.right, self.rect.centery))
-            
-            return bullets
+                return [(self.rect.centerx, self.rect.top),
+                        (self.rect.left, self.rect.centery),
+                        (self.rect.right, self.rect.centery)]
         return []
 
+    def shoot(self, now):
+        """发射子弹"""
+        return [bullet_pool.acquire(x, y) for x, y in self.fire(now)]
+
     def power_up(self):
         """升级武器"""
         self.power_level = min(self.power_level + 1, 3)
 
-    def take_damage(self, damage):
+    def take_damage(self, damage, now):
         """受到伤害"""
         if not self.invincible:
             self.health -= damage
             self.invincible = True
-            self.invincible_timer = pygame.time.get_ticks()
+            self.invincible_timer = now
             if self.health <= 0:
                 return True
         return False
 
-class Enemy(pygame.sprite.Sprite):
+class Enemy(PooledSprite):
     """敌机类"""
-    def __init__(self, difficulty=1):
+    def __init__(self, difficulty=1, rng=random, params=None):
         super().__init__()
-        self.type = random.choice(['basic', 'fast', 'tank'])
-        
-        if self.type == 'basic':
-            self.width = 40
-            self.height = 35
-            self.speed = random.uniform(2, 3)
-            self.health = 1
-            self.score = 10
-            color = RED
-        elif self.type == 'fast':
-            self.width = 35
-            self.height = 30
-            self.speed = random.uniform(4, 6)
-            self.health = 1
-            self.score = 15
-            color = PURPLE
-        else:  # tank
-            self.width = 50
-            self.height = 45
-            self.speed = random.uniform(1, 2)
-            self.health = 3
-            self.score = 25
-            color = ORANGE
-        
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.draw_enemy(color)
+        self.reset(difficulty, rng, params)
+
+    def reset(self, difficulty=1, rng=random, params=None):
+        """
+        初始化（或回收后重新初始化）敌机
+        params 为 roll_enemy() 格式的 (类型, 速度, x, y, 射击冷却)，为空时用 rng 随机生成
+        """
+        self.type, self.speed, x, y, self.fire_timer = params or roll_enemy(rng)
+        spec = ENEMY_TYPES[self.type]
+        self.width, self.height = spec['size']
+        self.health = spec['health']
+        self.score = spec['score']
+        
+        self.image = surface_cache.get(('enemy', self.type), self.draw_enemy, self.type)
         self.rect = self.image.get_rect()
-        self.rect.x = random.randint(0, SCREEN_WIDTH - self.width)
-        self.rect.y = random.randint(-100, -40)
+        self.rect.x = x
+        self.rect.y = y
         self.difficulty = difficulty
+        
+        # 已齐射次数（射击冷却 fire_timer 以帧计）
+        self.volleys = 0
+        self.dirty = 2
 
-    def draw_enemy(self, color):
-        """绘制敌机"""
-        if self.type == 'basic':
-            pygame.draw.polygon(self.image, color, [
-                (self.width//2, self.height),
+    @staticmethod
+    def draw_enemy(kind):
+        """绘制敌机图像"""
+        spec = ENEMY_TYPES[kind]
+        width, height = spec['size']
+        color = spec['color']
+        image = pygame.Surface((width, height), pygame.SRCALPHA)
+        if kind == 'basic':
+            pygame.draw.polygon(image, color, [
+                (width//2, height),
                 (0, 0),
-                (self.width, 0)
+                (width, 0)
             ])
-            pygame.draw.circle(self.image, (255, 200, 200), 
-                            (self.width//2, self.height//3), 5)
-        elif self.type == 'fast':
-            pygame.draw.polygon(self.image, color, [
-                (self.width//2, self.height),
+            pygame.draw.circle(image, (255, 200, 200), 
+                            (width//2, height//3), 5)
+        elif kind == 'fast':
+            pygame.draw.polygon(image, color, [
+                (width//2, height),
                 (0, 5),
-                (self.width, 5)
+                (width, 5)
             ])
-            pygame.draw.line(self.image, WHITE, (0, 5), (self.width, 5), 2)
+            pygame.draw.line(image, WHITE, (0, 5), (width, 5), 2)
         else:  # tank
-            pygame.draw.rect(self.image, color, (0, 0, self.width, self.height))
-            pygame.draw.rect(self.image, (color[0]+30, color[1]+30, color[2]+30), 
-                           (5, 5, self.width-10, self.height-10))
-            pygame.draw.circle(self.image, BLACK, 
-                             (self.width//2, self.height//2), 8)
+            pygame.draw.rect(image, color, (0, 0, width, height))
+            light = tuple(min(c + 30, 255) for c in color)
+            pygame.draw.rect(image, light, 
+                           (5, 5, width-10, height-10))
+            pygame.draw.circle(image, BLACK, 
+                             (width//2, height//2), 8)
+        return image
 
     def update(self):
         """更新敌机位置"""
@@ -209,46 +478,105 @@ class Enemy(pygame.sprite.Sprite):
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
+    def velocity(self):
+        """每个物理步的位移 (vx, vy)"""
+        return 0, self.speed * (1 + self.difficulty * 0.1)
+
+    def tick_fire(self, floor):
+        """
+        射击冷却计时：冷却结束、完全进入屏幕且位于 floor 上方时
+        重新计时并返回本次齐射的序号，否则返回 None
+        """
+        self.fire_timer -= 1
+        if self.fire_timer <= 0 and self.rect.top >= 0 and self.rect.bottom < floor:
+            self.fire_timer = ENEMY_TYPES[self.type]['fire']['interval']
+            self.volleys += 1
+            return self.volleys - 1
+        return None
+
     def hit(self):
         """被击中"""
         self.health -= 1
         return self.health <= 0
 
-class Bullet(pygame.sprite.Sprite):
+class Bullet(PooledSprite):
     """子弹类"""
-    def __init__(self, x, y, is_enemy=False):
+    def __init__(self, x, y, is_enemy=False, vx=0, vy=0):
         super().__init__()
-        self.width = 4
-        self.height = 15
+        self.reset(x, y, is_enemy, vx, vy)
+
+    def reset(self, x, y, is_enemy=False, vx=0, vy=0):
+        """
+        初始化（或回收后重新初始化）子弹
+        玩家子弹以 (x, y) 为底边中点竖直向上飞行；
+        敌机子弹以 (x, y) 为中心，按每帧 (vx, vy) 沿任意方向飞行
+        """
         self.is_enemy = is_enemy
         
         if is_enemy:
-            color = RED
-            self.speed = 5
+            self.width, self.height = ENEMY_BULLET_SIZE
+            self.image = surface_cache.get('enemy_bullet', self.draw_enemy_bullet)
+            self.rect = self.image.get_rect(center=(x, y))
+            self.vx = vx
+            self.speed = vy
+            # 斜向飞行时用浮点数累计位置
+            self.fx = float(self.rect.x)
+            self.fy = float(self.rect.y)
         else:
-            color = YELLOW
+            self.width, self.height = BULLET_SIZE
+            self.image = surface_cache.get(('bullet', YELLOW), self.draw_bullet, YELLOW)
+            self.rect = self.image.get_rect()
+            self.rect.centerx = x
+            self.rect.bottom = y
+            self.vx = 0
             self.speed = -10
-        
-        self.image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        pygame.draw.ellipse(self.image, color, (0, 0, self.width, self.height))
-        pygame.draw.ellipse(self.image, WHITE, (1, 1, self.width-2, self.height-2))
-        
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.bottom = y if not is_enemy else y
+        self.dirty = 2
 
     def update(self):
         """更新子弹位置"""
+        if self.is_enemy:
+            self.fx += self.vx
+            self.fy += self.speed
+            self.rect.x = self.fx
+            self.rect.y = self.fy
+            if (self.rect.right < 0 or self.rect.left > SCREEN_WIDTH or
+                    self.rect.bottom < 0 or self.rect.top > SCREEN_HEIGHT):
+                self.kill()
+            return
+        
         self.rect.y += self.speed
         
         if self.rect.bottom < 0 or self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
-class PowerUp(pygame.sprite.Sprite):
+    def velocity(self):
+        """每个物理步的位移 (vx, vy)"""
+        return self.vx, self.speed
+
+    @staticmethod
+    def draw_bullet(color):
+        """绘制子弹图像"""
+        width, height = BULLET_SIZE
+        image = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.ellipse(image, color, (0, 0, width, height))
+        pygame.draw.ellipse(image, WHITE, (1, 1, width-2, height-2))
+        return image
+
+    @staticmethod
+    def draw_enemy_bullet():
+        """绘制敌机子弹图像"""
+        width, height = ENEMY_BULLET_SIZE
+        image = pygame.Surface((width, height), pygame.SRCALPHA)
+        pygame.draw.circle(image, RED, (width//2, height//2), width//2)
+        pygame.draw.circle(image, (255, 200, 200), (width//2, height//2), width//4)
+        return image
+
+class PowerUp(pygame.sprite.DirtySprite):
     """道具类"""
-    def __init__(self, x, y):
+    def __init__(self, x, y, rng=random, kind=None):
         super().__init__()
-        self.type = random.choice(['health', 'power', 'score'])
+        # kind 为空时随机选择类型（恢复快照时直接指定，不消耗随机数）
+        self.type = kind or rng.choice(['health', 'power', 'score'])
         self.size = 25
         
         if self.type == 'health':
@@ -261,19 +589,13 @@ class PowerUp(pygame.sprite.Sprite):
             self.color = YELLOW
             self.symbol = '$'
         
-        self.image = pygame.Surface((self.size, self.size), pygame.SRCALPHA)
-        pygame.draw.circle(self.image, self.color, (self.size//2, self.size//2), self.size//2)
-        pygame.draw.circle(self.image, WHITE, (self.size//2, self.size//2), self.size//2-3)
-        
-        font = pygame.font.Font(None, 20)
-        text = font.render(self.symbol, True, self.color)
-        text_rect = text.get_rect(center=(self.size//2, self.size//2))
-        self.image.blit(text, text_rect)
-        
+        self.image = surface_cache.get(('power_up', self.type), self.draw_power_up,
+                                       self.size, self.color, self.symbol)
         self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.centery = y
         self.speed = 2
+        self.dirty = 2
 
     def update(self):
         """更新道具位置"""
@@ -281,39 +603,207 @@ class PowerUp(pygame.sprite.Sprite):
         if self.rect.top > SCREEN_HEIGHT:
             self.kill()
 
+    def velocity(self):
+        """每个物理步的位移 (vx, vy)"""
+        return 0, self.speed
+
+    @staticmethod
+    def draw_power_up(size, color, symbol):
+        """绘制道具图像"""
+        image = pygame.Surface((size, size), pygame.SRCALPHA)
+        pygame.draw.circle(image, color, (size//2, size//2), size//2)
+        pygame.draw.circle(image, WHITE, (size//2, size//2), size//2-3)
+        
+        text = render_text(symbol, 20, color)
+        text_rect = text.get_rect(center=(size//2, size//2))
+        image.blit(text, text_rect)
+        return image
+
 class Star:
     """背景星星类"""
-    def __init__(self):
-        self.x = random.randint(0, SCREEN_WIDTH)
-        self.y = random.randint(0, SCREEN_HEIGHT)
-        self.speed = random.uniform(0.5, 2)
-        self.size = random.randint(1, 2)
-        self.brightness = random.randint(100, 255)
+    def __init__(self, rng=random):
+        self.rng = rng
+        self.x = rng.randint(0, SCREEN_WIDTH)
+        self.y = rng.randint(0, SCREEN_HEIGHT)
+        self.speed = rng.uniform(0.5, 2)
+        self.size = rng.randint(1, 2)
+        self.brightness = rng.randint(100, 255)
 
     def update(self):
         """更新星星位置"""
         self.y += self.speed
         if self.y > SCREEN_HEIGHT:
             self.y = 0
-            self.x = random.randint(0, SCREEN_WIDTH)
+            self.x = self.rng.randint(0, SCREEN_WIDTH)
 
-    def draw(self, surface):
-        """绘制星星"""
+    def draw(self, surface, lag=0):
+        """绘制星星（lag 为插值渲染时回退的物理步比例）"""
         color = (self.brightness, self.brightness, self.brightness)
-        pygame.draw.circle(surface, color, (int(self.x), int(self.y)), self.size)
+        pygame.draw.circle(surface, color, (int(self.x), int(self.y - self.speed * lag)),
+                           self.size)
+
+class Starfield:
+    """
+    背景星空
+    安装了 NumPy 时，位置、速度、大小和亮度都保存在数组里，每帧一次向量化运算完成更新，
+    绘制时通过 surfarray 直接写入屏幕像素；否则退回逐个 Star 对象
+    """
+    # 星星数量达到该值时才用 surfarray 批量绘制
+    VECTOR_DRAW_MIN = 200
+
+    def __init__(self, count=100, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, seed=None):
+        self.count = count
+        self.width = width
+        self.height = height
+        if np is None:
+            rng = random.Random(seed)
+            self.stars = [Star(rng) for _ in range(count)]
+            return
+        
+        self.stars = None
+        self.rng = np.random.default_rng(seed)
+        self.x = self.rng.integers(0, width + 1, count).astype(np.intp)
+        self.y = self.rng.integers(0, height + 1, count).astype(float)
+        self.speed = self.rng.uniform(0.5, 2, count)
+        self.size = self.rng.integers(1, 3, count)
+        self.brightness = self.rng.integers(100, 256, count).astype(np.uint8)
+        self.stamps = {size: self.circle_offsets(size) for size in (1, 2)}
+        # 按像素格式缓存的灰度映射表（快照与原对象共用）
+        self.gray_tables = {}
 
-class Explosion(pygame.sprite.Sprite):
+    @staticmethod
+    def circle_offsets(radius):
+        """pygame.draw.circle 在给定半径下覆盖的像素偏移"""
+        span = radius * 2 + 1
+        surface = pygame.Surface((span, span))
+        pygame.draw.circle(surface, WHITE, (radius, radius), radius)
+        return [(x - radius, y - radius) for x in range(span) for y in range(span)
+                if surface.get_at((x, y))[0]]
+
+    def update(self):
+        """更新所有星星位置"""
+        if self.stars is not None:
+            for star in self.stars:
+                star.update()
+            return
+        
+        self.y += self.speed
+        wrapped = self.y > self.height
+        count = int(wrapped.sum())
+        if count:
+            self.y[wrapped] = 0
+            self.x[wrapped] = self.rng.integers(0, self.width + 1, count)
+
+    def points(self, lag=0):
+        """每颗星星的 (x, y, 半径, 亮度)，供不直接写像素的渲染后端使用"""
+        if self.stars is not None:
+            return [(int(star.x), int(star.y - star.speed * lag), star.size, star.brightness)
+                    for star in self.stars]
+        y = self.y - self.speed * lag if lag else self.y
+        return zip(self.x.tolist(), y.astype(np.intp).tolist(), self.size.tolist(),
+                   self.brightness.tolist())
+
+    def draw(self, surface, lag=0):
+        """绘制星空（lag 为插值渲染时回退的物理步比例）"""
+        if self.stars is not None:
+            for star in self.stars:
+                star.draw(surface, lag)
+            return
+        y = self.y - self.speed * lag if lag else self.y
+        if self.count < self.VECTOR_DRAW_MIN or surface.get_bytesize() < 3:
+            # 星星很少时逐个绘制更快；surfarray 也不支持低色深表面
+            for x, y, size, brightness in zip(self.x, y, self.size, self.brightness):
+                color = (int(brightness),) * 3
+                pygame.draw.circle(surface, color, (int(x), int(y)), int(size))
+            return
+        
+        width, height = surface.get_size()
+        colors = self.gray_table(surface)[self.brightness]
+        ys = y.astype(np.intp)
+        pixels = pygame.surfarray.pixels2d(surface)
+        for size, offsets in self.stamps.items():
+            group = self.size == size
+            xs = self.x[group]
+            gy = ys[group]
+            gc = colors[group]
+            # 每个像素偏移对同尺寸的所有星星一次写入
+            for dx, dy in offsets:
+                px = xs + dx
+                py = gy + dy
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[inside], py[inside]] = gc[inside]
+        # 释放对屏幕像素的锁定
+        del pixels
+
+    def gray_table(self, surface):
+        """灰度值到屏幕像素值的映射表（按像素格式缓存）"""
+        key = (surface.get_bitsize(), surface.get_masks())
+        table = self.gray_tables.get(key)
+        if table is None:
+            table = self.gray_tables[key] = np.array(
+                [surface.map_rgb((v, v, v)) for v in range(256)], dtype=np.uint32)
+        return table
+
+    def snapshot(self):
+        """当前位置的副本（流水线渲染时交给渲染线程绘制，之后的 update 不会影响它）"""
+        frame = copy.copy(self)
+        if self.stars is not None:
+            frame.stars = [copy.copy(star) for star in self.stars]
+        else:
+            frame.x = self.x.copy()
+            frame.y = self.y.copy()
+        return frame
+
+class Explosion(PooledSprite):
     """爆炸效果类"""
+    # 每种尺寸的动画帧序列只绘制一次
+    frame_cache = {}
+
     def __init__(self, x, y, size=50):
         super().__init__()
+        self.reset(x, y, size)
+
+    def reset(self, x, y, size=50):
+        """初始化（或回收后重新初始化）爆炸效果"""
         self.size = size
         self.max_size = size
-        self.image = pygame.Surface((size, size), pygame.SRCALPHA)
-        self.rect = self.image.get_rect()
-        self.rect.centerx = x
-        self.rect.centery = y
         self.frame = 0
         self.max_frames = 20
+        self.frames = self.get_frames(size, self.max_frames)
+        self.center = (x, y)
+        self.image = self.frames[0]
+        self.rect = self.image.get_rect(center=self.center)
+        self.dirty = 2
+
+    @classmethod
+    def get_frames(cls, size, max_frames):
+        """取某个尺寸的全部动画帧"""
+        frames = cls.frame_cache.get((size, max_frames))
+        if frames is None:
+            frames = [surface_cache.get(('explosion', size, frame), cls.draw_frame,
+                                        size, frame, max_frames)
+                      for frame in range(max_frames)]
+            cls.frame_cache[(size, max_frames)] = frames
+        return frames
+
+    @staticmethod
+    def draw_frame(size, frame, max_frames):
+        """绘制一帧爆炸动画"""
+        if frame == 0:
+            return pygame.Surface((size, size), pygame.SRCALPHA)
+        
+        progress = frame / max_frames
+        alpha = int(255 * (1 - progress))
+        current_size = int(size * (1 + progress * 0.5))
+        
+        image = pygame.Surface((current_size, current_size), pygame.SRCALPHA)
+        colors = [ORANGE, YELLOW, RED]
+        color = colors[frame % len(colors)]
+        
+        pygame.draw.circle(image, (*color, alpha), 
+                         (current_size//2, current_size//2), 
+                         int(current_size//2 * (1 - progress * 0.3)))
+        return image
 
     def update(self):
         """更新爆炸动画"""
@@ -321,45 +811,797 @@ class Explosion(pygame.sprite.Sprite):
         if self.frame >= self.max_frames:
             self.kill()
         else:
-            progress = self.frame / self.max_frames
-            alpha = int(255 * (1 - progress))
-            current_size = int(self.max_size * (1 + progress * 0.5))
-            
-            self.image = pygame.Surface((current_size, current_size), pygame.SRCALPHA)
-            colors = [ORANGE, YELLOW, RED]
-            color = colors[self.frame % len(colors)]
-            
-            pygame.draw.circle(self.image, (*color, alpha), 
-                             (current_size//2, current_size//2), 
-                             int(current_size//2 * (1 - progress * 0.3)))
-            
-            self.rect = self.image.get_rect()
-            self.rect.centerx = self.rect.centerx
-            self.rect.centery = self.rect.centery
+            # 切换到下一帧，保持爆炸中心不变
+            self.image = self.frames[self.frame]
+            self.rect.size = self.image.get_size()
+            self.rect.center = self.center
+
+bullet_pool = ObjectPool(Bullet)
+enemy_pool = ObjectPool(Enemy)
+explosion_pool = ObjectPool(Explosion)
+
+def aimed_angles(fire, volley, x, y, target):
+    """瞄准目标；count 大于 1 时在 spread 弧度内扇形展开"""
+    base = math.atan2(target[1] - y, target[0] - x)
+    count = fire['count']
+    if count == 1:
+        return [base]
+    spread = fire.get('spread', 0.0)
+    return [base - spread / 2 + spread * i / (count - 1) for i in range(count)]
+
+def radial_angles(fire, volley, x, y, target):
+    """向四周均匀发射一圈"""
+    count = fire['count']
+    return [2 * math.pi * i / count for i in range(count)]
+
+def spiral_angles(fire, volley, x, y, target):
+    """一圈子弹，每次齐射旋转 turn 弧度，连续齐射形成螺旋"""
+    count = fire['count']
+    offset = volley * fire['turn']
+    return [offset + 2 * math.pi * i / count for i in range(count)]
+
+# 弹幕样式对应的发射角度函数
+EMITTERS = {
+    'aimed': aimed_angles,
+    'spread': aimed_angles,
+    'radial': radial_angles,
+    'spiral': spiral_angles,
+}
+
+def volley_velocities(kind, volley, x, y, target):
+    """某型敌机在 (x, y) 处第 volley 次齐射的各子弹速度 [(vx, vy), ...]"""
+    fire = ENEMY_TYPES[kind]['fire']
+    pattern = fire['patterns'][volley % len(fire['patterns'])]
+    speed = fire['speed']
+    return [(speed * math.cos(angle), speed * math.sin(angle))
+            for angle in EMITTERS[pattern](fire, volley, x, y, target)]
+
+def round_half_away(values):
+    """把浮点坐标数组按 pygame Rect 的规则取整（四舍五入，.5 远离零）"""
+    whole = np.trunc(values)
+    return (whole + np.copysign(np.abs(values - whole) >= 0.5, values)).astype(np.int64)
+
+class EntityStore:
+    """
+    结构数组（SoA）实体存储
+    每个字段是一段连续的 NumPy 数组，前 count 项有效；每帧整批推进位置，
+    越界的实体按掩码一次剔除（保持原有顺序），绘制时按类型编码共享同一张图像。
+    对外提供与精灵组相同的 update / draw / len 接口
+
+    每个实体还有一个递增的编号 uid（清空后也不会重复），存储顺序即 uid 顺序，
+    供网络同步等需要跨帧识别实体的场合使用
+    """
+    # (字段名, dtype)
+    FIELDS = (('x', 'i8'), ('y', 'i8'), ('w', 'i8'), ('h', 'i8'), ('vy', 'i8'), ('kind', 'i1'))
+
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.arrays = {name: np.zeros(capacity, dtype) for name, dtype in self.FIELDS}
+        self.arrays['uid'] = np.zeros(capacity, np.int64)
+        self.next_uid = 0
+        # 按类型编码索引的共享图像
+        self.images = []
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        """某个字段的有效部分（视图，可原地修改）"""
+        return self.arrays[name][:self.count]
+
+    def rects(self):
+        """所有实体的矩形，返回 (x, y, w, h) 四个数组"""
+        return self.column('x'), self.column('y'), self.column('w'), self.column('h')
+
+    def collide_rect(self, rect):
+        """与 rect 相交的实体序号（按存储顺序）"""
+        x, y, w, h = self.rects()
+        return np.flatnonzero((x < rect.right) & (x + w > rect.left) &
+                              (y < rect.bottom) & (y + h > rect.top))
+
+    def reserve(self, count):
+        """保证还能容纳 count 个新实体（容量不足时翻倍扩容）"""
+        needed = self.count + count
+        capacity = len(self.arrays['x'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name, array in self.arrays.items():
+            grown = np.zeros(capacity, array.dtype)
+            grown[:self.count] = array[:self.count]
+            self.arrays[name] = grown
+
+    def extend(self, **columns):
+        """批量追加实体，每个参数是一个字段的值序列（或标量）"""
+        count = max(np.size(values) for values in columns.values())
+        self.reserve(count)
+        start, end = self.count, self.count + count
+        for name, values in columns.items():
+            self.arrays[name][start:end] = values
+        self.arrays['uid'][start:end] = np.arange(self.next_uid, self.next_uid + count)
+        self.next_uid += count
+        self.count = end
+
+    def keep(self, mask):
+        """只保留掩码为 True 的实体"""
+        count = int(np.count_nonzero(mask))
+        if count == self.count:
+            return
+        for array in self.arrays.values():
+            array[:count] = array[:self.count][mask]
+        self.count = count
+
+    def remove(self, indices):
+        """删除指定序号的实体"""
+        if len(indices):
+            mask = np.ones(self.count, bool)
+            mask[indices] = False
+            self.keep(mask)
+
+    def empty(self):
+        """清空所有实体"""
+        self.count = 0
+
+    def offscreen(self):
+        """越界掩码（由子类定义）"""
+        return np.zeros(self.count, bool)
+
+    def update(self):
+        """整批推进位置并剔除越界实体"""
+        if not self.count:
+            return
+        y = self.column('y')
+        vy = self.column('vy')
+        if vy.dtype.kind == 'f':
+            y[:] = round_half_away(y + vy)
+        else:
+            y += vy
+        offscreen = self.offscreen()
+        if offscreen.any():
+            self.keep(~offscreen)
+
+    def draw(self, surface, lag=0):
+        """用共享图像一次性批量绘制（lag 为插值渲染时回退的物理步比例）"""
+        if not self.count:
+            return
+        y = self.column('y')
+        if lag:
+            y = (y - self.column('vy') * lag).astype(np.int64)
+        images = self.images
+        surface.blits([(images[kind], (x, y)) for kind, x, y in zip(
+            self.column('kind').tolist(), self.column('x').tolist(), y.tolist())], False)
+
+class BulletStore(EntityStore):
+    """玩家子弹的数组存储"""
+    SPEED = -10
+
+    def __init__(self, capacity=256):
+        super().__init__(capacity)
+        self.images = [surface_cache.get(('bullet', YELLOW), Bullet.draw_bullet, YELLOW)]
+
+    def spawn(self, positions):
+        """按 (中心 x, 底边 y) 列表批量生成子弹"""
+        if not positions:
+            return
+        width, height = BULLET_SIZE
+        xs, ys = zip(*positions)
+        self.extend(x=np.subtract(xs, width // 2), y=np.subtract(ys, height),
+                    w=width, h=height, vy=self.SPEED, kind=0)
+
+    def offscreen(self):
+        y = self.column('y')
+        return (y + self.column('h') < 0) | (y > SCREEN_HEIGHT)
+
+    def states(self):
+        """与 Bullet 精灵相同格式的状态列表 [(rect, speed)]"""
+        x, y, w, h = (column.tolist() for column in self.rects())
+        return list(zip(zip(x, y, w, h), self.column('vy').tolist()))
+
+class EnemyStore(EntityStore):
+    """敌机的数组存储（类型编码为 ENEMY_KINDS 中的序号）"""
+    FIELDS = (('x', 'i8'), ('y', 'i8'), ('w', 'i8'), ('h', 'i8'), ('vy', 'f8'), ('kind', 'i1'),
+              ('speed', 'f8'), ('difficulty', 'f8'), ('health', 'i8'), ('score', 'i8'),
+              ('fire_timer', 'i8'), ('volleys', 'i8'))
+
+    def __init__(self, capacity=256):
+        super().__init__(capacity)
+        self.images = [surface_cache.get(('enemy', kind), Enemy.draw_enemy, kind)
+                       for kind in ENEMY_KINDS]
+        # 按类型编码索引的齐射间隔、尺寸、生命值和分数
+        self.intervals = np.array([ENEMY_TYPES[kind]['fire']['interval']
+                                   for kind in ENEMY_KINDS], np.int64)
+        self.sizes = np.array([ENEMY_TYPES[kind]['size'] for kind in ENEMY_KINDS], np.int64)
+        self.healths = np.array([ENEMY_TYPES[kind]['health'] for kind in ENEMY_KINDS], np.int64)
+        self.scores = np.array([ENEMY_TYPES[kind]['score'] for kind in ENEMY_KINDS], np.int64)
+
+    def spawn(self, difficulty=1, rng=random):
+        """生成一架敌机（随机数的消耗顺序与 Enemy.reset 完全相同）"""
+        name, speed, x, y, fire_timer = roll_enemy(rng)
+        spec = ENEMY_TYPES[name]
+        width, height = spec['size']
+        self.extend(x=x, y=y, w=width, h=height, vy=speed * (1 + difficulty * 0.1),
+                    kind=ENEMY_KINDS.index(name), speed=speed, difficulty=difficulty,
+                    health=spec['health'], score=spec['score'], fire_timer=fire_timer,
+                    volleys=0)
+
+    def spawn_batch(self, kinds, speeds, xs, ys, fire_timers, difficulties):
+        """一次生成多架敌机，参数都是等长数组（kinds 为类型编码）"""
+        if not len(kinds):
+            return
+        self.extend(x=xs, y=ys, w=self.sizes[kinds, 0], h=self.sizes[kinds, 1],
+                    vy=speeds * (1 + difficulties * 0.1), kind=kinds, speed=speeds,
+                    difficulty=difficulties, health=self.healths[kinds],
+                    score=self.scores[kinds], fire_timer=fire_timers, volleys=0)
+
+    def tick_fire(self, floor):
+        """
+        所有敌机的射击冷却计时（规则同 Enemy.tick_fire）
+        返回本帧开火的敌机序号和各自的齐射序号
+        """
+        timer = self.column('fire_timer')
+        timer -= 1
+        y = self.column('y')
+        ready = np.flatnonzero((timer <= 0) & (y >= 0) & (y + self.column('h') < floor))
+        if not len(ready):
+            return ready, ready
+        timer[ready] = self.intervals[self.column('kind')[ready]]
+        volleys = self.column('volleys')
+        fired = volleys[ready]
+        volleys[ready] += 1
+        return ready, fired
+
+    def offscreen(self):
+        return self.column('y') > SCREEN_HEIGHT
+
+    def centers(self, indices):
+        """指定敌机的中心点列表"""
+        x, y, w, h = self.rects()
+        return list(zip((x[indices] + w[indices] // 2).tolist(),
+                        (y[indices] + h[indices] // 2).tolist()))
+
+    def states(self):
+        """与 Enemy 精灵相同格式的状态列表 [(type, rect, speed, health, difficulty, 射击状态)]"""
+        x, y, w, h = (column.tolist() for column in self.rects())
+        kinds = [ENEMY_KINDS[kind] for kind in self.column('kind').tolist()]
+        return list(zip(kinds, zip(x, y, w, h), self.column('speed').tolist(),
+                        self.column('health').tolist(), self.column('difficulty').tolist(),
+                        self.column('fire_timer').tolist(), self.column('volleys').tolist()))
+
+class EnemyBulletStore(EntityStore):
+    """敌机子弹的数组存储：位置用浮点数累计，可沿任意方向飞行"""
+    FIELDS = (('x', 'i8'), ('y', 'i8'), ('w', 'i8'), ('h', 'i8'), ('fx', 'f8'), ('fy', 'f8'),
+              ('vx', 'f8'), ('vy', 'f8'), ('kind', 'i1'))
+
+    def __init__(self, capacity=1024):
+        super().__init__(capacity)
+        self.images = [surface_cache.get('enemy_bullet', Bullet.draw_enemy_bullet)]
+
+    def spawn(self, volleys):
+        """一次生成多组齐射：volleys 为 [(中心 x, 中心 y, [(vx, vy), ...]), ...]"""
+        counts = [len(velocities) for _, _, velocities in volleys]
+        if not sum(counts):
+            return
+        width, height = ENEMY_BULLET_SIZE
+        left = np.repeat([x for x, _, _ in volleys], counts) - width // 2
+        top = np.repeat([y for _, y, _ in volleys], counts) - height // 2
+        velocities = np.array([velocity for _, _, group in volleys for velocity in group],
+                              np.float64)
+        self.extend(x=left, y=top, w=width, h=height, fx=left, fy=top,
+                    vx=velocities[:, 0], vy=velocities[:, 1], kind=0)
+
+    def update(self):
+        """整批推进位置（坐标取整规则与 Rect 相同）并剔除飞出屏幕的子弹"""
+        if not self.count:
+            return
+        fx = self.column('fx')
+        fy = self.column('fy')
+        fx += self.column('vx')
+        fy += self.column('vy')
+        self.column('x')[:] = round_half_away(fx)
+        self.column('y')[:] = round_half_away(fy)
+        offscreen = self.offscreen()
+        if offscreen.any():
+            self.keep(~offscreen)
+
+    def offscreen(self):
+        x, y, w, h = self.rects()
+        return (x + w < 0) | (x > SCREEN_WIDTH) | (y + h < 0) | (y > SCREEN_HEIGHT)
+
+    def draw(self, surface, lag=0):
+        """批量绘制（lag 为插值渲染时回退的物理步比例）"""
+        if not self.count:
+            return
+        if lag:
+            x = (self.column('fx') - self.column('vx') * lag).astype(np.int64)
+            y = (self.column('fy') - self.column('vy') * lag).astype(np.int64)
+        else:
+            x, y = self.column('x'), self.column('y')
+        image = self.images[0]
+        surface.blits([(image, position) for position in zip(x.tolist(), y.tolist())], False)
+
+    def states(self):
+        """与敌机 Bullet 精灵相同格式的状态列表 [(rect, vx, vy)]"""
+        x, y, w, h = (column.tolist() for column in self.rects())
+        return list(zip(zip(x, y, w, h), self.column('vx').tolist(), self.column('vy').tolist()))
+
+class HudText(pygame.sprite.DirtySprite):
+    """HUD 文本：只有内容变化时才重新渲染（字体在第一次设置内容时才加载）"""
+    def __init__(self, size, color, x, y, align='left'):
+        super().__init__()
+        self.size = size
+        self.color = color
+        self.x = x
+        self.y = y
+        self.align = align
+        self.text = ''
+        self.image = pygame.Surface((0, 0))
+        self.rect = self.image.get_rect(topleft=(x, y))
+
+    def set_text(self, text):
+        """更新文本内容"""
+        if text == self.text:
+            return
+        self.text = text
+        self.image = render_text(text, self.size, self.color)
+        self.rect = self.image.get_rect()
+        if self.align == 'center':
+            self.rect.center = (self.x, self.y)
+        elif self.align == 'left':
+            self.rect.topleft = (self.x, self.y)
+        elif self.align == 'right':
+            self.rect.topright = (self.x, self.y)
+        self.dirty = 1
+
+class HealthBar(pygame.sprite.DirtySprite):
+    """血条：只有血量变化时才重新绘制"""
+    def __init__(self, x, y, width=150, height=15):
+        super().__init__()
+        self.image = pygame.Surface((width, height))
+        self.rect = self.image.get_rect(topleft=(x, y))
+        self.health = None
+        self.max_health = None
+
+    def set_health(self, health, max_health):
+        """更新血量"""
+        if (health, max_health) == (self.health, self.max_health):
+            return
+        self.health = health
+        self.max_health = max_health
+        bar_width, bar_height = self.rect.size
+        
+        # 背景（换成新的 Surface 而不是原地重画，GPU 渲染缓存的旧纹理自然失效）
+        self.image = pygame.Surface((bar_width, bar_height))
+        self.image.fill((50, 50, 50))
+        
+        # 血量
+        health_width = int(bar_width * (health / max_health))
+        color = GREEN if health > 50 else (YELLOW if health > 25 else RED)
+        pygame.draw.rect(self.image, color, (0, 0, health_width, bar_height))
+        
+        # 边框
+        pygame.draw.rect(self.image, WHITE, (0, 0, bar_width, bar_height), 2)
+        self.dirty = 1
+
+class ProfileSection:
+    """性能分析中的一个计时区段（可重复使用的上下文管理器）"""
+    __slots__ = ('timings', 'name', 'start')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+
+class Profiler:
+    """
+    内置性能分析器
+    记录每帧各子系统的耗时与各精灵组的数量，最近若干帧保存在环形缓冲区中，
+    可在游戏内叠加显示，也可导出为 CSV 或 JSON
+    """
+    # 未启用时所有区段共用的空上下文
+    DISABLED = nullcontext()
+    # 一帧的时间预算（毫秒）
+    BUDGET_MS = 1000 / FPS
+    OVERLAY_INTERVAL = 15
+
+    def __init__(self, enabled=False, capacity=600):
+        self.enabled = enabled
+        self.overlay = False
+        self.frames = deque(maxlen=capacity)
+        self.frame_count = 0
+        self.frame_start = 0.0
+        self.timings = {}
+        self.sections = {}
+        self.overlay_image = None
+
+    def section(self, name):
+        """返回一个计时区段：with profiler.section('update'): ..."""
+        if not self.enabled:
+            return self.DISABLED
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = ProfileSection(self.timings, name)
+        return section
+
+    def begin_frame(self):
+        """开始记录一帧"""
+        if self.enabled:
+            self.timings.clear()
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self, counts):
+        """结束一帧，counts 为各精灵组的数量"""
+        if not self.enabled:
+            return
+        self.frame_count += 1
+        record = {
+            'frame': self.frame_count,
+            'frame_ms': (time.perf_counter() - self.frame_start) * 1000,
+        }
+        for name, seconds in self.timings.items():
+            record[name + '_ms'] = seconds * 1000
+        for name, count in counts.items():
+            record['count.' + name] = count
+        self.frames.append(record)
+
+    def add(self, name, seconds):
+        """记录在其他线程中测得的耗时（如渲染线程）"""
+        if self.enabled:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def averages(self, frames=60):
+        """最近若干帧各项指标的平均值"""
+        recent = list(self.frames)[-frames:]
+        if not recent:
+            return {}
+        totals = {}
+        for record in recent:
+            for key, value in record.items():
+                totals[key] = totals.get(key, 0) + value
+        return {key: value / len(recent) for key, value in totals.items()}
+
+    def draw_overlay(self, surface, font):
+        """在屏幕右上角叠加显示最近 60 帧的平均耗时，返回覆盖的区域"""
+        # 叠加层本身的文字渲染也有开销，每 OVERLAY_INTERVAL 帧才重新生成一次
+        if self.overlay_image is None or self.frame_count % self.OVERLAY_INTERVAL == 0:
+            self.overlay_image = self.render_overlay(font)
+        rect = self.overlay_image.get_rect(topright=(surface.get_width() - 5, 5))
+        surface.blit(self.overlay_image, rect)
+        return rect
+
+    def render_overlay(self, font):
+        """渲染叠加层图像"""
+        averages = self.averages()
+        frame_ms = averages.get('frame_ms', 0.0)
+        lines = [(f"frame {frame_ms:6.2f} ms", RED if frame_ms > self.BUDGET_MS else GREEN)]
+        timings = sorted(((value, key[:-3]) for key, value in averages.items()
+                          if key.endswith('_ms') and key != 'frame_ms'), reverse=True)
+        for value, name in timings[:12]:
+            lines.append((f"{name:<24}{value:6.2f}", WHITE))
+        counts = [f"{key[6:]} {int(value)}" for key, value in averages.items()
+                  if key.startswith('count.')]
+        if counts:
+            lines.append(("  ".join(counts), YELLOW))
+        
+        line_height = font.get_linesize()
+        images = [font.render(text, True, color) for text, color in lines]
+        width = max(image.get_width() for image in images) + 12
+        # 不透明底色，保证每帧都完全覆盖上一帧的内容
+        overlay = pygame.Surface((width, line_height * len(images) + 8))
+        overlay.fill((0, 0, 0))
+        for i, image in enumerate(images):
+            overlay.blit(image, (6, 4 + i * line_height))
+        return overlay
+
+    def dump(self, path):
+        """把环形缓冲区中的记录导出到文件（按扩展名选择 CSV 或 JSON）"""
+        records = list(self.frames)
+        if path.lower().endswith('.csv'):
+            columns = []
+            for record in records:
+                for key in record:
+                    if key not in columns:
+                        columns.append(key)
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=columns, restval=0)
+                writer.writeheader()
+                writer.writerows(records)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'budget_ms': self.BUDGET_MS, 'frames': records}, f, indent=1)
+
+class SpatialGrid:
+    """
+    均匀网格空间哈希（碰撞检测粗筛）
+    每帧对一个精灵组调用 rebuild()，之后的查询结果与 pygame.sprite 的
+    spritecollide / groupcollide 完全一致（包括顺序）
+    """
+    # 配对数量较少时直接逐对检测，建网格反而更慢
+    BRUTE_FORCE_PAIRS = 256
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.group = None
+        self.sprites = []
+        self.indexed = False
+
+    def _cell_range(self, rect):
+        """返回矩形覆盖的格子坐标范围"""
+        left, top, width, height = rect
+        size = self.cell_size
+        return (left // size, (left + max(width, 1) - 1) // size,
+                top // size, (top + max(height, 1) - 1) // size)
+
+    def rebuild(self, group):
+        """记录精灵组的当前状态；网格本身在第一次需要时才建立"""
+        self.group = group
+        self.sprites = group.sprites()
+        self.indexed = False
+
+    def _build(self):
+        """按精灵当前位置建立网格"""
+        cells = self.cells
+        cells.clear()
+        for index, sprite in enumerate(self.sprites):
+            x0, x1, y0, y1 = self._cell_range(sprite.rect)
+            if x0 == x1 and y0 == y1:
+                # 大多数精灵只落在一个格子里
+                key = (x0, y0)
+                cell = cells.get(key)
+                if cell is None:
+                    cells[key] = [index]
+                else:
+                    cell.append(index)
+                continue
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    cell = cells.get((cx, cy))
+                    if cell is None:
+                        cells[(cx, cy)] = [index]
+                    else:
+                        cell.append(index)
+        self.indexed = True
+
+    def _candidates(self, rect):
+        """返回与矩形位于相同格子的精灵序号（已排序）"""
+        cells = self.cells
+        x0, x1, y0, y1 = self._cell_range(rect)
+        if x0 == x1 and y0 == y1:
+            return cells.get((x0, y0), ())
+        candidates = set()
+        for cx in range(x0, x1 + 1):
+            for cy in range(y0, y1 + 1):
+                cell = cells.get((cx, cy))
+                if cell:
+                    candidates.update(cell)
+        return sorted(candidates)
+
+    def spritecollide(self, sprite, dokill=False):
+        """等价于 pygame.sprite.spritecollide(sprite, group, dokill)"""
+        if len(self.sprites) <= self.BRUTE_FORCE_PAIRS:
+            return pygame.sprite.spritecollide(sprite, self.group, dokill)
+        if not self.indexed:
+            self._build()
+        
+        rect = sprite.rect
+        sprites = self.sprites
+        group = self.group
+        hits = []
+        for index in self._candidates(rect):
+            other = sprites[index]
+            if other in group and rect.colliderect(other.rect):
+                hits.append(other)
+        if dokill:
+            for other in hits:
+                other.kill()
+        return hits
+
+    def groupcollide(self, others, dokill=False):
+        """等价于 pygame.sprite.groupcollide(group, others, False, dokill)"""
+        if len(self.sprites) * len(others) <= self.BRUTE_FORCE_PAIRS:
+            return pygame.sprite.groupcollide(self.group, others, False, dokill)
+        if not self.indexed:
+            self._build()
+        
+        # 先按 others 的顺序找出所有相交的配对
+        sprites = self.sprites
+        group = self.group
+        pairs = {}
+        for other in others.sprites():
+            rect = other.rect
+            for index in self._candidates(rect):
+                if rect.colliderect(sprites[index].rect):
+                    pairs.setdefault(index, []).append(other)
+        
+        # 再按网格精灵的顺序结算；被先前精灵消耗掉的 others 不再计入
+        hits = {}
+        for index in sorted(pairs):
+            sprite = sprites[index]
+            if sprite not in group:
+                continue
+            if dokill:
+                collided = [other for other in pairs[index] if other in others]
+                for other in collided:
+                    other.kill()
+            else:
+                collided = pairs[index]
+            if collided:
+                hits[sprite] = collided
+        return hits
+
+def collide_aabb(targets, shots):
+    """
+    批量 AABB 碰撞内核
+    targets 和 shots 都是 (x, y, w, h) 四个整数数组；对每个 shot 返回与之相交、
+    序号最小的 target（没有则为 -1），即 groupcollide 中先结算的那个。
+    配对较多时先把 targets 按左边界排序做扫掠粗筛，只对 x 方向可能相交的配对
+    做向量化的精确检测
+    """
+    tx, ty, tw, th = targets
+    sx, sy, sw, sh = shots
+    owners = np.full(len(sx), -1, np.int64)
+    if not len(tx) or not len(sx):
+        return owners
+    
+    if len(tx) * len(sx) <= COLLIDE_DENSE_PAIRS:
+        # 配对不多时直接广播出完整的相交矩阵
+        overlap = ((tx[:, None] < sx + sw) & (tx[:, None] + tw[:, None] > sx) &
+                   (ty[:, None] < sy + sh) & (ty[:, None] + th[:, None] > sy))
+        hit = overlap.any(axis=0)
+        owners[hit] = overlap.argmax(axis=0)[hit]
+        return owners
+    
+    # 粗筛：target 的左边界落在 (shot.left - 最大宽度, shot.right) 内才可能相交
+    order = np.argsort(tx, kind='stable')
+    lefts = tx[order]
+    lo = np.searchsorted(lefts, sx - tw.max(), 'right')
+    hi = np.searchsorted(lefts, sx + sw, 'left')
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if not total:
+        return owners
+    shot = np.repeat(np.arange(len(sx)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    target = order[np.repeat(lo, counts) + offsets]
+    
+    # 精检：只保留真正相交的配对，每个 shot 取序号最小的 target
+    hit = ((tx[target] < sx[shot] + sw[shot]) & (tx[target] + tw[target] > sx[shot]) &
+           (ty[target] < sy[shot] + sh[shot]) & (ty[target] + th[target] > sy[shot]))
+    first = np.full(len(sx), len(tx), np.int64)
+    np.minimum.at(first, shot[hit], target[hit])
+    found = first < len(tx)
+    owners[found] = first[found]
+    return owners
+
+def sprite_rects(sprites):
+    """把精灵列表的矩形转换成 (x, y, w, h) 四个数组"""
+    rects = np.fromiter((value for sprite in sprites for value in sprite.rect),
+                        np.int64, 4 * len(sprites))
+    return rects.reshape(-1, 4).T
+
+def draw_lagged(surface, sprites, lag):
+    """按速度把精灵回退 lag 个物理步后绘制（插值渲染）"""
+    blits = []
+    for sprite in sprites:
+        vx, vy = sprite.velocity()
+        blits.append((sprite.image, (sprite.rect.x - vx * lag, sprite.rect.y - vy * lag)))
+    surface.blits(blits, False)
 
 class Game:
     """游戏主类"""
-    def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pygame.display.set_caption("🚀 Space Shooter - 太空射击游戏")
+    # 难度曲线：每 LEVEL_SCORE 分升一级，敌机生成间隔与速度系数随等级变化
+    # （可在实例上覆盖，供 selfplay.py 批量对局调参）
+    LEVEL_SCORE = 500
+    SPAWN_DELAY_START = 60
+    SPAWN_DELAY_STEP = 5
+    SPAWN_DELAY_MIN = 20
+    DIFFICULTY_STEP = 0.2
+    # 时间表刷怪模式下难度曲线按时间推进：每 SCHEDULE_LEVEL_SECONDS 秒升一级，最高 SCHEDULE_MAX_LEVEL 级
+    SCHEDULE_LEVEL_SECONDS = 30
+    SCHEDULE_MAX_LEVEL = 30
+
+    def __init__(self, headless=False, dirty_rects=False, seed=None, record_path=None,
+                 profile=False, metrics_path=None, entity_backend='sprites',
+                 delta_time=False, max_fps=FPS, audio=True, renderer='software',
+                 spawns='random', capture_path=None, pipelined=False):
+        # 实体后端：'sprites' 为逐个精灵对象，'arrays' 把玩家子弹和敌机放进 NumPy 结构数组
+        if entity_backend not in ('sprites', 'arrays'):
+            raise ValueError(f"未知的实体后端: {entity_backend}")
+        self.entity_arrays = entity_backend == 'arrays'
+        if self.entity_arrays and np is None:
+            raise RuntimeError("数组实体后端需要安装 NumPy")
+        if self.entity_arrays and dirty_rects:
+            raise ValueError("数组实体后端不支持局部刷新模式")
+        # 渲染后端：'software' 软件绘制（默认），'gpu' 使用 pygame._sdl2 纹理，'null' 不绘制
+        if renderer not in RENDERERS:
+            raise ValueError(f"未知的渲染后端: {renderer}")
+        if renderer != 'software' and dirty_rects:
+            raise ValueError("局部刷新模式只支持软件渲染")
+        if pipelined and (renderer != 'software' or dirty_rects):
+            raise ValueError("流水线渲染只支持软件渲染，且不能与局部刷新模式同时使用")
+        
+        # 无界面模式：不创建窗口，不读取墙上时钟，也不读写高分文件
+        self.headless = headless
+        # 局部刷新模式：游戏中只重绘发生变化的区域，星空背景保持静止
+        self.dirty_rects = dirty_rects and not headless
+        # 流水线渲染：游戏线程只录制绘制命令，由渲染线程在下一帧的模拟期间画到屏幕上
+        self.pipelined = pipelined and not headless
+        if headless:
+            self.renderer = NullRenderer((SCREEN_WIDTH, SCREEN_HEIGHT))
+        else:
+            init_display()
+            self.renderer = create_renderer(renderer, (SCREEN_WIDTH, SCREEN_HEIGHT),
+                                            "🚀 Space Shooter - 太空射击游戏")
+            # 读取上次保存的预渲染图像（菜单文字、飞船和敌机等）
+            surface_cache.open()
+        # 软件渲染时的显示 Surface（局部刷新模式直接在上面重绘）
+        self.screen = self.renderer.surface
+        # 音频：关闭时不初始化混音器
+        self.audio = audio and not headless and init_audio()
         self.clock = pygame.time.Clock()
+        # 插值模式：物理仍按固定的 1/60 秒步进，每帧按实际经过的时间执行若干步，
+        # 渲染时在最近两步之间插值；画面刷新率由 max_fps 决定（如 30 或 144）
+        self.delta_time = delta_time
+        self.max_fps = max_fps
+        self.render_lag = 0
         self.running = True
         self.state = GameState.MENU
         
-        # 字体
-        self.font_title = pygame.font.Font(None, 72)
-        self.font_large = pygame.font.Font(None, 48)
-        self.font_medium = pygame.font.Font(None, 36)
-        self.font_small = pygame.font.Font(None, 24)
+        # 字号（字体在第一次渲染文字时才加载）
+        self.font_title = 72
+        self.font_large = 48
+        self.font_medium = 36
+        self.font_small = 24
         
         # 游戏对象
         self.player = None
-        self.enemies = pygame.sprite.Group()
-        self.bullets = pygame.sprite.Group()
-        self.enemy_bullets = pygame.sprite.Group()
+        if self.entity_arrays:
+            self.enemies = EnemyStore()
+            self.bullets = BulletStore()
+            self.enemy_bullets = EnemyBulletStore()
+        else:
+            self.enemies = pygame.sprite.Group()
+            self.bullets = pygame.sprite.Group()
+            self.enemy_bullets = pygame.sprite.Group()
         self.power_ups = pygame.sprite.Group()
         self.explosions = pygame.sprite.Group()
-        self.stars = [Star() for _ in range(100)]
+        self.starfield = Starfield(100)
+        
+        # 碰撞检测用的空间网格
+        self.enemy_grid = SpatialGrid()
+        self.power_up_grid = SpatialGrid()
+        
+        # HUD
+        self.health_bar = HealthBar(20, 20)
+        self.hud_score = HudText(self.font_medium, WHITE, 20, 45)
+        self.hud_level = HudText(self.font_medium, WHITE, 20, 80)
+        self.hud_power = HudText(self.font_small, PURPLE, 20, 115)
+        
+        # 局部刷新用的分层精灵组与静态背景
+        self.layers = None
+        self.background = None
+        self.drawn_state = None
+        
+        # 静态画面（菜单、暂停、结束）合成一次后缓存，输入不变时每帧最多一次 blit
+        self.static_screen = None
+        self.static_key = None
+        # 屏幕上当前显示的静态画面；与 static_key 相同时整帧跳过绘制
+        self.drawn_key = None
+        self.pause_overlay = None
+        if self.dirty_rects:
+            self.layers = pygame.sprite.LayeredDirty()
+            self.background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+            self.layers.clear(self.screen, self.background)
+            self.layers.add(self.health_bar, self.hud_score, self.hud_level,
+                            self.hud_power, layer=6)
         
         # 游戏数据
         self.score = 0
@@ -369,74 +1611,183 @@ class Game:
         
         # 敌机生成
         self.enemy_spawn_timer = 0
-        self.enemy_spawn_delay = 60
+        self.enemy_spawn_delay = self.SPAWN_DELAY_START
+        
+        # 刷怪方式：'random' 每帧按计时器当场随机生成（默认）；'schedule' 按本局种子预编译时间表；
+        # 其他值为关卡文件路径（见 spawns.py）。时间表模式下只在下一个事件到期时取出一批事件
+        self.spawns = spawns
+        self.schedule = None
+        self.spawn_cursor = 0
+        self.spawn_next_tick = None
+        
+        # 逻辑时钟：每次 update 前进一帧，所有计时都基于它
+        self.ticks = 0
         
-        # 加载高分
-        self.load_high_score()
+        # 待应用的输入：事件每个渲染帧处理一次，输入在下一个物理步生效
+        self.input_move = 0
+        self.input_shoot = False
+        
+        # 随机数：每局游戏使用独立种子，同一种子和输入必定得到相同结果
+        self.seed_rng = random.Random(seed)
+        self.seed = None
+        self.rng = random.Random()
+        
+        # 录像：record_path 不为空时记录每局的逐帧输入
+        self.record_path = record_path
+        self.recorder = None
+        
+        # 画面录制：capture_path 不为空时每个渲染帧复制一份画面，由后台线程编码写盘
+        self.capture = None
+        if capture_path:
+            if not self.renderer.enabled:
+                raise ValueError("无界面模式或空渲染器没有画面可以录制")
+            self.capture = FrameCapture(capture_path, (SCREEN_WIDTH, SCREEN_HEIGHT))
+        
+        # 性能分析：F3 切换叠加显示，F4 导出最近的帧数据到 metrics_path
+        self.profiler = Profiler(enabled=profile)
+        self.metrics_path = metrics_path or 'metrics.csv'
+        
+        # 高分与排行榜（写入在后台线程完成）
+        self.scores = ScoreStore()
+        if not headless:
+            self.load_high_score()
 
     def load_high_score(self):
-        """加载高分记录"""
-        try:
-            if os.path.exists('highscore.txt'):
-                with open('highscore.txt', 'r') as f:
-                    self.high_score = int(f.read())
-        except:
-            self.high_score = 0
+        """加载高分记录和排行榜"""
+        self.high_score = self.scores.load()
 
     def save_high_score(self):
-        """保存高分记录"""
-        try:
-            with open('highscore.txt', 'w') as f:
-                f.write(str(self.high_score))
-        except:
-            pass
-
-    def reset_game(self):
-        """重置游戏"""
-        self.player = Player()
-        self.enemies.empty()
-        self.bullets.empty()
-        self.enemy_bullets.empty()
-        self.power_ups.empty()
-        self.explosions.empty()
+        """提交本局成绩（只排队，由后台线程写入磁盘）"""
+        self.scores.submit(self.score, self.level, self.ticks / FPS, self.seed)
+
+    def now(self):
+        """当前逻辑时间（毫秒）"""
+        return self.ticks * 1000 // FPS
+
+    def reset_game(self, seed=None):
+        """重置游戏（seed 为 None 时自动生成本局种子）"""
+        if seed is None:
+            seed = self.seed_rng.getrandbits(63)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.ticks = 0
+        if self.player:
+            self.player.kill()
+        self.player = Player(self.now())
+        # 用 kill() 清除精灵，以便归还对象池并移出分层精灵组
+        groups = [self.power_ups, self.explosions]
+        if self.entity_arrays:
+            self.enemies.empty()
+            self.bullets.empty()
+            self.enemy_bullets.empty()
+        else:
+            groups += [self.enemies, self.bullets, self.enemy_bullets]
+        for group in groups:
+            for sprite in group.sprites():
+                sprite.kill()
         self.score = 0
         self.level = 1
         self.difficulty = 1
-        self.enemy_spawn_delay = 60
+        self.enemy_spawn_timer = 0
+        self.enemy_spawn_delay = self.SPAWN_DELAY_START
+        self.prepare_spawns()
+        self.input_move = 0
+        self.input_shoot = False
+
+    def prepare_spawns(self, cursor=0):
+        """按刷怪方式取得本局的时间表，并从第 cursor 个事件开始"""
+        if self.spawns == 'random':
+            self.schedule = None
+            return
+        # 按需导入：spawns 模块依赖本模块中的敌机定义
+        import spawns
+        if self.spawns == 'schedule':
+            curve = spawns.DifficultyCurve.from_game(self)
+            self.schedule = spawns.seeded_schedule(self.seed, curve.segments)
+        else:
+            self.schedule = spawns.load_level(self.spawns)
+        self.spawn_cursor = cursor
+        self.spawn_next_tick = self.schedule.next_event(cursor)
+
+    def start_game(self, seed=None):
+        """开始新游戏"""
+        self.finish_recording()
+        self.reset_game(seed)
+        self.state = GameState.PLAYING
+        if self.record_path:
+            self.recorder = Recorder(self.seed, self.spawns)
+
+    def finish_recording(self):
+        """结束本局录像并写入文件"""
+        if self.recorder is not None:
+            self.recorder.save(self.record_path, self.state_digest())
+            self.recorder = None
+
+    def state_digest(self):
+        """当前游戏状态的摘要，用于校验回放结果是否完全一致"""
+        player = self.player
+        state = [
+            self.ticks, self.score, self.level, self.difficulty,
+            self.enemy_spawn_timer, self.enemy_spawn_delay, self.rng.getstate(),
+        ]
+        if player:
+            state.append((tuple(player.rect), player.speed_x, player.health,
+                          player.power_level, player.last_shot, player.invincible,
+                          player.invincible_timer))
+        if self.entity_arrays:
+            state.append(self.enemies.states())
+            state.append(self.bullets.states())
+            state.append(self.enemy_bullets.states())
+        else:
+            state.append([(e.type, tuple(e.rect), e.speed, e.health, float(e.difficulty),
+                           e.fire_timer, e.volleys) for e in self.enemies])
+            state.append([(tuple(b.rect), b.speed) for b in self.bullets])
+            state.append([(tuple(b.rect), b.vx, b.speed) for b in self.enemy_bullets])
+        state.append([(p.type, tuple(p.rect)) for p in self.power_ups])
+        state.append([(tuple(e.rect), e.frame) for e in self.explosions])
+        return hashlib.sha256(repr(state).encode()).digest()
 
     def handle_events(self):
         """处理事件"""
+        shoot = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 self.running = False
+            elif event.type == pygame.VIDEOEXPOSE:
+                # 窗口被遮挡后重新露出，屏幕内容需要重画
+                self.drawn_key = None
             
             if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_F3:
+                    self.toggle_profiler_overlay()
+                elif event.key == pygame.K_F4:
+                    self.profiler.dump(self.metrics_path)
+                
                 if self.state == GameState.MENU:
                     if event.key == pygame.K_SPACE:
-                        self.reset_game()
-                        self.state = GameState.PLAYING
+                        self.start_game()
                     elif event.key == pygame.K_q:
                         self.running = False
                 
                 elif self.state == GameState.PLAYING:
                     if event.key == pygame.K_SPACE:
-                        new_bullets = self.player.shoot()
-                        self.bullets.add(new_bullets)
+                        shoot = True
                     elif event.key == pygame.K_p:
                         self.state = GameState.PAUSED
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
+                        self.finish_recording()
                 
                 elif self.state == GameState.PAUSED:
                     if event.key == pygame.K_p:
                         self.state = GameState.PLAYING
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
+                        self.finish_recording()
                 
                 elif self.state == GameState.GAME_OVER:
                     if event.key == pygame.K_SPACE:
-                        self.reset_game()
-                        self.state = GameState.PLAYING
+                        self.start_game()
                     elif event.key == pygame.K_ESCAPE:
                         self.state = GameState.MENU
 
@@ -444,91 +1795,340 @@ class Game:
         if self.state == GameState.PLAYING:
             keys = pygame.key.get_pressed()
             if keys[pygame.K_LEFT] or keys[pygame.K_a]:
-                self.player.move_left()
+                move = -1
             elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
-                self.player.move_right()
+                move = 1
             else:
-                self.player.stop_move()
+                move = 0
+            self.input_move = move
+            self.input_shoot = self.input_shoot or shoot
+
+    def toggle_profiler_overlay(self):
+        """切换性能分析叠加显示（首次打开时启用分析器）"""
+        self.profiler.enabled = True
+        self.profiler.overlay = not self.profiler.overlay
+        # 局部刷新模式下关闭叠加层后需要整屏重画一次
+        self.drawn_state = None
+        self.drawn_key = None
+
+    def sprite_counts(self):
+        """各精灵组当前的数量"""
+        return {
+            'enemies': len(self.enemies),
+            'bullets': len(self.bullets),
+            'enemy_bullets': len(self.enemy_bullets),
+            'power_ups': len(self.power_ups),
+            'explosions': len(self.explosions),
+        }
+
+    def apply_input(self, move, shoot):
+        """应用一帧的输入：move 为 -1/0/1（左/停/右），shoot 表示本帧是否开火"""
+        if self.recorder is not None:
+            self.recorder.record(move, shoot)
+        if shoot:
+            if self.entity_arrays:
+                self.bullets.spawn(self.player.fire(self.now()))
+            else:
+                self.bullets.add(self.player.shoot(self.now()))
+        if move < 0:
+            self.player.move_left()
+        elif move > 0:
+            self.player.move_right()
+        else:
+            self.player.stop_move()
+
+    def fixed_update(self):
+        """推进一个物理步：先应用待处理的输入，再更新游戏状态"""
+        if self.state == GameState.PLAYING:
+            self.apply_input(self.input_move, self.input_shoot)
+            self.input_shoot = False
+        self.update()
 
     def update(self):
         """更新游戏状态"""
         if self.state == GameState.PLAYING:
-            # 更新星星
-            for star in self.stars:
-                star.update()
+            self.ticks += 1
+            now = self.now()
+            profiler = self.profiler
             
-            # 更新玩家
-            self.player.update()
+            self.update_sprites(now)
+            with profiler.section('update.spawn'):
+                self.spawn_enemies()
+            with profiler.section('update.enemy_fire'):
+                self.fire_enemy_bullets()
+            with profiler.section('collide.bullets_enemies'):
+                self.collide_bullets_enemies()
+            with profiler.section('collide.player_enemies'):
+                self.collide_player_enemies(now)
+            with profiler.section('collide.player_enemy_bullets'):
+                self.collide_player_enemy_bullets(now)
+            with profiler.section('collide.player_power_ups'):
+                self.collide_player_power_ups()
+            self.update_difficulty()
             
-            # 更新子弹
+            # 本局结束时保存录像（放在帧末，保证摘要对应完整的一帧）
+            if self.state == GameState.GAME_OVER:
+                self.finish_recording()
+
+    def update_sprites(self, now):
+        """更新所有精灵"""
+        profiler = self.profiler
+        
+        # 更新星星（无界面和局部刷新模式下背景静止）
+        if not self.headless and not self.dirty_rects:
+            with profiler.section('update.stars'):
+                self.starfield.update()
+        
+        # 更新玩家
+        with profiler.section('update.player'):
+            self.player.update(now)
+        
+        # 更新子弹
+        with profiler.section('update.bullets'):
             self.bullets.update()
+        with profiler.section('update.enemy_bullets'):
             self.enemy_bullets.update()
-            
-            # 更新敌机
+        
+        # 更新敌机
+        with profiler.section('update.enemies'):
             self.enemies.update()
-            
-            # 更新道具
+        
+        # 更新道具
+        with profiler.section('update.power_ups'):
             self.power_ups.update()
-            
-            # 更新爆炸效果
+        
+        # 更新爆炸效果
+        with profiler.section('update.explosions'):
             self.explosions.update()
-            
-            # 生成敌机
-            self.enemy_spawn_timer += 1
-            if self.enemy_spawn_timer >= self.enemy_spawn_delay:
-                self.enemy_spawn_timer = 0
-                enemy = Enemy(self.difficulty)
-                self.enemies.add(enemy)
-            
-            # 碰撞检测：子弹与敌机
-            hits = pygame.sprite.groupcollide(self.enemies, self.bullets, False, True)
-            for enemy, bullets in hits.items():
-                for bullet in bullets:
-                    if enemy.hit():
-                        explosion = Explosion(enemy.rect.centerx, enemy.rect.centery)
-                        self.explosions.add(explosion)
-                        self.score += enemy.score
-                        enemy.kill()
-                        
-                        # 随机掉落道具
-                        if random.random() < 0.15:
-                            power_up = PowerUp(enemy.rect.centerx, enemy.rect.centery)
-                            self.power_ups.add(power_up)
-            
-            # 碰撞检测：玩家与敌机
-            hits = pygame.sprite.spritecollide(self.player, self.enemies, True)
-            for hit in hits:
-                if self.player.take_damage(20):
-                    self.game_over()
-                explosion = Explosion(hit.rect.centerx, hit.rect.centery, 60)
-                self.explosions.add(explosion)
-            
-            # 碰撞检测：玩家与道具
-            hits = pygame.sprite.spritecollide(self.player, self.power_ups, True)
-            for hit in hits:
-                if hit.type == 'health':
-                    self.player.health = min(self.player.health + 20, self.player.max_health)
-                elif hit.type == 'power':
-                    self.player.power_up()
-                elif hit.type == 'score':
-                    self.score += 50
-            
-            # 更新难度
-            if self.score > self.level * 500:
-                self.level += 1
-                self.difficulty = 1 + (self.level - 1) * 0.2
-                self.enemy_spawn_delay = max(20, 60 - self.level * 5)
+
+    def spawn_enemies(self):
+        """生成敌机"""
+        if self.schedule is not None:
+            # 时间表模式：到期前每帧只比较一次整数
+            if self.spawn_next_tick is not None and self.ticks >= self.spawn_next_tick:
+                events, self.spawn_cursor, self.spawn_next_tick = self.schedule.pop_due(
+                    self.spawn_cursor, self.ticks)
+                self.spawn_events(events)
+            return
+        self.enemy_spawn_timer += 1
+        if self.enemy_spawn_timer >= self.enemy_spawn_delay:
+            self.enemy_spawn_timer = 0
+            self.spawn_enemy()
+
+    def fire_enemy_bullets(self):
+        """敌机开火：收集本帧所有齐射，一次批量生成子弹"""
+        rect = self.player.rect
+        target = rect.center
+        volleys = []
+        if self.entity_arrays:
+            ready, fired = self.enemies.tick_fire(rect.top)
+            if not len(ready):
+                return
+            kinds = self.enemies.column('kind')[ready].tolist()
+            for kind, volley, (x, y) in zip(kinds, fired.tolist(), self.enemies.centers(ready)):
+                volleys.append((x, y, volley_velocities(ENEMY_KINDS[kind], volley, x, y, target)))
+        else:
+            for enemy in self.enemies:
+                volley = enemy.tick_fire(rect.top)
+                if volley is not None:
+                    x, y = enemy.rect.center
+                    volleys.append((x, y, volley_velocities(enemy.type, volley, x, y, target)))
+        self.emit_volleys(volleys)
+
+    def emit_volleys(self, volleys):
+        """生成若干组敌机子弹：volleys 为 [(中心 x, 中心 y, [(vx, vy), ...]), ...]"""
+        if not volleys:
+            return
+        if self.entity_arrays:
+            self.enemy_bullets.spawn(volleys)
+            return
+        self.enemy_bullets.add([bullet_pool.acquire(x, y, True, vx, vy)
+                                for x, y, velocities in volleys for vx, vy in velocities])
+
+    def spawn_events(self, events):
+        """按时间表事件（spawns.EVENT 数组）批量生成敌机"""
+        if self.entity_arrays:
+            self.enemies.spawn_batch(events['kind'], events['speed'], events['x'], events['y'],
+                                     events['fire_timer'], events['difficulty'])
+            return
+        columns = (events[name].tolist() for name in
+                   ('kind', 'speed', 'x', 'y', 'fire_timer', 'difficulty'))
+        self.enemies.add([enemy_pool.acquire(difficulty, None,
+                                             (ENEMY_KINDS[kind], speed, x, y, fire_timer))
+                          for kind, speed, x, y, fire_timer, difficulty in zip(*columns)])
+
+    def spawn_enemy(self, y=None):
+        """按当前难度生成一架敌机；y 不为空时覆盖其初始纵坐标"""
+        if self.entity_arrays:
+            self.enemies.spawn(self.difficulty, self.rng)
+            if y is not None:
+                self.enemies.column('y')[-1] = y
+        else:
+            enemy = enemy_pool.acquire(self.difficulty, self.rng)
+            if y is not None:
+                enemy.rect.y = y
+            self.enemies.add(enemy)
+
+    def collide_bullets_enemies(self):
+        """碰撞检测：子弹与敌机"""
+        if self.entity_arrays:
+            self.collide_bullets_enemies_arrays()
+            return
+        self.enemy_grid.rebuild(self.enemies)
+        if np is not None and len(self.enemies) * len(self.bullets) > SpatialGrid.BRUTE_FORCE_PAIRS:
+            self.collide_bullets_enemies_batched()
+            return
+        hits = self.enemy_grid.groupcollide(self.bullets, True)
+        for enemy, bullets in hits.items():
+            for bullet in bullets:
+                if enemy.hit():
+                    explosion = explosion_pool.acquire(enemy.rect.centerx, enemy.rect.centery)
+                    self.explosions.add(explosion)
+                    self.score += enemy.score
+                    enemy.kill()
+                    
+                    # 随机掉落道具
+                    if self.rng.random() < 0.15:
+                        power_up = PowerUp(enemy.rect.centerx, enemy.rect.centery, self.rng)
+                        self.power_ups.add(power_up)
+
+    def collide_bullets_enemies_batched(self):
+        """碰撞检测：子弹与敌机（精灵后端，矩形取出后交给碰撞内核批量处理）"""
+        enemies = self.enemies.sprites()
+        bullets = self.bullets.sprites()
+        owners = collide_aabb(sprite_rects(enemies), sprite_rects(bullets))
+        hit_bullets = np.flatnonzero(owners >= 0)
+        if not len(hit_bullets):
+            return
+        for index in hit_bullets.tolist():
+            bullets[index].kill()
+        
+        counts = np.bincount(owners[hit_bullets], minlength=len(enemies))
+        hit_enemies = np.flatnonzero(counts).tolist()
+        health = np.zeros(len(enemies), np.int64)
+        health[hit_enemies] = [enemies[index].health for index in hit_enemies]
+        dead = self.settle_bullet_hits(
+            counts, health, [enemy.score for enemy in enemies],
+            lambda dead: [enemies[index].rect.center for index in dead])
+        for index in hit_enemies:
+            enemies[index].health = int(health[index])
+        for index in dead:
+            enemies[index].kill()
+
+    def collide_bullets_enemies_arrays(self):
+        """碰撞检测：子弹与敌机（数组后端）"""
+        enemies, bullets = self.enemies, self.bullets
+        if not len(enemies) or not len(bullets):
+            return
+        owners = collide_aabb(enemies.rects(), bullets.rects())
+        hit_bullets = owners >= 0
+        if not hit_bullets.any():
+            return
+        counts = np.bincount(owners[hit_bullets], minlength=len(enemies))
+        dead = self.settle_bullet_hits(counts, enemies.column('health'),
+                                       enemies.column('score'), enemies.centers)
+        bullets.keep(~hit_bullets)
+        enemies.remove(dead)
+
+    def settle_bullet_hits(self, counts, health, scores, centers):
+        """
+        批量结算子弹命中，结果与逐对调用 Enemy.hit() 相同
+        counts 为每架敌机本帧中弹数，health 原地扣减；生命值降到 0 及以下后
+        每多中一弹都会再结算一次击毁。centers(dead) 返回被击毁敌机的中心点。
+        返回被击毁敌机的序号列表
+        """
+        kills = np.maximum(counts - health + 1, 0) * (counts > 0)
+        health -= counts
+        dead = np.flatnonzero(kills).tolist()
+        for index, (x, y) in zip(dead, centers(dead)):
+            for _ in range(int(kills[index])):
+                self.explosions.add(explosion_pool.acquire(x, y))
+                self.score += int(scores[index])
+                
+                # 随机掉落道具
+                if self.rng.random() < 0.15:
+                    self.power_ups.add(PowerUp(x, y, self.rng))
+        return dead
+
+    def collide_player_enemies(self, now):
+        """碰撞检测：玩家与敌机（沿用本帧子弹检测时建立的网格）"""
+        if self.entity_arrays:
+            self.collide_player_enemies_arrays(now)
+            return
+        hits = self.enemy_grid.spritecollide(self.player, True)
+        for hit in hits:
+            if self.player.take_damage(20, now):
+                self.game_over()
+            explosion = explosion_pool.acquire(hit.rect.centerx, hit.rect.centery, 60)
+            self.explosions.add(explosion)
+
+    def collide_player_enemies_arrays(self, now):
+        """碰撞检测：玩家与敌机（数组后端）"""
+        enemies = self.enemies
+        if not len(enemies):
+            return
+        hits = enemies.collide_rect(self.player.rect)
+        if not len(hits):
+            return
+        for cx, cy in enemies.centers(hits):
+            if self.player.take_damage(20, now):
+                self.game_over()
+            self.explosions.add(explosion_pool.acquire(cx, cy, 60))
+        enemies.remove(hits)
+
+    def collide_player_enemy_bullets(self, now):
+        """碰撞检测：玩家与敌机子弹"""
+        if self.entity_arrays:
+            hits = self.enemy_bullets.collide_rect(self.player.rect)
+            self.enemy_bullets.remove(hits)
+        else:
+            hits = pygame.sprite.spritecollide(self.player, self.enemy_bullets, True)
+        for _ in range(len(hits)):
+            if self.player.take_damage(ENEMY_BULLET_DAMAGE, now):
+                self.game_over()
+
+    def collide_player_power_ups(self):
+        """碰撞检测：玩家与道具"""
+        self.power_up_grid.rebuild(self.power_ups)
+        hits = self.power_up_grid.spritecollide(self.player, True)
+        for hit in hits:
+            if hit.type == 'health':
+                self.player.health = min(self.player.health + 20, self.player.max_health)
+            elif hit.type == 'power':
+                self.player.power_up()
+            elif hit.type == 'score':
+                self.score += 50
+
+    def update_difficulty(self):
+        """更新难度"""
+        if self.score > self.level * self.LEVEL_SCORE:
+            self.level += 1
+            self.difficulty = 1 + (self.level - 1) * self.DIFFICULTY_STEP
+            self.enemy_spawn_delay = max(self.SPAWN_DELAY_MIN,
+                                         self.SPAWN_DELAY_START - self.level * self.SPAWN_DELAY_STEP)
+
+    def pool_stats(self):
+        """各对象池的命中统计"""
+        return {
+            'bullets': bullet_pool.stats(),
+            'enemies': enemy_pool.stats(),
+            'explosions': explosion_pool.stats(),
+        }
 
     def game_over(self):
         """游戏结束"""
         self.state = GameState.GAME_OVER
         if self.score > self.high_score:
             self.high_score = self.score
+        if not self.headless:
             self.save_high_score()
 
-    def draw_text(self, text, font, color, x, y, align='center'):
-        """绘制文本"""
-        surface = font.render(text, True, color)
+    def draw_text(self, text, size, color, x, y, align='center', cache=True):
+        """绘制文本（固定文字的图像会缓存；内容随时变化的文字传 cache=False）"""
+        if cache:
+            surface = surface_cache.get(('text', text, size, color), render_text, text, size, color)
+        else:
+            surface = render_text(text, size, color)
         rect = surface.get_rect()
         if align == 'center':
             rect.centerx = x
@@ -539,29 +2139,19 @@ class Game:
         elif align == 'right':
             rect.right = x
             rect.y = y
-        self.screen.blit(surface, rect)
+        self.renderer.blit(surface, rect)
 
-    def draw_health_bar(self, x, y, health, max_health):
-        """绘制血条"""
-        bar_width = 150
-        bar_height = 15
-        
-        # 背景
-        pygame.draw.rect(self.screen, (50, 50, 50), (x, y, bar_width, bar_height))
-        
-        # 血量
-        health_width = int(bar_width * (health / max_health))
-        color = GREEN if health > 50 else (YELLOW if health > 25 else RED)
-        pygame.draw.rect(self.screen, color, (x, y, health_width, bar_height))
-        
-        # 边框
-        pygame.draw.rect(self.screen, WHITE, (x, y, bar_width, bar_height), 2)
+    def update_hud(self):
+        """刷新 HUD 内容（数值不变时不会重新渲染）"""
+        self.health_bar.set_health(self.player.health, self.player.max_health)
+        self.hud_score.set_text(f"分数: {self.score}")
+        self.hud_level.set_text(f"等级: {self.level}")
+        self.hud_power.set_text(f"武器: {self.player.power_level}")
 
     def draw_menu(self):
         """绘制菜单"""
         # 绘制星星背景
-        for star in self.stars:
-            star.draw(self.screen)
+        self.renderer.draw_starfield(self.starfield)
         
         # 标题
         self.draw_text("🚀 SPACE SHOOTER", self.font_title, WHITE, 
@@ -591,42 +2181,97 @@ class Game:
         
         # 高分
         self.draw_text(f"最高分: {self.high_score}", self.font_medium, PURPLE, 
-                      SCREEN_WIDTH//2, SCREEN_HEIGHT - 50)
+                      SCREEN_WIDTH//2, SCREEN_HEIGHT - 50, cache=False)
 
     def draw_game(self):
-        """绘制游戏画面"""
+        """绘制游戏画面（插值模式下各物体按速度回退 render_lag 个物理步）"""
+        profiler = self.profiler
+        screen = self.renderer
+        lag = self.render_lag
+        
         # 绘制星星背景
-        for star in self.stars:
-            star.draw(self.screen)
+        with profiler.section('draw.stars'):
+            screen.draw_starfield(self.starfield, lag)
         
         # 绘制游戏对象
-        self.power_ups.draw(self.screen)
-        self.enemies.draw(self.screen)
-        self.bullets.draw(self.screen)
-        self.enemy_bullets.draw(self.screen)
+        with profiler.section('draw.power_ups'):
+            self.draw_group(self.power_ups, lag)
+        with profiler.section('draw.enemies'):
+            self.draw_group(self.enemies, lag)
+        with profiler.section('draw.bullets'):
+            self.draw_group(self.bullets, lag)
+        with profiler.section('draw.enemy_bullets'):
+            self.draw_group(self.enemy_bullets, lag)
         
         # 绘制玩家（无敌时闪烁）
-        if not self.player.invincible or pygame.time.get_ticks() % 200 < 100:
-            self.screen.blit(self.player.image, self.player.rect)
+        player = self.player
+        if not player.invincible or self.now() % 200 < 100:
+            if lag:
+                x = player.rect.x - player.speed_x * lag
+                x = min(max(x, 0), SCREEN_WIDTH - player.rect.width)
+                screen.blit(player.image, (x, player.rect.y))
+            else:
+                screen.blit(player.image, player.rect)
         
-        self.explosions.draw(self.screen)
+        with profiler.section('draw.explosions'):
+            self.explosions.draw(screen)
         
         # 绘制UI
-        self.draw_health_bar(20, 20, self.player.health, self.player.max_health)
-        self.draw_text(f"分数: {self.score}", self.font_medium, WHITE, 20, 45, 'left')
-        self.draw_text(f"等级: {self.level}", self.font_medium, WHITE, 20, 80, 'left')
-        self.draw_text(f"武器: {self.player.power_level}", self.font_small, PURPLE, 
-                      20, 115, 'left')
+        with profiler.section('draw.hud'):
+            self.update_hud()
+            for hud in (self.health_bar, self.hud_score, self.hud_level, self.hud_power):
+                screen.blit(hud.image, hud.rect)
+
+    def draw_group(self, group, lag=0):
+        """绘制一组实体；lag 不为 0 时插值绘制"""
+        if not lag:
+            group.draw(self.renderer)
+        elif isinstance(group, EntityStore):
+            group.draw(self.renderer, lag)
+        else:
+            draw_lagged(self.renderer, group, lag)
+
+    def draw_game_dirty(self):
+        """局部刷新模式下绘制游戏画面，返回需要更新的屏幕区域"""
+        # 刚进入游戏画面时重画背景并整屏刷新
+        repaint = self.drawn_state != GameState.PLAYING
+        if repaint:
+            self.background.fill(BLACK)
+            self.starfield.draw(self.background)
+            self.screen.blit(self.background, (0, 0))
+        
+        # 把新出现的精灵加入分层精灵组（被 kill() 的精灵会自动移除）
+        layers = self.layers
+        for layer, group in enumerate((self.power_ups, self.enemies, self.bullets,
+                                       self.enemy_bullets)):
+            for sprite in group:
+                if sprite not in layers:
+                    layers.add(sprite, layer=layer)
+        if self.player not in layers:
+            layers.add(self.player, layer=4)
+        for sprite in self.explosions:
+            if sprite not in layers:
+                layers.add(sprite, layer=5)
+        
+        # 玩家无敌时闪烁
+        self.player.visible = int(not self.player.invincible or self.now() % 200 < 100)
+        self.update_hud()
+        
+        if repaint:
+            layers.repaint_rect(self.screen.get_rect())
+        with self.profiler.section('draw.layers'):
+            return layers.draw(self.screen)
 
     def draw_paused(self):
         """绘制暂停画面"""
         # 绘制游戏画面（半透明）
         self.draw_game()
         
-        # 半透明遮罩
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))
-        self.screen.blit(overlay, (0, 0))
+        # 半透明遮罩（只创建一次）
+        if self.pause_overlay is None:
+            self.pause_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            self.pause_overlay.fill((0, 0, 0, 128))
+        self.renderer.blit(self.pause_overlay, (0, 0))
         
         # 暂停文本
         self.draw_text("游戏暂停", self.font_title, YELLOW, 
@@ -641,18 +2286,17 @@ class Game:
     def draw_game_over(self):
         """绘制游戏结束画面"""
         # 绘制星星背景
-        for star in self.stars:
-            star.draw(self.screen)
+        self.renderer.draw_starfield(self.starfield)
         
         # 游戏结束文本
         self.draw_text("游戏结束", self.font_title, RED, 
                       SCREEN_WIDTH//2, SCREEN_HEIGHT//3)
         
         self.draw_text(f"最终分数: {self.score}", self.font_large, WHITE, 
-                      SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 30)
+                      SCREEN_WIDTH//2, SCREEN_HEIGHT//2 - 30, cache=False)
         
         self.draw_text(f"达到等级: {self.level}", self.font_medium, YELLOW, 
-                      SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20)
+                      SCREEN_WIDTH//2, SCREEN_HEIGHT//2 + 20, cache=False)
         
         if self.score >= self.high_score:
             self.draw_text("🎉 新纪录！🎉", self.font_large, GREEN, 
@@ -665,29 +2309,186 @@ class Game:
                       SCREEN_WIDTH//2, SCREEN_HEIGHT - 50)
 
     def draw(self):
-        """绘制画面"""
-        if self.state == GameState.MENU:
-            self.draw_menu()
-        elif self.state == GameState.PLAYING:
-            self.draw_game()
-        elif self.state == GameState.PAUSED:
-            self.draw_paused()
-        elif self.state == GameState.GAME_OVER:
-            self.draw_game_over()
+        """
+        绘制画面
+        局部刷新模式下游戏中返回需要更新的区域列表，其余情况返回 None 表示整屏刷新
+        """
+        if not self.renderer.enabled:
+            return None
+        if self.state != GameState.PLAYING:
+            rects = self.draw_static()
+            self.drawn_state = self.state
+            return rects
+        self.drawn_key = None
+        if self.dirty_rects:
+            rects = self.draw_game_dirty()
+            self.drawn_state = self.state
+            return rects
+        self.drawn_state = self.state
+        
+        # 背景层：每帧先整体清屏
+        self.renderer.clear(BLACK)
+        self.draw_game()
+        return None
+
+    def draw_static(self):
+        """
+        绘制菜单、暂停或结束画面
+        这些画面里没有任何东西在动，整屏合成一次后缓存；分数、最高分等输入变化时才重新合成。
+        画面已经显示在屏幕上时返回空列表（无需刷新），否则 blit 缓存并返回 None（整屏刷新）
+        """
+        key = (self.state, self.seed, self.ticks, self.score, self.level, self.high_score)
+        if key != self.static_key:
+            self.static_screen = self.compose_static()
+            self.static_key = key
+        elif key == self.drawn_key and not self.profiler.overlay:
+            return []
+        self.renderer.blit(self.static_screen, (0, 0))
+        self.drawn_key = key
+        return None
+
+    def compose_static(self):
+        """把当前的静态画面画到一张新的离屏 Surface 上"""
+        # 每次都换新的 Surface，GPU 渲染按 Surface 缓存的旧纹理随之失效
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        renderer, self.renderer = self.renderer, SoftwareRenderer(surface)
+        try:
+            self.renderer.clear(BLACK)
+            if self.state == GameState.MENU:
+                self.draw_menu()
+            elif self.state == GameState.PAUSED:
+                self.draw_paused()
+            elif self.state == GameState.GAME_OVER:
+                self.draw_game_over()
+        finally:
+            self.renderer = renderer
+        return surface
 
     def run(self):
         """运行游戏"""
+        profiler = self.profiler
+        # 插值模式下尚未执行的物理时间（毫秒）
+        accumulator = 0.0
+        elapsed = 0
+        # 流水线模式下 self.renderer 每帧换成空的绘制列表，display 始终是真正的渲染器
+        display = self.renderer
+        pipeline = RenderPipeline(display) if self.pipelined else None
         while self.running:
-            self.handle_events()
-            self.update()
-            self.draw()
+            profiler.begin_frame()
+            with profiler.section('events'):
+                self.handle_events()
+            with profiler.section('update'):
+                if self.delta_time:
+                    accumulator += min(elapsed, MAX_FRAME_MS)
+                    while accumulator >= STEP_MS:
+                        accumulator -= STEP_MS
+                        self.fixed_update()
+                    # 画面停在上一步与当前步之间，按剩余时间回退
+                    if self.state == GameState.PLAYING and not self.dirty_rects:
+                        self.render_lag = 1 - accumulator / STEP_MS
+                    else:
+                        self.render_lag = 0
+                else:
+                    self.fixed_update()
+            with profiler.section('draw'):
+                if pipeline is not None:
+                    self.renderer = pipeline.back()
+                rects = self.draw()
+                if profiler.overlay and self.renderer.enabled:
+                    overlay_rect = profiler.draw_overlay(self.renderer,
+                                                        font_cache.get(self.font_small))
+                    if rects is not None:
+                        rects.append(overlay_rect)
+            if pipeline is not None:
+                # 等渲染线程画完上一帧：接下来显示的是上一帧，本帧录好的列表随后交给渲染线程
+                with profiler.section('render_wait'):
+                    recorded, rects = rects, pipeline.wait()
+                profiler.add('render', pipeline.render_time)
+            if self.capture is not None:
+                with profiler.section('capture'):
+                    # GPU 渲染没有显示 Surface，在提交前读回画面
+                    self.capture.add(self.screen if self.screen is not None
+                                     else display.to_surface())
             
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            with profiler.section('display'):
+                display.present(rects)
+            if pipeline is not None:
+                pipeline.submit(recorded)
+            profiler.end_frame(self.sprite_counts())
+            elapsed = self.clock.tick(self.max_fps)
         
+        if pipeline is not None:
+            pipeline.close()
+            self.renderer = display
+        if profiler.enabled and profiler.frames:
+            profiler.dump(self.metrics_path)
+        self.finish_recording()
+        if self.capture is not None:
+            print_capture_stats(self.capture.close())
+        self.scores.close()
+        surface_cache.save()
+        self.renderer.close()
         pygame.quit()
         sys.exit()
 
+    def step(self, move=0, shoot=False):
+        """无界面模式下推进一个固定逻辑帧"""
+        if self.state == GameState.PLAYING:
+            self.apply_input(move, shoot)
+        self.update()
+
+    def simulate(self, frames, policy=None):
+        """
+        无界面模式下连续模拟若干逻辑帧，不限帧率
+        policy(game) 返回 (move, shoot)；为 None 时玩家保持静止不开火
+        游戏结束时提前停止，返回实际模拟的帧数
+        """
+        if self.state != GameState.PLAYING:
+            self.start_game()
+        for frame in range(frames):
+            if self.state != GameState.PLAYING:
+                return frame
+            move, shoot = policy(self) if policy else (0, False)
+            self.step(move, shoot)
+        return frames
+
 if __name__ == "__main__":
-    game = Game()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Space Shooter - 太空射击游戏")
+    parser.add_argument('--dirty', action='store_true',
+                        help="局部刷新模式：只重绘变化区域，适合低功耗设备")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="随机种子（相同种子和操作得到相同的游戏过程）")
+    parser.add_argument('--record', metavar='PATH', default=None,
+                        help="把每局的操作录制到文件，可用 replay.py 回放校验")
+    parser.add_argument('--profile', action='store_true',
+                        help="启用内置性能分析（F3 叠加显示，F4 导出数据）")
+    parser.add_argument('--metrics', metavar='PATH', default=None,
+                        help="性能数据导出路径（.csv 或 .json，默认 metrics.csv）")
+    parser.add_argument('--entities', choices=['sprites', 'arrays'], default='sprites',
+                        help="实体后端：arrays 把子弹和敌机存放在 NumPy 数组中，适合大量弹幕")
+    parser.add_argument('--delta', action='store_true',
+                        help="插值模式：按实际经过的时间推进固定物理步，渲染时插值")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="画面刷新率上限（插值模式下可设为 30、144 等，0 表示不限）")
+    parser.add_argument('--renderer', choices=RENDERERS, default='software',
+                        help="渲染后端：software 软件绘制，gpu 硬件加速纹理，null 不绘制")
+    parser.add_argument('--mute', action='store_true',
+                        help="关闭音频（不初始化混音器，启动更快）")
+    parser.add_argument('--spawns', default='random', metavar='MODE',
+                        help="刷怪方式：random（默认）、schedule（预编译时间表）或关卡文件路径")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="流水线渲染：绘制在独立的渲染线程中与下一帧的模拟并行执行")
+    parser.add_argument('--capture', metavar='PATH', default=None,
+                        help="录制画面：目录（PNG 序列）或 .rgb 文件（原始视频），后台线程编码")
+    args = parser.parse_args()
+    
+    game = Game(dirty_rects=args.dirty, seed=args.seed, record_path=args.record,
+                profile=args.profile, metrics_path=args.metrics,
+                entity_backend=args.entities, delta_time=args.delta, max_fps=args.fps,
+                audio=not args.mute, renderer=args.renderer, spawns=args.spawns,
+                capture_path=args.capture, pipelined=args.pipeline)
     game.run()
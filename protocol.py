@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+📡 多人对战网络协议
+
+所有消息都是 4 字节长度（小端）+ 1 字节类型 + 负载：
+
+    客户端 -> 服务器
+        J  加入房间      <H 房间号（0xFFFF 表示任意房间）
+        I  输入          <bB 移动方向 -1/0/1、是否按住开火（保持到下一条输入消息）
+        S  查询服务器统计
+    服务器 -> 客户端
+        W  欢迎          <BHBBI 玩家编号、房间号、逻辑帧率、发送间隔（帧）、当前帧
+        D  状态增量      见下
+        T  服务器统计    UTF-8 JSON
+
+状态增量不发送完整快照，而是让服务器和客户端维护同一份“航位推算”模型：
+每个实体出现时发送一次编号、类型、位置和每帧位移（1/256 像素定点数），
+之后客户端按位移自行推算位置；只有推算结果与真实位置相差超过 TOLERANCE 像素时才发送校正，
+实体消失时发送编号。稳定飞行的敌机和子弹因此几乎不占带宽。
+同一房间的所有客户端共用一份模型，每次广播只编码一次；新加入或积压后重新同步的客户端
+收到的是关键帧（把模型中的全部实体当作新出现的实体发送）。
+
+状态增量 D 的结构：
+    头部      <IIHBBB 帧号、分数、等级、游戏状态、玩家数、标志（第 0 位为关键帧）
+    玩家      每人 <BhhhBB 编号、x、y、生命、武器等级、标志（第 0 位存活，第 1 位无敌）
+    4 个通道  敌机、玩家子弹、敌机子弹、道具，每个通道：
+              <HHH 新增数、校正数、消失数，随后依次是三种记录的数组
+"""
+
+import json
+import struct
+
+import numpy as np
+
+# 消息类型
+JOIN = b'J'
+INPUT = b'I'
+STATS_REQUEST = b'S'
+WELCOME = b'W'
+STATE = b'D'
+STATS = b'T'
+
+ANY_ROOM = 0xFFFF
+LENGTH = struct.Struct('<I')
+JOIN_BODY = struct.Struct('<H')
+INPUT_BODY = struct.Struct('<bB')
+WELCOME_BODY = struct.Struct('<BHBBI')
+STATE_HEADER = struct.Struct('<IIHBBB')
+PLAYER = struct.Struct('<BhhhBB')
+CHANNEL_HEADER = struct.Struct('<HHH')
+
+KEYFRAME = 0x01
+PLAYER_ALIVE = 0x01
+PLAYER_INVINCIBLE = 0x02
+
+# 实体通道
+CHANNELS = ['enemies', 'bullets', 'enemy_bullets', 'power_ups']
+# 位移的定点数精度（1/256 像素）
+FIXED_ONE = 256
+# 推算位置与真实位置允许的误差（像素）
+TOLERANCE = 1
+# 单条消息的长度上限，防止恶意或损坏的数据占满内存
+MAX_MESSAGE = 1 << 22
+
+SPAWN = np.dtype([('uid', '<u4'), ('kind', 'u1'), ('x', '<i2'), ('y', '<i2'),
+                  ('vx', '<i2'), ('vy', '<i2'), ('age', '<u2')])
+CORRECTION = np.dtype([('uid', '<u4'), ('x', '<i2'), ('y', '<i2')])
+REMOVAL = np.dtype('<u4')
+
+
+def pack(kind, body=b''):
+    """组装一条消息"""
+    return LENGTH.pack(len(body) + 1) + kind + body
+
+
+async def read_message(reader):
+    """读取一条消息，返回 (类型, 负载)；连接关闭时抛出 asyncio.IncompleteReadError"""
+    (size,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+    if not 0 < size <= MAX_MESSAGE:
+        raise ValueError(f"消息长度不合法: {size}")
+    data = await reader.readexactly(size)
+    return data[:1], data[1:]
+
+
+def stats_message(stats):
+    """服务器统计消息"""
+    return pack(STATS, json.dumps(stats).encode('utf-8'))
+
+
+def predict(x0, v, t0, tick):
+    """航位推算：t0 时刻位于 x0、每帧位移 v/256 的实体在 tick 时的位置（整数像素）"""
+    return x0 + (v * (tick - t0)) // FIXED_ONE
+
+
+class ChannelModel:
+    """
+    一个实体通道的推算模型（服务器和客户端各持有一份，内容保持一致）
+    所有数组按 uid 升序排列
+    """
+    FIELDS = ('uid', 'kind', 'x0', 'y0', 'vx', 'vy', 't0')
+
+    def __init__(self):
+        for name in self.FIELDS:
+            setattr(self, name, np.zeros(0, np.int64))
+
+    def __len__(self):
+        return len(self.uid)
+
+    def positions(self, tick):
+        """tick 时刻的推算位置 (x, y)"""
+        return predict(self.x0, self.vx, self.t0, tick), predict(self.y0, self.vy, self.t0, tick)
+
+    def select(self, mask):
+        """只保留掩码为 True 的实体"""
+        for name in self.FIELDS:
+            setattr(self, name, getattr(self, name)[mask])
+
+    def append(self, records, tick):
+        """追加新出现的实体（records 为 SPAWN 记录数组）"""
+        columns = {'uid': records['uid'], 'kind': records['kind'], 'x0': records['x'],
+                   'y0': records['y'], 'vx': records['vx'], 'vy': records['vy'],
+                   't0': tick - records['age'].astype(np.int64)}
+        for name in self.FIELDS:
+            setattr(self, name, np.concatenate([getattr(self, name),
+                                                columns[name].astype(np.int64)]))
+
+    def spawn_records(self, tick):
+        """把模型中的全部实体写成 SPAWN 记录（关键帧用）"""
+        records = np.zeros(len(self), SPAWN)
+        # 年龄超出 u2 范围时把推算起点挪到最近的时刻
+        age = tick - self.t0
+        old = age > 0xFFFF
+        if old.any():
+            x, y = self.positions(tick)
+            self.x0[old], self.y0[old], self.t0[old] = x[old], y[old], tick
+            age = tick - self.t0
+        records['uid'] = self.uid
+        records['kind'] = self.kind
+        records['x'] = self.x0
+        records['y'] = self.y0
+        records['vx'] = self.vx
+        records['vy'] = self.vy
+        records['age'] = age
+        return records
+
+
+class DeltaEncoder:
+    """
+    服务器端：比较真实状态与推算模型，生成状态增量
+    truth 为每个通道的 (uid, kind, x, y, vx, vy) 数组，uid 升序，vx/vy 为 1/256 像素定点数
+    """
+    def __init__(self, tolerance=TOLERANCE):
+        self.models = [ChannelModel() for _ in CHANNELS]
+        self.tolerance = tolerance
+
+    def encode(self, tick, header, players, truth):
+        """更新模型并返回本次广播的增量消息"""
+        parts = [self.header(tick, header, players, 0)]
+        for model, channel in zip(self.models, truth):
+            parts.append(self.encode_channel(model, tick, *channel))
+        return pack(STATE, b''.join(parts))
+
+    def keyframe(self, tick, header, players):
+        """当前模型的完整快照（不修改模型）"""
+        parts = [self.header(tick, header, players, KEYFRAME)]
+        for model in self.models:
+            records = model.spawn_records(tick)
+            parts.append(CHANNEL_HEADER.pack(len(records), 0, 0) + records.tobytes())
+        return pack(STATE, b''.join(parts))
+
+    @staticmethod
+    def header(tick, header, players, flags):
+        """头部与玩家记录"""
+        score, level, state = header
+        return STATE_HEADER.pack(tick, score, level, state, len(players), flags) + b''.join(
+            PLAYER.pack(*player) for player in players)
+
+    def encode_channel(self, model, tick, uid, kind, x, y, vx, vy):
+        """一个通道的增量：新增、校正、消失"""
+        # 模型中的实体在真实状态里的位置
+        index = np.searchsorted(uid, model.uid)
+        found = index < len(uid)
+        found[found] = uid[index[found]] == model.uid[found]
+        removed = model.uid[~found]
+        model.select(found)
+        index = index[found]
+
+        # 推算位置偏差超过容差的实体发送校正，并把推算起点移到当前位置
+        px, py = model.positions(tick)
+        tx, ty = x[index], y[index]
+        drift = np.flatnonzero((np.abs(px - tx) > self.tolerance) |
+                               (np.abs(py - ty) > self.tolerance))
+        corrections = np.zeros(len(drift), CORRECTION)
+        if len(drift):
+            corrections['uid'] = model.uid[drift]
+            corrections['x'] = model.x0[drift] = tx[drift]
+            corrections['y'] = model.y0[drift] = ty[drift]
+            model.t0[drift] = tick
+
+        # 新出现的实体（uid 单调递增，追加后模型仍然有序）
+        fresh = np.ones(len(uid), bool)
+        fresh[index] = False
+        spawns = np.zeros(int(fresh.sum()), SPAWN)
+        if len(spawns):
+            spawns['uid'] = uid[fresh]
+            spawns['kind'] = kind[fresh]
+            spawns['x'] = x[fresh]
+            spawns['y'] = y[fresh]
+            spawns['vx'] = vx[fresh]
+            spawns['vy'] = vy[fresh]
+            model.append(spawns, tick)
+        return (CHANNEL_HEADER.pack(len(spawns), len(corrections), len(removed)) +
+                spawns.tobytes() + corrections.tobytes() + removed.astype(REMOVAL).tobytes())
+
+
+class StateMirror:
+    """客户端：应用服务器发来的增量，维护与服务器一致的推算模型"""
+    def __init__(self):
+        self.models = [ChannelModel() for _ in CHANNELS]
+        self.tick = 0
+        self.score = 0
+        self.level = 1
+        self.state = 0
+        self.players = []
+        self.synced = False
+        # 最近一条增量里消失的实体，每个通道一组 (类型, x, y)，供客户端播放爆炸等效果
+        self.vanished = [None] * len(CHANNELS)
+        self.messages = 0
+        self.bytes = 0
+
+    def apply(self, body):
+        """应用一条 D 消息的负载"""
+        tick, score, level, state, player_count, flags = STATE_HEADER.unpack_from(body)
+        offset = STATE_HEADER.size
+        players = [PLAYER.unpack_from(body, offset + i * PLAYER.size)
+                   for i in range(player_count)]
+        offset += player_count * PLAYER.size
+        keyframe = bool(flags & KEYFRAME)
+        if keyframe:
+            self.models = [ChannelModel() for _ in CHANNELS]
+            self.synced = True
+        elif not self.synced:
+            # 还没收到关键帧，增量无从应用
+            return
+        self.tick, self.score, self.level, self.state = tick, score, level, state
+        self.players = players
+        self.messages += 1
+        self.bytes += len(body) + LENGTH.size + 1
+
+        for channel, model in enumerate(self.models):
+            spawned, corrected, removed = CHANNEL_HEADER.unpack_from(body, offset)
+            offset += CHANNEL_HEADER.size
+            spawns = np.frombuffer(body, SPAWN, spawned, offset)
+            offset += spawns.nbytes
+            corrections = np.frombuffer(body, CORRECTION, corrected, offset)
+            offset += corrections.nbytes
+            removals = np.frombuffer(body, REMOVAL, removed, offset)
+            offset += removals.nbytes
+
+            self.vanished[channel] = None
+            if len(removals):
+                gone = np.isin(model.uid, removals)
+                x, y = model.positions(tick)
+                self.vanished[channel] = model.kind[gone], x[gone], y[gone]
+                model.select(~gone)
+            if len(corrections):
+                index = np.searchsorted(model.uid, corrections['uid'])
+                model.x0[index] = corrections['x']
+                model.y0[index] = corrections['y']
+                model.t0[index] = tick
+            if len(spawns):
+                model.append(spawns, tick)
+
+    def entities(self, channel, tick=None):
+        """某个通道全部实体的 (类型, x, y) 数组；tick 可以是小数（两次广播之间的插值）"""
+        model = self.models[CHANNELS.index(channel)]
+        tick = self.tick if tick is None else tick
+        elapsed = tick - model.t0
+        x = model.x0 + model.vx * elapsed / FIXED_ONE
+        y = model.y0 + model.vy * elapsed / FIXED_ONE
+        # 与 predict 一样向下取整，整数 tick 时结果与服务器的推算完全相同
+        return model.kind, np.floor(x).astype(np.int64), np.floor(y).astype(np.int64)
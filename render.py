@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+🖥️ 渲染后端
+
+Game 的所有绘制都经过渲染器，同一套游戏逻辑可以换用三种后端：
+    null      什么都不画（无界面模拟、批量对局）
+    software  pygame 软件绘制到显示 Surface（默认，没有 GPU 的 Linux 机器也能运行）
+    gpu       pygame._sdl2.video 的 Renderer/Texture：图像第一次绘制时上传为纹理，
+              之后每帧只提交绘制命令，由显卡完成混合
+
+渲染器和 Surface 一样提供 blit/blits，精灵组的 draw() 与实体存储的 draw() 可以直接画到渲染器上。
+
+流水线渲染（RenderPipeline）时，游戏逻辑画到只记录命令的绘制列表上，由渲染线程在后台
+把上一帧的列表画到软件渲染器上，与下一帧的模拟并行执行。
+"""
+
+import threading
+import time
+import weakref
+
+import pygame
+
+RENDERERS = ['software', 'gpu', 'null']
+
+
+class NullRenderer:
+    """空渲染器：不创建窗口，也不绘制任何内容"""
+    name = 'null'
+    # 为 False 时 Game.draw() 直接跳过整个绘制流程
+    enabled = False
+
+    def __init__(self, size):
+        self.size = size
+        self.surface = None
+
+    def get_width(self):
+        return self.size[0]
+
+    def get_height(self):
+        return self.size[1]
+
+    def clear(self, color):
+        pass
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        return pygame.Rect(dest[0], dest[1], *source.get_size())
+
+    def blits(self, sequence, doreturn=True):
+        if doreturn:
+            return [self.blit(*item) for item in sequence]
+        return None
+
+    def draw_starfield(self, starfield, lag=0):
+        pass
+
+    def present(self, rects=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class SoftwareRenderer(NullRenderer):
+    """软件渲染：直接画到 Surface 上（显示窗口或离屏画布）"""
+    name = 'software'
+    enabled = True
+
+    def __init__(self, surface):
+        super().__init__(surface.get_size())
+        self.surface = surface
+        # 画到窗口时 present() 刷新屏幕；离屏画布（如训练环境的像素观测）不需要
+        self.display = surface is pygame.display.get_surface()
+
+    @classmethod
+    def create(cls, size, caption):
+        """打开窗口"""
+        surface = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+        return cls(surface)
+
+    def clear(self, color):
+        self.surface.fill(color)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        return self.surface.blit(source, dest, area, special_flags)
+
+    def blits(self, sequence, doreturn=True):
+        return self.surface.blits(sequence, doreturn)
+
+    def draw_starfield(self, starfield, lag=0):
+        starfield.draw(self.surface, lag)
+
+    def present(self, rects=None):
+        """rects 为 None 时整屏刷新，否则只刷新这些区域（空列表表示画面没有变化）"""
+        if not self.display or rects == []:
+            return
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+
+
+class GpuRenderer(NullRenderer):
+    """
+    硬件加速渲染（pygame._sdl2.video）
+    每个 Surface 第一次绘制时上传成纹理并缓存，Surface 被回收后纹理随之释放；
+    内容会变化的图像（HUD 文字、血条）每次变化都换成新的 Surface，因此不会用到过期纹理
+    """
+    name = 'gpu'
+    enabled = True
+
+    def __init__(self, window, renderer):
+        super().__init__(tuple(window.size))
+        self.window = window
+        self.renderer = renderer
+        self.textures = weakref.WeakKeyDictionary()
+        self.star_textures = {}
+
+    @classmethod
+    def create(cls, size, caption, vsync=False):
+        """打开窗口并创建硬件渲染器（没有可用的 GPU 时 SDL 会退回它自带的软件实现）"""
+        try:
+            from pygame._sdl2 import video
+        except ImportError as error:
+            raise RuntimeError("GPU 渲染需要 pygame 2 的 _sdl2 模块") from error
+        window = video.Window(caption, size)
+        renderer = video.Renderer(window, accelerated=-1, vsync=vsync)
+        return cls(window, renderer)
+
+    def texture(self, surface):
+        """Surface 对应的纹理（第一次用到时上传）"""
+        texture = self.textures.get(surface)
+        if texture is None:
+            from pygame._sdl2 import video
+            texture = self.textures[surface] = video.Texture.from_surface(self.renderer, surface)
+        return texture
+
+    def clear(self, color):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.clear()
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        # 与 Surface.blit 一样截断小数坐标
+        x, y = int(dest[0]), int(dest[1])
+        self.texture(source).draw(area, (x, y))
+        return pygame.Rect(x, y, *source.get_size())
+
+    def blits(self, sequence, doreturn=True):
+        texture = self.texture
+        if doreturn:
+            return [self.blit(*item) for item in sequence]
+        for item in sequence:
+            dest = item[1]
+            texture(item[0]).draw(None, (int(dest[0]), int(dest[1])))
+        return None
+
+    def draw_starfield(self, starfield, lag=0):
+        """每颗星星用白色圆点纹理按亮度调色后绘制"""
+        for x, y, size, brightness in starfield.points(lag):
+            texture = self.star_textures.get(size)
+            if texture is None:
+                from pygame._sdl2 import video
+                span = size * 2 + 1
+                dot = pygame.Surface((span, span), pygame.SRCALPHA)
+                pygame.draw.circle(dot, (255, 255, 255), (size, size), size)
+                texture = self.star_textures[size] = video.Texture.from_surface(
+                    self.renderer, dot)
+            texture.color = (brightness, brightness, brightness)
+            texture.draw(None, (x - size, y - size))
+
+    def present(self, rects=None):
+        # 空列表表示画面没有变化，屏幕保持上次提交的内容；
+        # 否则纹理合成的代价与重绘区域无关，总是整屏提交
+        if rects == []:
+            return
+        self.renderer.present()
+
+    def to_surface(self):
+        """读回当前画面（截图、校验用）"""
+        return self.renderer.to_surface()
+
+    def close(self):
+        self.textures.clear()
+        self.star_textures.clear()
+        self.window.destroy()
+
+
+class DrawList(NullRenderer):
+    """
+    绘制列表：接口与渲染器相同，但只记录绘制命令，由 replay() 画到真正的渲染器上
+    记录时复制之后会被修改的参数（精灵的 Rect、星空的位置），录完的列表不再随游戏状态变化；
+    图像本身不复制，游戏中内容会变化的图像每次都换成新的 Surface
+    """
+    name = 'draw_list'
+    enabled = True
+
+    def __init__(self, size):
+        super().__init__(size)
+        self.commands = []
+
+    def reset(self):
+        """清空已记录的命令"""
+        self.commands.clear()
+
+    def clear(self, color):
+        self.commands.append(('clear', (color,)))
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        if area is not None:
+            area = pygame.Rect(area)
+        self.commands.append(('blit', (source, (dest[0], dest[1]), area, special_flags)))
+        return pygame.Rect(dest[0], dest[1], *source.get_size())
+
+    def blits(self, sequence, doreturn=True):
+        rect = pygame.Rect
+        items = [(item[0], item[1].copy()) + tuple(item[2:]) if isinstance(item[1], rect)
+                 else item for item in sequence]
+        self.commands.append(('blits', (items, False)))
+        if doreturn:
+            return [rect(item[1][0], item[1][1], *item[0].get_size()) for item in items]
+        return None
+
+    def draw_starfield(self, starfield, lag=0):
+        self.commands.append(('draw_starfield', (starfield.snapshot(), lag)))
+
+    def replay(self, renderer):
+        """按顺序把记录的命令画到 renderer 上"""
+        for name, args in self.commands:
+            getattr(renderer, name)(*args)
+
+
+class RenderPipeline:
+    """
+    流水线渲染
+    两个绘制列表交替使用（双缓冲）：渲染线程画第 N 帧的列表时，游戏线程已经在推进并录制第 N+1 帧。
+    Surface.blit 执行期间释放 GIL，多核机器上两者真正并行；代价是画面比串行模式晚一帧显示。
+    显示刷新仍在游戏线程进行（SDL 要求窗口操作在主线程），只支持软件渲染
+    """
+    def __init__(self, renderer):
+        if not isinstance(renderer, SoftwareRenderer):
+            raise ValueError("流水线渲染只支持软件渲染")
+        self.renderer = renderer
+        self.lists = [DrawList(renderer.size), DrawList(renderer.size)]
+        self.index = 0
+        # 交给渲染线程的列表，以及它画完后需要刷新的区域（空列表表示还没有新画面）
+        self.pending = None
+        self.rects = []
+        # 渲染线程画完上一帧用的时间（秒）
+        self.render_time = 0.0
+        self.error = None
+        self.wake = threading.Semaphore(0)
+        self.idle = threading.Event()
+        self.idle.set()
+        self.thread = threading.Thread(target=self.render_loop, name='render', daemon=True)
+        self.thread.start()
+
+    def back(self):
+        """本帧录制用的绘制列表（已清空）"""
+        draw_list = self.lists[self.index]
+        draw_list.reset()
+        return draw_list
+
+    def wait(self):
+        """等渲染线程画完上一帧，返回该帧需要刷新的区域（交给 present）"""
+        self.idle.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        return self.rects
+
+    def submit(self, rects=None):
+        """
+        把本帧录好的列表交给渲染线程（需先调用 wait），rects 为录制时 Game.draw() 的返回值
+        """
+        self.idle.clear()
+        self.pending = self.lists[self.index]
+        self.rects = rects
+        self.index ^= 1
+        self.wake.release()
+
+    def render_loop(self):
+        """渲染线程：每次被唤醒画一个列表，列表为 None 时退出"""
+        while True:
+            self.wake.acquire()
+            draw_list = self.pending
+            if draw_list is None:
+                break
+            start = time.perf_counter()
+            try:
+                draw_list.replay(self.renderer)
+            except Exception as error:
+                # 交给游戏线程在下一次 wait() 时抛出
+                self.error = error
+            self.render_time = time.perf_counter() - start
+            self.idle.set()
+
+    def close(self):
+        """等待最后一帧画完并结束渲染线程"""
+        self.idle.wait()
+        self.pending = None
+        self.wake.release()
+        self.thread.join()
+
+
+def create_renderer(name, size, caption, vsync=False):
+    """按名称创建渲染器"""
+    if name == 'null':
+        return NullRenderer(size)
+    if name == 'software':
+        return SoftwareRenderer.create(size, caption)
+    if name == 'gpu':
+        return GpuRenderer.create(size, caption, vsync)
+    raise ValueError(f"未知的渲染后端: {name}")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+🎬 回放录制与校验
+
+每个逻辑帧的输入压缩成 1 个字节（低两位为移动方向，第三位为是否开火），
+整局输入再用 zlib 压缩。文件结构：
+
+    文件头   魔数 b'SSRP'、版本号、本局种子、帧数
+    刷怪方式 长度 + UTF-8 文本：random / schedule / 关卡文件路径（版本 1 的文件没有这一项，视为 random）
+    摘要     录制结束时游戏状态的 SHA-256
+    数据     zlib 压缩后的逐帧输入
+
+回放在无界面模式下以不限帧率的速度重新模拟整局，
+最终状态摘要与录制时一致即说明结果可信（例如用于校验高分）。回放时自动切换到录制时的刷怪方式。
+"""
+
+import struct
+import sys
+import time
+import zlib
+
+MAGIC = b'SSRP'
+VERSION = 2
+HEADER = struct.Struct('<4sBQI')
+TEXT = struct.Struct('<H')
+DIGEST_SIZE = 32
+
+# 移动方向与编码的对应关系
+MOVE_CODES = {0: 0, -1: 1, 1: 2}
+MOVES = {code: move for move, code in MOVE_CODES.items()}
+SHOOT_BIT = 0b100
+
+
+def encode_input(move, shoot):
+    """把一帧输入编码为一个字节"""
+    return MOVE_CODES[move] | (SHOOT_BIT if shoot else 0)
+
+
+def decode_input(code):
+    """把一个字节解码为 (move, shoot)"""
+    return MOVES[code & 0b11], bool(code & SHOOT_BIT)
+
+
+class Recorder:
+    """录制一局游戏的逐帧输入"""
+    def __init__(self, seed, spawns='random'):
+        self.seed = seed
+        self.spawns = spawns
+        self.inputs = bytearray()
+
+    def record(self, move, shoot):
+        """记录一帧输入"""
+        self.inputs.append(encode_input(move, shoot))
+
+    def to_bytes(self, digest):
+        """序列化为回放文件内容"""
+        header = HEADER.pack(MAGIC, VERSION, self.seed, len(self.inputs))
+        spawns = self.spawns.encode('utf-8')
+        return (header + TEXT.pack(len(spawns)) + spawns + digest +
+                zlib.compress(bytes(self.inputs), 9))
+
+    def save(self, path, digest):
+        """写入回放文件"""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes(digest))
+
+
+class Replay:
+    """一局游戏的回放"""
+    def __init__(self, seed, inputs, digest, spawns='random'):
+        self.seed = seed
+        self.inputs = inputs
+        self.digest = digest
+        self.spawns = spawns
+
+    @classmethod
+    def from_bytes(cls, data):
+        """从回放文件内容解析"""
+        magic, version, seed, frames = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("不是回放文件")
+        if version not in (1, VERSION):
+            raise ValueError(f"不支持的回放版本: {version}")
+        offset = HEADER.size
+        spawns = 'random'
+        if version >= 2:
+            (size,) = TEXT.unpack_from(data, offset)
+            offset += TEXT.size
+            spawns = data[offset:offset + size].decode('utf-8')
+            offset += size
+        digest = data[offset:offset + DIGEST_SIZE]
+        inputs = zlib.decompress(data[offset + DIGEST_SIZE:])
+        if len(inputs) != frames:
+            raise ValueError("回放数据不完整")
+        return cls(seed, inputs, digest, spawns)
+
+    @classmethod
+    def load(cls, path):
+        """读取回放文件"""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def run(self, game, on_step=None):
+        """
+        在（无界面的）游戏实例上重新模拟整局，返回该实例
+        game 会切换到录制时的刷怪方式；on_step(game) 在每帧推进之后调用（如导出画面）
+        """
+        game.spawns = self.spawns
+        game.start_game(self.seed)
+        for code in self.inputs:
+            move, shoot = decode_input(code)
+            game.step(move, shoot)
+            if on_step is not None:
+                on_step(game)
+        return game
+
+    def verify(self, game):
+        """重新模拟并检查最终状态是否与录制时完全一致"""
+        self.run(game)
+        return game.state_digest() == self.digest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from main import FPS, Game
+
+    parser = argparse.ArgumentParser(description="回放并校验录像文件")
+    parser.add_argument('path', help="录像文件（由 main.py --record 生成）")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.path)
+    game = Game(headless=True)
+    start = time.perf_counter()
+    ok = replay.verify(game)
+    elapsed = time.perf_counter() - start
+
+    frames = len(replay.inputs)
+    print(f"种子: {replay.seed}  帧数: {frames}  分数: {game.score}  等级: {game.level}")
+    print(f"耗时: {elapsed:.3f} 秒（{frames / FPS / max(elapsed, 1e-9):.0f} 倍实时速度）")
+    print("校验通过 ✅" if ok else "校验失败 ❌ 最终状态与录制时不一致")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+🏆 高分与排行榜存储
+
+最高分保存在 highscore.txt，每局成绩（分数、等级、时长、种子）保存在 SQLite 排行榜中。
+游戏线程只更新内存中的数据并把写入请求放进队列，由后台线程完成磁盘写入，
+磁盘卡顿不会让游戏掉帧。highscore.txt 先写临时文件、刷盘后再原子替换，
+写到一半崩溃也不会损坏原文件。
+
+    python scores.py            # 查看排行榜
+    python scores.py -n 20
+"""
+
+import os
+import queue
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+HIGH_SCORE_FILE = 'highscore.txt'
+LEADERBOARD_FILE = 'scores.db'
+TOP_N = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    seed INTEGER,
+    played_at REAL NOT NULL
+)
+"""
+COLUMNS = ('score', 'level', 'duration', 'seed', 'played_at')
+
+
+def atomic_write(path, data):
+    """先写同目录下的临时文件并刷盘，再用 os.replace 原子替换目标文件（data 可以是文本或字节）"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path),
+                                     suffix='.tmp')
+    try:
+        # mkstemp 创建的文件只有属主可读写，沿用原文件的权限
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        with os.fdopen(fd, 'wb' if isinstance(data, bytes) else 'w') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_high_score(path):
+    """读取最高分；文件不存在或内容损坏时返回 0"""
+    try:
+        with open(path, 'r') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+
+def read_leaderboard(path, limit=TOP_N):
+    """读取排行榜前 limit 名（数据库不存在时返回空列表）"""
+    if not os.path.exists(path):
+        return []
+    try:
+        connection = sqlite3.connect(path)
+        try:
+            rows = connection.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM scores "
+                "ORDER BY score DESC, played_at ASC LIMIT ?", (limit,)).fetchall()
+        finally:
+            connection.close()
+    except sqlite3.Error:
+        return []
+    return [dict(zip(COLUMNS, row)) for row in rows]
+
+
+class ScoreStore:
+    """
+    高分与排行榜
+    load 在启动时同步读取；submit 只修改内存并排队，真正的写入在后台线程完成
+    """
+    def __init__(self, directory='.', top_n=TOP_N):
+        self.high_score_path = os.path.join(directory, HIGH_SCORE_FILE)
+        self.leaderboard_path = os.path.join(directory, LEADERBOARD_FILE)
+        self.top_n = top_n
+        self.high_score = 0
+        self.leaderboard = []
+        self.queue = queue.Queue()
+        self.thread = None
+        # 后台写入失败的次数和最后一次错误（写入失败不影响游戏）
+        self.errors = 0
+        self.last_error = None
+
+    def load(self):
+        """读取最高分和排行榜，返回最高分"""
+        self.leaderboard = read_leaderboard(self.leaderboard_path, self.top_n)
+        best = self.leaderboard[0]['score'] if self.leaderboard else 0
+        self.high_score = max(read_high_score(self.high_score_path), best)
+        return self.high_score
+
+    def submit(self, score, level, duration, seed=None):
+        """提交一局成绩，返回是否刷新了最高分（不会阻塞调用方）"""
+        entry = {'score': score, 'level': level, 'duration': duration, 'seed': seed,
+                 'played_at': time.time()}
+        self.leaderboard.append(entry)
+        self.leaderboard.sort(key=lambda item: (-item['score'], item['played_at']))
+        del self.leaderboard[self.top_n:]
+
+        new_record = score > self.high_score
+        if new_record:
+            self.high_score = score
+        self.start()
+        self.queue.put((entry, self.high_score if new_record else None))
+        return new_record
+
+    def start(self):
+        """按需启动后台写入线程"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.write_loop, name='score-writer',
+                                           daemon=True)
+            self.thread.start()
+
+    def write_loop(self):
+        """后台线程：依次处理写入请求，收到 None 时退出"""
+        connection = None
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    break
+                entry, high_score = item
+                try:
+                    if connection is None:
+                        connection = sqlite3.connect(self.leaderboard_path)
+                        connection.execute("PRAGMA journal_mode=WAL")
+                        connection.execute(SCHEMA)
+                    with connection:
+                        connection.execute(
+                            f"INSERT INTO scores ({', '.join(COLUMNS)}) VALUES (?, ?, ?, ?, ?)",
+                            [entry[column] for column in COLUMNS])
+                    if high_score is not None:
+                        atomic_write(self.high_score_path, str(high_score))
+                except (OSError, sqlite3.Error) as error:
+                    self.errors += 1
+                    self.last_error = error
+            finally:
+                self.queue.task_done()
+        if connection is not None:
+            connection.close()
+
+    def flush(self):
+        """等待已提交的写入全部完成"""
+        if self.thread is not None:
+            self.queue.join()
+
+    def close(self, timeout=2.0):
+        """写完队列中剩余的成绩后停止后台线程（最多等待 timeout 秒）"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+            self.thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="查看排行榜")
+    parser.add_argument('-n', '--top', type=int, default=TOP_N, help="显示前几名")
+    parser.add_argument('-d', '--directory', default='.', help="数据目录")
+    args = parser.parse_args()
+
+    store = ScoreStore(args.directory, args.top)
+    store.load()
+    print(f"最高分: {store.high_score}")
+    for rank, entry in enumerate(store.leaderboard, 1):
+        played_at = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['played_at']))
+        print(f"{rank:>3}. {entry['score']:>7}  等级 {entry['level']:>2}  "
+              f"{entry['duration']:7.1f} 秒  种子 {entry['seed']}  {played_at}")
+    sys.exit(0)
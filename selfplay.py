@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+🤖 批量自动对局
+
+在进程池里同时运行大量无界面 Game，每局使用独立种子，由可替换的策略操控，
+最后汇总得分、等级和存活时间的分布，用于调整难度曲线：
+
+    python selfplay.py --games 10000 --policy tracker
+    python selfplay.py --games 2000 --param SPAWN_DELAY_STEP=4 -o sweep.json
+
+策略可以是内置名称（idle / random / tracker），也可以是 "模块:工厂" 形式，
+工厂以本局种子为参数，返回 policy(game) -> (move, shoot) 的可调用对象。
+每局结果只取决于种子、策略和参数，与进程数无关。
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+# 必须在导入 pygame 之前设置
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+from main import Game, FPS
+
+# 单局最长帧数（默认 10 分钟），到达上限视为存活
+MAX_FRAMES = FPS * 600
+
+
+class IdlePolicy:
+    """原地不动，持续开火"""
+    def __init__(self, seed):
+        pass
+
+    def __call__(self, game):
+        return 0, True
+
+
+class RandomPolicy:
+    """随机移动，随机开火"""
+    def __init__(self, seed, shoot_rate=0.5):
+        self.rng = random.Random(seed)
+        self.shoot_rate = shoot_rate
+
+    def __call__(self, game):
+        return self.rng.choice((-1, 0, 1)), self.rng.random() < self.shoot_rate
+
+
+class TrackerPolicy:
+    """对准最靠近底部的敌机，持续开火"""
+    def __init__(self, seed):
+        pass
+
+    def __call__(self, game):
+        target = lowest_enemy_x(game)
+        if target is None:
+            return 0, True
+        x = game.player.rect.centerx
+        if target < x - game.player.speed:
+            return -1, True
+        if target > x + game.player.speed:
+            return 1, True
+        return 0, True
+
+
+def lowest_enemy_x(game):
+    """最靠近底部的敌机中心 x（没有敌机时返回 None）"""
+    if not len(game.enemies):
+        return None
+    if game.entity_arrays:
+        x, y, w, h = game.enemies.rects()
+        index = int((y + h).argmax())
+        return int(x[index] + w[index] // 2)
+    return max(game.enemies, key=lambda enemy: enemy.rect.bottom).rect.centerx
+
+
+POLICIES = {
+    'idle': IdlePolicy,
+    'random': RandomPolicy,
+    'tracker': TrackerPolicy,
+}
+
+
+def load_policy(name):
+    """按名称取得策略工厂：内置名称或 "模块:属性" """
+    if name in POLICIES:
+        return POLICIES[name]
+    module, sep, attr = name.partition(':')
+    if not sep:
+        raise ValueError(f"未知的策略: {name}")
+    return getattr(importlib.import_module(module), attr)
+
+
+def game_seeds(seed, count):
+    """由总种子派生每局的种子"""
+    rng = random.Random(seed)
+    return [rng.getrandbits(63) for _ in range(count)]
+
+
+def play_chunk(seeds, policy, max_frames, params, backend, spawns='random'):
+    """在当前进程里依次进行若干局，返回每局的结果"""
+    factory = load_policy(policy)
+    game = Game(headless=True, entity_backend=backend, spawns=spawns)
+    for name, value in params.items():
+        setattr(game, name, value)
+
+    results = []
+    for seed in seeds:
+        game.start_game(seed)
+        frames = game.simulate(max_frames, factory(seed))
+        results.append({
+            'seed': seed,
+            'score': game.score,
+            'level': game.level,
+            'frames': frames,
+            'survived': frames >= max_frames,
+        })
+    return results
+
+
+def run_batch(games, seed=0, policy='random', workers=None, max_frames=MAX_FRAMES,
+              params=None, backend='sprites', chunk_size=None, spawns='random'):
+    """并行进行 games 局，按种子顺序返回结果列表"""
+    seeds = game_seeds(seed, games)
+    params = params or {}
+    workers = workers or os.cpu_count() or 1
+    # 每个任务包含若干局，减少进程间通信；同时保证任务数足够均衡负载
+    chunk_size = chunk_size or max(1, min(50, games // (workers * 4)))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, games, chunk_size)]
+
+    play = partial(play_chunk, policy=policy, max_frames=max_frames, params=params,
+                   backend=backend, spawns=spawns)
+    if workers == 1:
+        parts = [play(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parts = list(executor.map(play, chunks))
+    return [result for part in parts for result in part]
+
+
+def distribution(values):
+    """一组数值的分布统计"""
+    values = sorted(values)
+    count = len(values)
+    if not count:
+        return {}
+    mean = sum(values) / count
+
+    def percentile(p):
+        return values[min(count, max(1, math.ceil(p / 100 * count))) - 1]
+
+    return {
+        'mean': mean,
+        'std': math.sqrt(sum((value - mean) ** 2 for value in values) / count),
+        'min': values[0],
+        'p10': percentile(10),
+        'p25': percentile(25),
+        'p50': percentile(50),
+        'p75': percentile(75),
+        'p90': percentile(90),
+        'max': values[-1],
+    }
+
+
+def summarize(results):
+    """汇总得分、等级和存活时间（秒）的分布"""
+    levels = {}
+    for result in results:
+        levels[result['level']] = levels.get(result['level'], 0) + 1
+    return {
+        'games': len(results),
+        'survived': sum(result['survived'] for result in results),
+        'score': distribution([result['score'] for result in results]),
+        'level': distribution([result['level'] for result in results]),
+        'survival_s': distribution([result['frames'] / FPS for result in results]),
+        'level_histogram': dict(sorted(levels.items())),
+    }
+
+
+def parse_param(text):
+    """解析 NAME=VALUE 形式的难度参数"""
+    name, sep, value = text.partition('=')
+    if not sep or not name.isupper() or not hasattr(Game, name):
+        raise argparse.ArgumentTypeError(f"无效的参数: {text}")
+    return name, float(value) if '.' in value else int(value)
+
+
+def print_report(summary, elapsed):
+    """在终端打印汇总结果"""
+    print(f"{summary['games']} 局，用时 {elapsed:.1f} 秒，"
+          f"{summary['survived']} 局存活到上限")
+    for name in ('score', 'level', 'survival_s'):
+        stats = summary[name]
+        print(f"  {name:<11} mean {stats['mean']:9.1f}  std {stats['std']:8.1f}  "
+              f"p10 {stats['p10']:8.1f}  p50 {stats['p50']:8.1f}  p90 {stats['p90']:8.1f}  "
+              f"max {stats['max']:8.1f}")
+    print("  等级分布  " + "  ".join(f"{level}:{count}"
+                                  for level, count in summary['level_histogram'].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量自动对局")
+    parser.add_argument('-n', '--games', type=int, default=1000, help="对局数")
+    parser.add_argument('--seed', type=int, default=0, help="总种子（派生每局的种子）")
+    parser.add_argument('--policy', default='random',
+                        help="策略：idle / random / tracker 或 模块:工厂")
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help="进程数（默认等于 CPU 核数）")
+    parser.add_argument('--max-frames', type=int, default=MAX_FRAMES, help="单局最长帧数")
+    parser.add_argument('--param', type=parse_param, action='append', default=[],
+                        metavar='NAME=VALUE',
+                        help="覆盖 Game 的难度参数，如 SPAWN_DELAY_STEP=4（可重复）")
+    parser.add_argument('--backend', choices=['sprites', 'arrays'], default='sprites',
+                        help="实体后端")
+    parser.add_argument('--spawns', default='random',
+                        help="刷怪方式：random、schedule 或关卡文件路径")
+    parser.add_argument('-o', '--output', default=None,
+                        help="把汇总和每局结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    load_policy(args.policy)
+    params = dict(args.param)
+    start = time.perf_counter()
+    results = run_batch(args.games, args.seed, args.policy, args.workers,
+                        args.max_frames, params, args.backend, spawns=args.spawns)
+    elapsed = time.perf_counter() - start
+    summary = summarize(results)
+    print_report(summary, elapsed)
+
+    if args.output:
+        report = {
+            'policy': args.policy,
+            'seed': args.seed,
+            'max_frames': args.max_frames,
+            'params': params,
+            'backend': args.backend,
+            'spawns': args.spawns,
+            'summary': summary,
+            'games': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"结果已写入 {args.output}")
+    sys.exit(0)
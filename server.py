@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+🌐 多人对战服务器
+
+权威服务器：每个房间运行一局无界面的 Game（数组实体后端），房间内最多 MAX_PLAYERS 名玩家
+共用同一片战场和分数。所有房间在同一个 asyncio 事件循环里以 60 帧/秒推进，
+每 send_interval 帧向房间内的客户端广播一次状态增量（格式见 protocol.py）。
+写缓冲积压的客户端跳过本次广播，之后用关键帧重新同步，慢客户端不会拖慢整个服务器。
+
+    python server.py                     # 监听 0.0.0.0:7777
+    python server.py --port 0            # 由系统分配端口（启动后打印实际端口）
+    python server.py --send-interval 3   # 每 3 帧广播一次（20 Hz）
+
+统计信息（每帧耗时、CPU 负载、按负载估算的单核可承载房间数、发送字节数）
+可以由客户端发送 S 消息查询，loadtest.py 用它报告容量。
+"""
+
+import argparse
+import asyncio
+import struct
+import time
+
+import numpy as np
+
+from main import (Game, GameState, Player, FPS, SCREEN_WIDTH, round_half_away)
+from protocol import (ANY_ROOM, FIXED_ONE, INPUT, INPUT_BODY, JOIN, JOIN_BODY, PLAYER_ALIVE,
+                      PLAYER_INVINCIBLE, STATS_REQUEST, WELCOME, WELCOME_BODY, DeltaEncoder,
+                      pack, read_message, stats_message)
+
+DEFAULT_PORT = 7777
+MAX_PLAYERS = 4
+# 默认每 2 帧广播一次（30 Hz）
+SEND_INTERVAL = 2
+# 游戏结束后多久自动开始下一局（帧）
+RESTART_DELAY = 3 * FPS
+# 客户端写缓冲超过这个字节数时跳过广播，之后发送关键帧
+WRITE_BUFFER_LIMIT = 256 * 1024
+# 落后太多时最多连续补几帧，超过的部分直接丢弃
+MAX_CATCH_UP = 5
+# 统计窗口（帧）
+STATS_WINDOW = 600
+# 启动后打印的提示（loadtest.py 据此读取实际端口）
+READY = "服务器已启动"
+
+POWER_UP_KINDS = ['health', 'power', 'score']
+
+
+class RoomGame(Game):
+    """
+    多名玩家共用一片战场的 Game
+    每名玩家有独立的飞船和输入；涉及玩家的逻辑依次把 self.player 指向每名存活玩家后复用 Game 的实现。
+    敌机瞄准的目标按帧轮换，所有玩家都阵亡时本局结束
+    """
+    def __init__(self, seed=None):
+        super().__init__(headless=True, seed=seed, entity_backend='arrays')
+        self.players = {}
+        # pid -> [move, shoot]（按住的状态，直到收到下一条输入消息）
+        self.inputs = {}
+        self.next_power_up_uid = 0
+
+    def add_player(self, pid):
+        """加入一名玩家（进行中的对局里立即出生在自己的位置上）"""
+        self.inputs[pid] = [0, False]
+        self.players[pid] = self.spawn_player(pid)
+
+    def remove_player(self, pid):
+        """移除一名玩家"""
+        self.players.pop(pid, None)
+        self.inputs.pop(pid, None)
+        if self.player is not None and self.player not in self.players.values():
+            self.player = next(iter(self.players.values()), None)
+
+    def spawn_player(self, pid):
+        """在 pid 对应的位置生成飞船（各玩家沿屏幕底部均匀分布）"""
+        player = Player(self.now())
+        player.rect.centerx = SCREEN_WIDTH * (pid + 1) // (MAX_PLAYERS + 1)
+        return player
+
+    def live_players(self):
+        """存活的玩家"""
+        return [player for player in self.players.values() if player.health > 0]
+
+    def each_player(self, method, *args):
+        """依次以每名存活玩家为 self.player 调用 method"""
+        for player in self.live_players():
+            self.player = player
+            method(*args)
+
+    def reset_game(self, seed=None):
+        super().reset_game(seed)
+        for pid in self.players:
+            self.players[pid] = self.spawn_player(pid)
+            self.inputs[pid] = [0, False]
+        self.player = next(iter(self.players.values()), self.player)
+
+    def set_input(self, pid, move, shoot):
+        """记录玩家的输入"""
+        if pid in self.inputs:
+            self.inputs[pid] = [max(-1, min(1, move)), bool(shoot)]
+
+    def fixed_update(self):
+        if self.state == GameState.PLAYING:
+            # 存活的玩家都已离开房间
+            if not self.live_players():
+                self.game_over()
+                return
+            for pid, player in self.players.items():
+                if player.health > 0:
+                    self.player = player
+                    self.apply_input(*self.inputs[pid])
+        self.update()
+
+    def update_sprites(self, now):
+        # 第一名存活玩家由 Game.update_sprites 更新，其余玩家在这里更新
+        live = self.live_players()
+        if not live:
+            return
+        for player in live[1:]:
+            player.update(now)
+        self.player = live[0]
+        super().update_sprites(now)
+
+    def fire_enemy_bullets(self):
+        live = self.live_players()
+        if not live:
+            return
+        self.player = live[self.ticks % len(live)]
+        super().fire_enemy_bullets()
+
+    def collide_player_enemies(self, now):
+        self.each_player(super().collide_player_enemies, now)
+
+    def collide_player_enemy_bullets(self, now):
+        self.each_player(super().collide_player_enemy_bullets, now)
+
+    def collide_player_power_ups(self):
+        self.each_player(super().collide_player_power_ups)
+
+    def game_over(self):
+        # 还有玩家存活时对局继续
+        if not self.live_players():
+            super().game_over()
+
+    def player_records(self):
+        """广播用的玩家记录 [(pid, x, y, 生命, 武器等级, 标志)]"""
+        records = []
+        for pid, player in self.players.items():
+            flags = (PLAYER_ALIVE if player.health > 0 else 0) | (
+                PLAYER_INVINCIBLE if player.invincible else 0)
+            records.append((pid, player.rect.x, player.rect.y, max(player.health, 0),
+                            player.power_level, flags))
+        return records
+
+    def entity_truth(self):
+        """各通道的真实状态 (uid, kind, x, y, vx, vy)，速度为 1/256 像素定点数"""
+        enemies, bullets, enemy_bullets = self.enemies, self.bullets, self.enemy_bullets
+        zeros = np.zeros(len(enemies), np.int64)
+        # 敌机的纵坐标每帧按 Rect 规则取整，实际位移是取整后的速度
+        enemy_vy = round_half_away(enemies.column('vy')) * FIXED_ONE
+        truth = [
+            (enemies.column('uid'), enemies.column('kind'), enemies.column('x'),
+             enemies.column('y'), zeros, enemy_vy),
+            (bullets.column('uid'), bullets.column('kind'), bullets.column('x'),
+             bullets.column('y'), np.zeros(len(bullets), np.int64),
+             bullets.column('vy') * FIXED_ONE),
+            (enemy_bullets.column('uid'), enemy_bullets.column('kind'),
+             enemy_bullets.column('x'), enemy_bullets.column('y'),
+             np.rint(enemy_bullets.column('vx') * FIXED_ONE).astype(np.int64),
+             np.rint(enemy_bullets.column('vy') * FIXED_ONE).astype(np.int64)),
+        ]
+
+        # 道具仍是精灵，第一次广播时分配编号（精灵组按加入顺序迭代，编号保持递增）
+        power_ups = self.power_ups.sprites()
+        for power_up in power_ups:
+            if not hasattr(power_up, 'uid'):
+                power_up.uid = self.next_power_up_uid
+                self.next_power_up_uid += 1
+        truth.append((
+            np.array([p.uid for p in power_ups], np.int64),
+            np.array([POWER_UP_KINDS.index(p.type) for p in power_ups], np.int64),
+            np.array([p.rect.x for p in power_ups], np.int64),
+            np.array([p.rect.y for p in power_ups], np.int64),
+            np.zeros(len(power_ups), np.int64),
+            np.array([p.speed * FIXED_ONE for p in power_ups], np.int64)))
+        return truth
+
+
+class Room:
+    """一个房间：一局 RoomGame、房间内的客户端和共用的增量编码器"""
+    def __init__(self, room_id, send_interval=SEND_INTERVAL, seed=None):
+        self.id = room_id
+        self.send_interval = send_interval
+        self.game = RoomGame(seed)
+        self.encoder = DeltaEncoder()
+        self.clients = {}
+        self.ticks = 0
+        self.restart_timer = 0
+        # 已编码的增量条数和字节数（不计关键帧和接收方数量）
+        self.messages = 0
+        self.encoded_bytes = 0
+
+    def free_pid(self):
+        """最小的空闲玩家编号；房间已满时返回 None"""
+        for pid in range(MAX_PLAYERS):
+            if pid not in self.clients:
+                return pid
+        return None
+
+    def join(self, client):
+        """加入房间，返回玩家编号"""
+        pid = self.free_pid()
+        self.clients[pid] = client
+        self.game.add_player(pid)
+        if self.game.state == GameState.MENU:
+            self.game.start_game()
+        client.needs_keyframe = True
+        return pid
+
+    def leave(self, pid):
+        self.clients.pop(pid, None)
+        self.game.remove_player(pid)
+
+    def tick(self):
+        """推进一帧；到了广播时刻时返回要发送的字节数"""
+        game = self.game
+        self.ticks += 1
+        if game.state == GameState.PLAYING:
+            game.fixed_update()
+        else:
+            self.restart_timer += 1
+            if self.restart_timer >= RESTART_DELAY:
+                self.restart_timer = 0
+                game.start_game()
+        if self.ticks % self.send_interval:
+            return 0
+        return self.broadcast()
+
+    def header(self):
+        game = self.game
+        return game.score, game.level, game.state.value
+
+    def broadcast(self):
+        """编码一次增量发给所有客户端，积压的客户端改为之后补发关键帧"""
+        game = self.game
+        header, players = self.header(), game.player_records()
+        message = self.encoder.encode(game.ticks, header, players, game.entity_truth())
+        self.messages += 1
+        self.encoded_bytes += len(message)
+        keyframe = None
+        sent = 0
+        for client in self.clients.values():
+            transport = client.writer.transport
+            if transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > WRITE_BUFFER_LIMIT:
+                client.needs_keyframe = True
+                client.skipped += 1
+                continue
+            if client.needs_keyframe:
+                if keyframe is None:
+                    keyframe = self.encoder.keyframe(game.ticks, header, players)
+                client.writer.write(keyframe)
+                client.needs_keyframe = False
+                client.keyframes += 1
+                sent += len(keyframe)
+            else:
+                client.writer.write(message)
+                sent += len(message)
+        return sent
+
+
+class Connection:
+    """服务器端的一个客户端连接"""
+    def __init__(self, writer):
+        self.writer = writer
+        self.room = None
+        self.pid = None
+        self.needs_keyframe = True
+        self.skipped = 0
+        self.keyframes = 0
+
+
+class GameServer:
+    """监听连接、分配房间，并以固定帧率推进所有房间"""
+    def __init__(self, send_interval=SEND_INTERVAL, seed=None):
+        self.send_interval = send_interval
+        self.seed = seed
+        self.rooms = {}
+        self.next_room = 0
+        self.connections = set()
+        self.handlers = set()
+        self.server = None
+        self.running = False
+        self.started = None
+        # 统计：每帧推进所有房间的耗时（毫秒）与累计量
+        self.tick_times = []
+        self.ticks = 0
+        self.cpu_time = 0.0
+        self.bytes_sent = 0
+        self.dropped_ticks = 0
+
+    async def start(self, host='0.0.0.0', port=DEFAULT_PORT):
+        """开始监听，返回实际端口"""
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve(self):
+        """按 60 帧/秒推进所有房间，直到 stop()"""
+        self.running = True
+        self.started = time.perf_counter()
+        next_tick = self.started
+        interval = 1 / FPS
+        while self.running:
+            now = time.perf_counter()
+            behind = int((now - next_tick) / interval)
+            if behind >= MAX_CATCH_UP:
+                # 落后太多时放弃补帧，避免越追越慢
+                self.dropped_ticks += behind - 1
+                next_tick += behind * interval - interval
+            while next_tick <= now:
+                self.tick()
+                next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+
+    def stop(self):
+        self.running = False
+        if self.server is not None:
+            self.server.close()
+        for connection in list(self.connections):
+            connection.writer.close()
+
+    async def close(self):
+        """停止服务器并等待所有连接处理完毕"""
+        self.stop()
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+
+    def tick(self):
+        """推进所有房间一帧"""
+        start_cpu = time.thread_time()
+        start = time.perf_counter()
+        for room in list(self.rooms.values()):
+            self.bytes_sent += room.tick()
+        self.cpu_time += time.thread_time() - start_cpu
+        self.ticks += 1
+        self.tick_times.append((time.perf_counter() - start) * 1000)
+        if len(self.tick_times) > STATS_WINDOW:
+            del self.tick_times[:-STATS_WINDOW]
+
+    def find_room(self, room_id):
+        """按编号找房间；ANY_ROOM 时找一个未满的房间，都满了就新开一个"""
+        if room_id != ANY_ROOM:
+            room = self.rooms.get(room_id)
+            if room is None:
+                room = self.rooms[room_id] = Room(room_id, self.send_interval, self.seed)
+            return room if room.free_pid() is not None else None
+        for room in self.rooms.values():
+            if room.free_pid() is not None:
+                return room
+        while self.next_room in self.rooms:
+            self.next_room += 1
+        room = self.rooms[self.next_room] = Room(self.next_room, self.send_interval, self.seed)
+        return room
+
+    def stats(self):
+        """服务器统计"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        times = np.array(self.tick_times or [0.0])
+        load = self.cpu_time / elapsed if elapsed else 0.0
+        rooms = len(self.rooms)
+        return {
+            'rooms': rooms,
+            'clients': len(self.connections),
+            'ticks': self.ticks,
+            'dropped_ticks': self.dropped_ticks,
+            'tick_mean_ms': float(times.mean()),
+            'tick_p99_ms': float(np.percentile(times, 99)),
+            'load': load,
+            # 按当前负载线性外推：单核满载时可承载的房间数
+            'rooms_per_core': rooms / load if load else None,
+            'bytes_sent': self.bytes_sent,
+            'send_rate_kbps': self.bytes_sent * 8 / 1000 / elapsed if elapsed else 0.0,
+            'skipped_sends': sum(c.skipped for c in self.connections),
+            'keyframes': sum(c.keyframes for c in self.connections),
+        }
+
+    async def handle_client(self, reader, writer):
+        """一个客户端连接：处理加入、输入和统计查询"""
+        connection = Connection(writer)
+        self.connections.add(connection)
+        handler = asyncio.current_task()
+        self.handlers.add(handler)
+        try:
+            while True:
+                kind, body = await read_message(reader)
+                if kind == INPUT and connection.room is not None:
+                    move, shoot = INPUT_BODY.unpack(body)
+                    connection.room.game.set_input(connection.pid, move, shoot)
+                elif kind == JOIN and connection.room is None:
+                    (room_id,) = JOIN_BODY.unpack(body)
+                    room = self.find_room(room_id)
+                    if room is None:
+                        break
+                    connection.room = room
+                    connection.pid = room.join(connection)
+                    writer.write(pack(WELCOME, WELCOME_BODY.pack(
+                        connection.pid, room.id, FPS, room.send_interval, room.game.ticks)))
+                elif kind == STATS_REQUEST:
+                    writer.write(stats_message(self.stats()))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError, struct.error):
+            # 连接断开或消息不合法（包括负载长度不对）时直接断开这个客户端
+            pass
+        finally:
+            self.handlers.discard(handler)
+            self.connections.discard(connection)
+            room = connection.room
+            if room is not None:
+                room.leave(connection.pid)
+                if not room.clients:
+                    del self.rooms[room.id]
+            writer.close()
+
+
+async def run_server(host, port, send_interval, seed=None):
+    server = GameServer(send_interval, seed)
+    port = await server.start(host, port)
+    print(f"{READY}: {host}:{port}", flush=True)
+    await server.serve()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多人对战服务器")
+    parser.add_argument('--host', default='0.0.0.0', help="监听地址")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="监听端口（0 表示自动分配）")
+    parser.add_argument('--send-interval', type=int, default=SEND_INTERVAL,
+                        help="每隔几帧广播一次状态增量")
+    parser.add_argument('--seed', type=int, default=None, help="房间的随机种子")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_server(args.host, args.port, args.send_interval, args.seed))
+    except KeyboardInterrupt:
+        pass
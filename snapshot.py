@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+💾 游戏状态快照
+
+把一局游戏的完整逻辑状态打包成紧凑的二进制数据（struct 定长记录，不 pickle 精灵对象），
+可以随时恢复到同一个或另一个 Game 上，用于存档/读档、倒带，以及从同一状态分叉出
+大量模拟（智能体前瞻搜索）。恢复后继续输入相同的操作，结果与原对局逐帧一致。
+
+    文件头   魔数 b'SSSN'、版本号、标志（数组后端 / 有玩家 / 有种子）、游戏状态
+    全局     逻辑帧、种子、分数、最高分、等级、难度、刷怪计时、待应用的输入、刷怪时间表的进度
+    刷怪方式 random / schedule / 关卡文件路径（UTF-8，恢复时随之切换）
+    随机数   本局与种子生成器的 Mersenne Twister 状态
+    玩家     位置、速度、生命、武器等级、射击与无敌计时
+    实体     精灵后端：每类实体的数量 + 定长记录；
+             数组后端：每个存储的数量、下一个编号 + 各字段的原始数组
+             （道具和爆炸两种后端都是精灵，按记录保存）
+
+星空背景、HUD 和性能分析数据不属于逻辑状态，不保存；恢复时正在进行的录像会被丢弃。
+
+    python snapshot.py                    # 测量快照大小与保存/恢复耗时，并校验分叉结果一致
+    python snapshot.py --backend arrays --frames 3000
+"""
+
+import struct
+import sys
+import time
+
+import numpy as np
+
+from main import (ENEMY_KINDS, Game, GameState, Player, PowerUp, bullet_pool, enemy_pool,
+                  explosion_pool)
+from scores import atomic_write
+
+MAGIC = b'SSSN'
+VERSION = 3
+HEADER = struct.Struct('<4sBBB')
+GAME = struct.Struct('<IQIIHdiib?I')
+RNG = struct.Struct('<?d625I')
+PLAYER = struct.Struct('<hhbhBq?q')
+COUNT = struct.Struct('<I')
+STORE = struct.Struct('<IQ')
+TEXT = struct.Struct('<H')
+
+ENEMY = struct.Struct('<Bhhdhdhh')
+BULLET = struct.Struct('<hh')
+ENEMY_BULLET = struct.Struct('<hhdddd')
+POWER_UP = struct.Struct('<Bhh')
+EXPLOSION = struct.Struct('<hhHH')
+
+FLAG_ARRAYS = 0x01
+FLAG_PLAYER = 0x02
+FLAG_SEED = 0x04
+# 难度在第一次升级前是整数 1，之后是浮点数；保留类型以免状态摘要不同
+FLAG_INT_DIFFICULTY = 0x08
+
+POWER_UP_KINDS = ['health', 'power', 'score']
+
+
+def pack_rng(rng):
+    version, internal, gauss = rng.getstate()
+    return RNG.pack(gauss is not None, gauss or 0.0, *internal)
+
+
+def unpack_rng(rng, data, offset):
+    values = RNG.unpack_from(data, offset)
+    rng.setstate((3, values[2:], values[1] if values[0] else None))
+    return offset + RNG.size
+
+
+def pack_text(text):
+    data = text.encode('utf-8')
+    return TEXT.pack(len(data)) + data
+
+
+def unpack_text(data, offset):
+    (size,) = TEXT.unpack_from(data, offset)
+    offset += TEXT.size
+    return data[offset:offset + size].decode('utf-8'), offset + size
+
+
+def pack_records(record, rows):
+    """数量 + 定长记录"""
+    return COUNT.pack(len(rows)) + b''.join(record.pack(*row) for row in rows)
+
+
+def unpack_records(record, data, offset):
+    """返回 (记录列表, 新的偏移)"""
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    end = offset + count * record.size
+    return list(record.iter_unpack(data[offset:end])), end
+
+
+def store_columns(store):
+    """数组存储需要保存的字段（含 uid）"""
+    return [name for name, _ in store.FIELDS] + ['uid']
+
+
+def pack_store(store):
+    """数组存储：数量、下一个编号和各字段有效部分的原始字节（小端）"""
+    parts = [STORE.pack(store.count, store.next_uid)]
+    for name in store_columns(store):
+        column = store.column(name)
+        parts.append(column.astype(column.dtype.newbyteorder('<'), copy=False).tobytes())
+    return b''.join(parts)
+
+
+def unpack_store(store, data, offset):
+    count, next_uid = STORE.unpack_from(data, offset)
+    offset += STORE.size
+    store.empty()
+    store.reserve(count)
+    for name in store_columns(store):
+        array = store.arrays[name]
+        dtype = array.dtype.newbyteorder('<')
+        array[:count] = np.frombuffer(data, dtype, count, offset)
+        offset += count * dtype.itemsize
+    store.count = count
+    store.next_uid = next_uid
+    return offset
+
+
+def capture(game):
+    """把 game 的逻辑状态打包成字节串"""
+    player = game.player
+    flags = ((FLAG_ARRAYS if game.entity_arrays else 0) | (FLAG_PLAYER if player else 0) |
+             (FLAG_SEED if game.seed is not None else 0) |
+             (FLAG_INT_DIFFICULTY if isinstance(game.difficulty, int) else 0))
+    parts = [
+        HEADER.pack(MAGIC, VERSION, flags, game.state.value),
+        GAME.pack(game.ticks, game.seed or 0, game.score, game.high_score, game.level,
+                  game.difficulty, game.enemy_spawn_timer, game.enemy_spawn_delay,
+                  game.input_move, game.input_shoot, game.spawn_cursor),
+        pack_text(game.spawns),
+        pack_rng(game.rng),
+        pack_rng(game.seed_rng),
+    ]
+    if player:
+        parts.append(PLAYER.pack(player.rect.x, player.rect.y, player.speed_x, player.health,
+                                 player.power_level, player.last_shot, player.invincible,
+                                 player.invincible_timer))
+
+    if game.entity_arrays:
+        parts += [pack_store(game.enemies), pack_store(game.bullets),
+                  pack_store(game.enemy_bullets)]
+    else:
+        parts.append(pack_records(ENEMY, [
+            (ENEMY_KINDS.index(e.type), e.rect.x, e.rect.y, e.speed, e.health, e.difficulty,
+             e.fire_timer, e.volleys) for e in game.enemies]))
+        parts.append(pack_records(BULLET, [(b.rect.x, b.rect.y) for b in game.bullets]))
+        parts.append(pack_records(ENEMY_BULLET, [
+            (b.rect.x, b.rect.y, b.fx, b.fy, b.vx, b.speed) for b in game.enemy_bullets]))
+    parts.append(pack_records(POWER_UP, [
+        (POWER_UP_KINDS.index(p.type), p.rect.x, p.rect.y) for p in game.power_ups]))
+    parts.append(pack_records(EXPLOSION, [
+        (e.center[0], e.center[1], e.size, e.frame) for e in game.explosions]))
+    return b''.join(parts)
+
+
+def restore(game, data):
+    """
+    把 capture() 得到的状态恢复到 game 上（实体后端必须相同，刷怪方式随快照切换）
+    原有的精灵全部归还对象池，再按记录顺序重新生成，保证后续碰撞检测的遍历顺序一致
+    """
+    magic, version, flags, state = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("不是游戏快照")
+    if version != VERSION:
+        raise ValueError(f"不支持的快照版本: {version}")
+    if bool(flags & FLAG_ARRAYS) != game.entity_arrays:
+        raise ValueError("快照与游戏的实体后端不一致")
+    offset = HEADER.size
+
+    (game.ticks, seed, game.score, game.high_score, game.level, game.difficulty,
+     game.enemy_spawn_timer, game.enemy_spawn_delay, game.input_move,
+     game.input_shoot, spawn_cursor) = GAME.unpack_from(data, offset)
+    offset += GAME.size
+    game.spawns, offset = unpack_text(data, offset)
+    game.seed = seed if flags & FLAG_SEED else None
+    if flags & FLAG_INT_DIFFICULTY:
+        game.difficulty = int(game.difficulty)
+    # 时间表由刷怪方式和种子决定（已编译的会被复用），快照里只保存进度
+    game.prepare_spawns(spawn_cursor)
+    offset = unpack_rng(game.rng, data, offset)
+    offset = unpack_rng(game.seed_rng, data, offset)
+    game.state = GameState(state)
+    game.recorder = None
+
+    if game.player:
+        game.player.kill()
+    game.player = None
+    if flags & FLAG_PLAYER:
+        x, y, speed_x, health, power_level, last_shot, invincible, invincible_timer = (
+            PLAYER.unpack_from(data, offset))
+        offset += PLAYER.size
+        player = game.player = Player(last_shot)
+        player.rect.topleft = (x, y)
+        player.speed_x = speed_x
+        player.health = health
+        player.power_level = power_level
+        player.invincible = invincible
+        player.invincible_timer = invincible_timer
+
+    groups = [game.power_ups, game.explosions]
+    if not game.entity_arrays:
+        groups += [game.enemies, game.bullets, game.enemy_bullets]
+    for group in groups:
+        for sprite in group.sprites():
+            sprite.kill()
+
+    if game.entity_arrays:
+        offset = unpack_store(game.enemies, data, offset)
+        offset = unpack_store(game.bullets, data, offset)
+        offset = unpack_store(game.enemy_bullets, data, offset)
+    else:
+        records, offset = unpack_records(ENEMY, data, offset)
+        enemies = []
+        for kind, x, y, speed, health, difficulty, fire_timer, volleys in records:
+            # 直接给定参数初始化，不消耗随机数
+            enemy = enemy_pool.acquire(difficulty, None,
+                                       (ENEMY_KINDS[kind], speed, x, y, fire_timer))
+            enemy.health = health
+            enemy.volleys = volleys
+            enemies.append(enemy)
+        game.enemies.add(enemies)
+
+        records, offset = unpack_records(BULLET, data, offset)
+        bullets = [bullet_pool.acquire(0, 0) for _ in records]
+        for bullet, (x, y) in zip(bullets, records):
+            bullet.rect.topleft = (x, y)
+        game.bullets.add(bullets)
+
+        records, offset = unpack_records(ENEMY_BULLET, data, offset)
+        bullets = []
+        for x, y, fx, fy, vx, vy in records:
+            bullet = bullet_pool.acquire(0, 0, True, vx, vy)
+            bullet.rect.topleft = (x, y)
+            bullet.fx, bullet.fy = fx, fy
+            bullets.append(bullet)
+        game.enemy_bullets.add(bullets)
+
+    records, offset = unpack_records(POWER_UP, data, offset)
+    for kind, x, y in records:
+        power_up = PowerUp(0, 0, kind=POWER_UP_KINDS[kind])
+        power_up.rect.topleft = (x, y)
+        game.power_ups.add(power_up)
+
+    records, offset = unpack_records(EXPLOSION, data, offset)
+    for x, y, size, frame in records:
+        explosion = explosion_pool.acquire(x, y, size)
+        explosion.frame = frame
+        explosion.image = explosion.frames[frame]
+        explosion.rect = explosion.image.get_rect(center=explosion.center)
+        game.explosions.add(explosion)
+
+    # 画面需要整屏重画
+    game.drawn_state = None
+    game.drawn_key = None
+    return game
+
+
+def save(game, path):
+    """存档（先写临时文件再原子替换）"""
+    atomic_write(path, capture(game))
+
+
+def load(game, path):
+    """读档"""
+    with open(path, 'rb') as f:
+        return restore(game, f.read())
+
+
+def fork(game, data=None):
+    """
+    从 game（或现成的快照 data）分叉出一局新的无界面游戏
+    大量分叉时创建 Game 的开销远大于恢复本身，可以反复 restore 到同一个 Game 上
+    """
+    if data is None:
+        data = capture(game)
+    branch = Game(headless=True, entity_backend='arrays' if game.entity_arrays else 'sprites',
+                  spawns=game.spawns)
+    return restore(branch, data)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="快照保存/恢复的耗时测量与一致性校验")
+    parser.add_argument('--frames', type=int, default=1800, help="先模拟多少帧再拍快照")
+    parser.add_argument('--branch', type=int, default=600, help="分叉后继续模拟的帧数")
+    parser.add_argument('--repeat', type=int, default=1000, help="计时重复次数")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--backend', choices=['sprites', 'arrays'], default='sprites',
+                        help="实体后端")
+    parser.add_argument('--spawns', default='random',
+                        help="刷怪方式：random、schedule 或关卡文件路径")
+    args = parser.parse_args()
+
+    def policy(game):
+        # 固定节奏左右移动并持续开火，保证两条分支的输入完全相同
+        return (game.ticks // 40) % 3 - 1, True
+
+    game = Game(headless=True, seed=args.seed, entity_backend=args.backend, spawns=args.spawns)
+    game.simulate(args.frames, policy)
+    data = capture(game)
+    print(f"第 {game.ticks} 帧：分数 {game.score}，敌机 {len(game.enemies)}，"
+          f"子弹 {len(game.bullets)}，敌机子弹 {len(game.enemy_bullets)}，"
+          f"道具 {len(game.power_ups)}，爆炸 {len(game.explosions)}")
+    print(f"快照 {len(data)} 字节")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        capture(game)
+    capture_us = (time.perf_counter() - start) / args.repeat * 1e6
+    branch = fork(game, data)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        restore(branch, data)
+    restore_us = (time.perf_counter() - start) / args.repeat * 1e6
+    print(f"保存 {capture_us:.1f} µs，恢复 {restore_us:.1f} µs")
+
+    same = branch.state_digest() == game.state_digest()
+    game.simulate(args.branch, policy)
+    branch.simulate(args.branch, policy)
+    same = same and branch.state_digest() == game.state_digest()
+    print("分叉结果一致" if same else "分叉结果不一致！")
+    sys.exit(0 if same else 1)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+🗓️ 刷怪时间表
+
+默认的刷怪方式每帧累加计时器，到点后当场掷随机数决定敌机的类型、速度和位置。
+时间表模式把整关预先编译成按帧排序的刷怪事件，游戏循环只需取出到期的事件批量生成，
+运行时不再消耗随机数；同一份时间表每局完全相同，可以缓存、保存和复现。
+
+时间表有两种来源，可以混用：
+    随机流  按难度曲线（分段的刷怪间隔与难度系数）和种子生成，敌机参数的分布与默认方式相同；
+            超出关卡长度后沿用曲线最后一段无限延续，按需分块编译
+    编队    关卡文件中手工编排的波次，例如“第 10 秒从左到右依次出现 8 架快速敌机”
+
+关卡文件是 JSON：
+
+    {
+      "seed": 1,
+      "length": 120,
+      "curve": [[0, 60, 1.0], [30, 45, 1.4], [60, 30, 1.8]],
+      "waves": [
+        {"at": 10, "kind": "fast", "count": 8, "spacing": 0.25, "x": [60, 700]},
+        {"at": 45, "kind": "tank", "count": 3, "x": [150, 600], "y": -80, "difficulty": 2.0}
+      ]
+    }
+
+curve 每项为 [起始秒, 刷怪间隔（帧）, 难度系数]，省略时只有编队；编队的 x 可以是单个坐标或
+[起点, 终点]（按数量均匀分布），speed 省略时取该类型速度范围的中点，difficulty 省略时取曲线上的值。
+
+    python spawns.py level.json              # 编译并显示统计
+    python spawns.py level.json -o level.spawns
+    python spawns.py --seed 42 --seconds 600 # 按默认难度曲线编译随机流
+"""
+
+import functools
+import hashlib
+import json
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+
+from main import ENEMY_KINDS, ENEMY_TYPES, FPS, SCREEN_WIDTH, roll_enemy
+
+# 一个刷怪事件
+EVENT = np.dtype([('tick', '<i8'), ('kind', 'i1'), ('speed', '<f8'), ('x', '<i8'), ('y', '<i8'),
+                  ('fire_timer', '<i8'), ('difficulty', '<f8')])
+# 随机流每次向后编译的长度（帧）
+CHUNK = 60 * FPS
+
+MAGIC = b'SSSP'
+VERSION = 1
+HEADER = struct.Struct('<4sBQQII')
+SEGMENT = struct.Struct('<Iid')
+
+
+class DifficultyCurve:
+    """分段的难度曲线：[(起始帧, 刷怪间隔帧, 难度系数)]，按起始帧升序"""
+    def __init__(self, segments):
+        self.segments = tuple(sorted((int(start), int(delay), float(difficulty))
+                                     for start, delay, difficulty in segments))
+        if any(delay <= 0 for _, delay, _ in self.segments):
+            raise ValueError("刷怪间隔必须大于 0")
+        self.starts = [start for start, _, _ in self.segments]
+
+    def __bool__(self):
+        return bool(self.segments)
+
+    def at(self, tick):
+        """tick 时刻的 (刷怪间隔, 难度系数)"""
+        index = max(0, np.searchsorted(self.starts, tick, 'right') - 1)
+        _, delay, difficulty = self.segments[index]
+        return delay, difficulty
+
+    @classmethod
+    def from_seconds(cls, segments):
+        """起始时间以秒表示的曲线（关卡文件格式）"""
+        return cls([(round(start * FPS), delay, difficulty)
+                    for start, delay, difficulty in segments])
+
+    @classmethod
+    def from_game(cls, game):
+        """
+        由 Game 的难度参数换算的曲线：默认方式按分数升级，时间表模式改为每
+        SCHEDULE_LEVEL_SECONDS 秒升一级，各级的刷怪间隔和难度系数与 update_difficulty 相同
+        """
+        segments = [(0, game.SPAWN_DELAY_START, 1)]
+        level = 1
+        while True:
+            level += 1
+            delay = max(game.SPAWN_DELAY_MIN,
+                        game.SPAWN_DELAY_START - level * game.SPAWN_DELAY_STEP)
+            difficulty = 1 + (level - 1) * game.DIFFICULTY_STEP
+            segments.append(((level - 1) * game.SCHEDULE_LEVEL_SECONDS * FPS, delay, difficulty))
+            if level >= game.SCHEDULE_MAX_LEVEL:
+                return cls(segments)
+
+
+class SpawnSchedule:
+    """
+    编译好的刷怪时间表：events 按帧升序（同一帧按生成顺序）
+    有难度曲线时随机流无限延续，extend() 按需向后编译；已编译的事件只追加不修改，
+    因此多局游戏（或同一状态分叉出的大量模拟）可以共用一份时间表
+    """
+    def __init__(self, curve=None, seed=0, length=0, waves=()):
+        self.curve = curve or DifficultyCurve([])
+        self.seed = seed
+        self.length = length
+        self.rng = random.Random(seed)
+        self.events = np.zeros(0, EVENT)
+        self.compiled_until = 0
+        # 随机流的下一次刷怪时刻
+        self.next_tick = self.curve.at(0)[0] if self.curve else None
+        self.ticks = []
+        if length or waves:
+            # 随机流至少编译到最后一个编队之后，之后追加的事件才能保持有序
+            waves = compile_waves(waves, self.curve)
+            horizon = max(length, int(waves['tick'].max()) + 1 if len(waves) else 0)
+            self.events = np.sort(np.concatenate([self.stream(horizon), waves]),
+                                  kind='stable', order='tick')
+            self.compiled_until = horizon
+            self.ticks = self.events['tick'].tolist()
+
+    def stream(self, until):
+        """随机流中 [compiled_until, until) 的事件"""
+        rows = []
+        while self.next_tick is not None and self.next_tick < until:
+            delay, difficulty = self.curve.at(self.next_tick)
+            name, speed, x, y, fire_timer = roll_enemy(self.rng)
+            rows.append((self.next_tick, ENEMY_KINDS.index(name), speed, x, y, fire_timer,
+                         difficulty))
+            self.next_tick += delay
+        return np.array(rows, EVENT)
+
+    def extend(self, until):
+        """把随机流编译到 until 帧（只向后追加）"""
+        if until <= self.compiled_until:
+            return
+        events = self.stream(until)
+        self.compiled_until = until
+        if len(events):
+            self.events = np.concatenate([self.events, events])
+            self.ticks.extend(events['tick'].tolist())
+
+    @property
+    def endless(self):
+        return bool(self.curve)
+
+    def pop_due(self, cursor, tick):
+        """
+        取出 cursor 之后、tick 及以前到期的事件
+        返回 (事件数组, 新的 cursor, 下一个事件的时刻；之后没有事件时为 None)
+        """
+        if self.endless and self.compiled_until <= tick + 1:
+            self.extend(tick + 1 + CHUNK)
+        end = cursor
+        ticks = self.ticks
+        while end < len(ticks) and ticks[end] <= tick:
+            end += 1
+        return self.events[cursor:end], end, self.next_event(end)
+
+    def next_event(self, cursor):
+        """cursor 处事件的时刻（需要时继续编译随机流）"""
+        while cursor >= len(self.ticks):
+            if not self.endless:
+                return None
+            self.extend(self.compiled_until + CHUNK)
+        return self.ticks[cursor]
+
+    def to_bytes(self):
+        """序列化（随机流只保存已编译的部分和继续编译所需的曲线、种子）"""
+        segments = b''.join(SEGMENT.pack(*segment) for segment in self.curve.segments)
+        return (HEADER.pack(MAGIC, VERSION, self.seed, self.compiled_until,
+                            len(self.curve.segments), len(self.events)) +
+                segments + self.events.tobytes() +
+                struct.pack('<?q', self.next_tick is not None, self.next_tick or 0) +
+                pack_rng(self.rng))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, compiled_until, segment_count, event_count = (
+            HEADER.unpack_from(data))
+        if magic != MAGIC:
+            raise ValueError("不是刷怪时间表")
+        if version != VERSION:
+            raise ValueError(f"不支持的时间表版本: {version}")
+        offset = HEADER.size
+        segments = [SEGMENT.unpack_from(data, offset + i * SEGMENT.size)
+                    for i in range(segment_count)]
+        offset += segment_count * SEGMENT.size
+        schedule = cls(DifficultyCurve(segments), seed)
+        schedule.events = np.frombuffer(data, EVENT, event_count, offset).copy()
+        offset += schedule.events.nbytes
+        has_next, next_tick = struct.unpack_from('<?q', data, offset)
+        offset += struct.calcsize('<?q')
+        schedule.next_tick = next_tick if has_next else None
+        schedule.rng.setstate(unpack_rng(data, offset))
+        schedule.compiled_until = schedule.length = compiled_until
+        schedule.ticks = schedule.events['tick'].tolist()
+        return schedule
+
+
+def pack_rng(rng):
+    _, internal, gauss = rng.getstate()
+    return struct.pack('<?d625I', gauss is not None, gauss or 0.0, *internal)
+
+
+def unpack_rng(data, offset):
+    values = struct.unpack_from('<?d625I', data, offset)
+    return 3, values[2:], values[1] if values[0] else None
+
+
+def compile_waves(waves, curve):
+    """把编队展开成事件"""
+    rows = []
+    for wave in waves:
+        name = wave['kind']
+        if name not in ENEMY_TYPES:
+            raise ValueError(f"未知的敌机类型: {name}")
+        spec = ENEMY_TYPES[name]
+        count = int(wave.get('count', 1))
+        start = round(wave['at'] * FPS)
+        spacing = wave.get('spacing', 0) * FPS
+        x = wave.get('x', (0, SCREEN_WIDTH - spec['size'][0]))
+        xs = np.linspace(x[0], x[1], count) if isinstance(x, (list, tuple)) else [x] * count
+        speed = wave.get('speed', sum(spec['speed']) / 2)
+        for index in range(count):
+            tick = start + round(index * spacing)
+            difficulty = wave.get('difficulty', curve.at(tick)[1] if curve else 1.0)
+            rows.append((tick, ENEMY_KINDS.index(name), speed, round(xs[index]),
+                         wave.get('y', -60), spec['fire']['interval'], difficulty))
+    return np.array(rows, EVENT)
+
+
+def parse_level(data):
+    """由关卡描述（JSON 解析后的字典）编译时间表"""
+    curve = DifficultyCurve.from_seconds(data.get('curve', []))
+    return SpawnSchedule(curve, data.get('seed', 0), round(data.get('length', 0) * FPS),
+                         data.get('waves', []))
+
+
+@functools.lru_cache(maxsize=None)
+def load_level(path):
+    """读取关卡文件（.json 描述或 spawns.py -o 保存的编译结果），同一路径只编译一次"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        return SpawnSchedule.from_bytes(data)
+    return parse_level(json.loads(data))
+
+
+def stream_seed(seed):
+    """由对局种子派生随机流的种子（与对局自身的随机数序列不相关）"""
+    return int.from_bytes(hashlib.sha256(b'spawns:%d' % seed).digest()[:8], 'little')
+
+
+@functools.lru_cache(maxsize=256)
+def seeded_schedule(seed, segments):
+    """按对局种子和难度曲线编译的随机流（相同参数共用一份，供多局游戏和分叉模拟复用）"""
+    return SpawnSchedule(DifficultyCurve(segments), stream_seed(seed))
+
+
+def describe(schedule, seconds):
+    """统计前 seconds 秒的事件"""
+    schedule.extend(round(seconds * FPS))
+    events = schedule.events[schedule.events['tick'] < seconds * FPS]
+    kinds = np.bincount(events['kind'], minlength=len(ENEMY_KINDS))
+    bursts = np.unique(events['tick'], return_counts=True)[1]
+    return {
+        'events': len(events),
+        'kinds': dict(zip(ENEMY_KINDS, kinds.tolist())),
+        'max_burst': int(bursts.max()) if len(bursts) else 0,
+        'bytes': len(schedule.to_bytes()),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from main import Game
+
+    parser = argparse.ArgumentParser(description="编译刷怪时间表")
+    parser.add_argument('level', nargs='?', help="关卡文件（省略时按默认难度曲线编译随机流）")
+    parser.add_argument('--seed', type=int, default=0, help="随机流的种子（未指定关卡文件时）")
+    parser.add_argument('--seconds', type=float, default=300, help="统计（和保存）前多少秒")
+    parser.add_argument('-o', '--output', default=None, help="保存编译结果")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.level:
+        schedule = load_level(args.level)
+    else:
+        schedule = seeded_schedule(args.seed, DifficultyCurve.from_game(Game).segments)
+    stats = describe(schedule, args.seconds)
+    elapsed = time.perf_counter() - start
+    print(f"前 {args.seconds:.0f} 秒共 {stats['events']} 个刷怪事件（编译 {elapsed * 1000:.1f} ms），"
+          f"同一帧最多 {stats['max_burst']} 架")
+    print("  " + "  ".join(f"{kind}:{count}" for kind, count in stats['kinds'].items()))
+    if args.output:
+        with open(args.output, 'wb') as f:
+            f.write(schedule.to_bytes())
+        print(f"已保存到 {args.output}（{stats['bytes']} 字节）")
+    sys.exit(0)
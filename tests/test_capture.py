@@ -0,0 +1,47 @@
+"""画面录制在编码线程出错时不能卡住游戏线程"""
+
+import threading
+
+import pygame
+import pytest
+
+from capture import FrameCapture
+
+
+def add_frames(capture, surface, count, timeout=5.0):
+    """在另一个线程里提交 count 帧，返回是否在 timeout 秒内全部返回"""
+    worker = threading.Thread(target=lambda: [capture.add(surface) for _ in range(count)],
+                              daemon=True)
+    worker.start()
+    worker.join(timeout)
+    return not worker.is_alive()
+
+
+@pytest.mark.parametrize('fmt', ['png', 'raw'])
+def test_failing_writer_does_not_block(tmp_path, monkeypatch, fmt):
+    def fail(*args):
+        raise pygame.error("编码失败")
+    monkeypatch.setattr(FrameCapture, 'write_png' if fmt == 'png' else 'write_raw', fail)
+    surface = pygame.Surface((16, 16))
+    capture = FrameCapture(str(tmp_path / 'out'), surface.get_size(), fmt, capacity=4,
+                           block=True)
+    assert add_frames(capture, surface, 20)
+    stats = capture.close()
+    assert stats['errors'] == 20
+    assert stats['encoded'] == 0
+
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_dead_encoder_stops_blocking(tmp_path, monkeypatch):
+    # 编码线程被 Exception 以外的异常终止
+    def die(*args):
+        raise SystemExit
+    monkeypatch.setattr(FrameCapture, 'write_png', die)
+    surface = pygame.Surface((16, 16))
+    capture = FrameCapture(str(tmp_path / 'frames'), surface.get_size(), 'png', capacity=4,
+                           block=True)
+    assert add_frames(capture, surface, 20)
+    stats = capture.close()
+    assert stats['failed']
+    assert stats['dropped'] > 0
+    assert stats['captured'] + stats['dropped'] == 20
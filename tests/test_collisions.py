@@ -0,0 +1,65 @@
+"""各条碰撞检测路径和两种实体后端给出完全相同的游戏过程"""
+
+import random
+
+import pytest
+
+import main
+from main import Game
+
+FRAMES = 1200
+
+
+def play(seed, entity_backend='sprites'):
+    """
+    无界面模拟一局子弹和敌机都很密集的游戏，返回每 100 帧的状态摘要和最终摘要
+    玩家开满火力、不会死亡，敌机每帧生成
+    """
+    game = Game(headless=True, seed=seed, entity_backend=entity_backend)
+    game.start_game()
+    game.player.power_level = 3
+    game.player.health = game.player.max_health = 10 ** 6
+    game.enemy_spawn_delay = 1
+    moves = random.Random(seed)
+    digests = []
+
+    def policy(game):
+        if game.ticks % 100 == 0:
+            digests.append(game.state_digest())
+        return moves.choice((-1, 0, 1)), True
+
+    assert game.simulate(FRAMES, policy) == FRAMES
+    assert game.score > 0
+    digests.append(game.state_digest())
+    return digests
+
+
+# 精灵后端的碰撞路径：(SpatialGrid.BRUTE_FORCE_PAIRS, COLLIDE_DENSE_PAIRS, 是否禁用 numpy)
+SPRITE_PATHS = {
+    'brute-force': (10 ** 12, main.COLLIDE_DENSE_PAIRS, False),
+    'grid': (0, main.COLLIDE_DENSE_PAIRS, True),
+    'dense': (0, 10 ** 12, False),
+    'sweep': (0, 0, False),
+}
+
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_sprite_collision_paths_match(seed, monkeypatch):
+    results = {}
+    for name, (brute_force, dense, no_numpy) in SPRITE_PATHS.items():
+        with monkeypatch.context() as patch:
+            patch.setattr(main.SpatialGrid, 'BRUTE_FORCE_PAIRS', brute_force)
+            patch.setattr(main, 'COLLIDE_DENSE_PAIRS', dense)
+            if no_numpy:
+                patch.setattr(main, 'np', None)
+            results[name] = play(seed)
+    expected = results.pop('brute-force')
+    for name, digests in results.items():
+        assert digests == expected, name
+
+
+@pytest.mark.parametrize('dense', [10 ** 12, 0], ids=['dense', 'sweep'])
+@pytest.mark.parametrize('seed', [1, 2])
+def test_entity_backends_match(seed, dense, monkeypatch):
+    monkeypatch.setattr(main, 'COLLIDE_DENSE_PAIRS', dense)
+    assert play(seed, 'arrays') == play(seed, 'sprites')
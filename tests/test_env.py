@@ -0,0 +1,37 @@
+"""训练环境的特征观测"""
+
+import numpy as np
+import pytest
+
+from env import (BULLET_SPEED_SCALE, FEATURE_SIZE, NEAREST_ENEMIES, NEAREST_ENEMY_BULLETS,
+                 ShooterEnv)
+
+BULLETS = slice(5 + 4 * NEAREST_ENEMIES, 5 + 4 * NEAREST_ENEMIES + 5 * NEAREST_ENEMY_BULLETS)
+
+
+@pytest.mark.parametrize('backend', ['sprites', 'arrays'])
+def test_enemy_bullet_features(backend):
+    env = ShooterEnv(seed=1, entity_backend=backend)
+    obs, _ = env.reset()
+    assert obs.shape == (FEATURE_SIZE,)
+    game = env.game
+    game.enemies.empty()
+    game.enemy_bullets.empty()
+    before = env.observe()
+    assert not before[BULLETS].any()
+
+    # 玩家正上方 100 像素处一颗向下飞的子弹
+    px, py = game.player.rect.center
+    game.emit_volleys([(px, py - 100, [(1.0, 3.0)])])
+    after = env.observe()
+    block = after[BULLETS].reshape(-1, 5)
+    assert block[0, 0] == 1
+    assert block[0, 1] == pytest.approx(0, abs=0.01)
+    assert block[0, 2] < 0
+    assert block[0, 3] == pytest.approx(1.0 / BULLET_SPEED_SCALE)
+    assert block[0, 4] == pytest.approx(3.0 / BULLET_SPEED_SCALE)
+    assert not block[1:].any()
+    # 其余特征不受影响
+    mask = np.ones(FEATURE_SIZE, bool)
+    mask[BULLETS] = False
+    assert np.array_equal(before[mask], after[mask])
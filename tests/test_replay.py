@@ -0,0 +1,49 @@
+"""录像文件的刷怪方式"""
+
+import struct
+import zlib
+
+import pytest
+
+import snapshot
+from main import Game
+from replay import HEADER, MAGIC, Replay
+
+
+def record(spawns, frames=600):
+    game = Game(headless=True, record_path='unused', spawns=spawns)
+    game.start_game(3)
+    for frame in range(frames):
+        game.step((frame // 30) % 3 - 1, True)
+    return game.recorder.to_bytes(game.state_digest())
+
+
+@pytest.mark.parametrize('spawns', ['random', 'schedule'])
+def test_replay_restores_spawn_mode(spawns):
+    replay = Replay.from_bytes(record(spawns))
+    assert replay.spawns == spawns
+    # 回放用默认方式创建的游戏，由录像切换刷怪方式
+    assert replay.verify(Game(headless=True))
+
+
+def test_version_1_is_random():
+    inputs = bytes(10)
+    data = (struct.pack(HEADER.format, MAGIC, 1, 7, len(inputs)) + bytes(32) +
+            zlib.compress(inputs))
+    replay = Replay.from_bytes(data)
+    assert replay.spawns == 'random'
+    assert replay.inputs == inputs
+
+
+def test_snapshot_restores_spawn_mode():
+    game = Game(headless=True, spawns='schedule')
+    game.start_game(5)
+    for _ in range(400):
+        game.step(0, True)
+    other = Game(headless=True)
+    snapshot.restore(other, snapshot.capture(game))
+    assert other.spawns == 'schedule'
+    for _ in range(600):
+        game.step(1, True)
+        other.step(1, True)
+    assert game.state_digest() == other.state_digest()
@@ -0,0 +1,64 @@
+"""房间在没有存活玩家时也能推进；负载长度不对的消息只断开该连接"""
+
+import asyncio
+
+import pytest
+
+from protocol import ANY_ROOM, INPUT, JOIN, JOIN_BODY, pack
+from server import GameServer, RoomGame
+
+
+class FakeWriter:
+    def __init__(self):
+        self.data = bytearray()
+        self.closed = False
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize('leave', ['die', 'disconnect'])
+def test_update_without_live_players(leave):
+    game = RoomGame(seed=1)
+    game.add_player(0)
+    game.add_player(1)
+    game.start_game()
+    for _ in range(120):
+        game.fixed_update()
+    for pid in (0, 1):
+        if leave == 'die':
+            game.players[pid].health = 0
+        else:
+            game.remove_player(pid)
+    ticks = game.ticks
+    # 绕过 fixed_update 里的检查直接推进
+    for _ in range(10):
+        game.update()
+    assert game.ticks == ticks + 10
+
+
+@pytest.mark.parametrize('messages', [
+    pack(JOIN, b'\x01'),
+    pack(JOIN, JOIN_BODY.pack(ANY_ROOM)) + pack(INPUT, b'\x01\x00\x00'),
+], ids=['join', 'input'])
+def test_malformed_body_closes_connection(messages):
+    server = GameServer()
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(messages)
+        reader.feed_eof()
+        writer = FakeWriter()
+        await server.handle_client(reader, writer)
+        return writer
+
+    writer = asyncio.run(run())
+    assert writer.closed
+    assert not server.connections
+    assert not server.rooms
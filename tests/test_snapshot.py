@@ -0,0 +1,50 @@
+"""快照恢复后继续推进与原对局逐帧一致；损坏的快照被拒绝"""
+
+import pytest
+
+import snapshot
+from main import Game
+
+
+def policy(game):
+    # 只依赖帧号，两局输入完全相同
+    return (game.ticks // 40) % 3 - 1, True
+
+
+@pytest.mark.parametrize('backend', ['sprites', 'arrays'])
+def test_round_trip(backend):
+    game = Game(headless=True, seed=3, entity_backend=backend)
+    assert game.simulate(900, policy) == 900
+    data = snapshot.capture(game)
+
+    other = Game(headless=True, entity_backend=backend)
+    snapshot.restore(other, data)
+    assert other.ticks == game.ticks
+    assert other.state_digest() == game.state_digest()
+    assert snapshot.capture(other) == data
+
+    for _ in range(6):
+        for _ in range(100):
+            move, shoot = policy(game)
+            game.step(move, shoot)
+            other.step(move, shoot)
+        assert other.state_digest() == game.state_digest()
+    assert other.score == game.score
+
+
+@pytest.mark.parametrize('offset, value', [(0, b'XXXX'), (4, bytes([snapshot.VERSION + 1]))],
+                         ids=['magic', 'version'])
+def test_rejects_bad_header(offset, value):
+    game = Game(headless=True, seed=3)
+    game.simulate(60, policy)
+    data = bytearray(snapshot.capture(game))
+    data[offset:offset + len(value)] = value
+    with pytest.raises(ValueError):
+        snapshot.restore(Game(headless=True), bytes(data))
+
+
+def test_rejects_other_backend():
+    game = Game(headless=True, seed=3)
+    game.simulate(60, policy)
+    with pytest.raises(ValueError):
+        snapshot.restore(Game(headless=True, entity_backend='arrays'), snapshot.capture(game))